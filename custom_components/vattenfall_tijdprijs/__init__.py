@@ -5,17 +5,82 @@
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.const import Platform
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.event import async_track_time_change
 
+from .const import CONF_COST_SOURCE, DOMAIN, STATISTICS_IMPORT_HOUR, STATISTICS_IMPORT_MINUTE
+from .coordinator import VattenfallPriceCoordinator, entry_config
+from .meter import meter_store
+from .services import async_setup_services
+from .statistics import async_import_statistics
+from .websocket_api import async_setup_websocket_api
 
-PLATFORMS: list[Platform] = [Platform.SENSOR]
+
+PLATFORMS: list[Platform] = [Platform.CALENDAR, Platform.SENSOR]
+
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: dict) -> bool:
+    """Set up the Vattenfall Tijdprijs services and websocket commands."""
+    async_setup_services(hass)
+    async_setup_websocket_api(hass)
+    return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Vattenfall Tijdprijs from a config entry."""
+    coordinator = VattenfallPriceCoordinator(hass, entry_config(entry))
+    await coordinator.async_config_entry_first_refresh()
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
+
+    async def _async_import_statistics(now=None):
+        """Import the tariff statistics up to the end of tomorrow."""
+        await async_import_statistics(hass, coordinator, entry.entry_id, entry.title)
+
+    # One batched statistics import now and then once a day
+    hass.async_create_task(_async_import_statistics())
+    entry.async_on_unload(
+        async_track_time_change(
+            hass,
+            _async_import_statistics,
+            hour=STATISTICS_IMPORT_HOUR,
+            minute=STATISTICS_IMPORT_MINUTE,
+            second=0,
+        )
+    )
+
+    entry.async_on_unload(entry.add_update_listener(_async_update_options))
+
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     return True
 
 
+async def _async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options to the running coordinator without a reload."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    config = entry_config(entry)
+    if config.get(CONF_COST_SOURCE) != coordinator.config_data.get(CONF_COST_SOURCE):
+        # The cost sensor is added or removed with its source
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    changed_from = coordinator.async_apply_config(config)
+    # Rewrite the imported hours from the first one with changed rates
+    await async_import_statistics(
+        hass, coordinator, entry.entry_id, entry.title, since=changed_from
+    )
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unload_ok:
+        # Cancels the slot timer and releases the shared forecast window
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        await coordinator.async_shutdown()
+    return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the saved meter totals of a removed entry."""
+    await meter_store(hass, entry.entry_id).async_remove()
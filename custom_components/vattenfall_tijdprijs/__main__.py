@@ -0,0 +1,34 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Run the tariff series generator without Home Assistant.
+
+    python custom_components/vattenfall_tijdprijs --help
+
+The package __init__ sets up the integration and needs Home Assistant, so
+the modules are loaded through a bare package module for this directory.
+"""
+
+import os
+import sys
+
+_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+_PACKAGE = "vattenfall_tijdprijs"
+
+if __name__ == "__main__":
+    # Running the directory puts it first on sys.path, where calendar.py
+    # would shadow the standard library module
+    if sys.path and os.path.abspath(sys.path[0]) == _DIRECTORY:
+        del sys.path[0]
+
+    import importlib
+    import types
+
+    package = types.ModuleType(_PACKAGE)
+    package.__path__ = [_DIRECTORY]
+    sys.modules[_PACKAGE] = package
+    try:
+        sys.exit(importlib.import_module(f"{_PACKAGE}.cli").main())
+    except BrokenPipeError:
+        # The reader, e.g. head, stopped early; drop the unwritten output
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
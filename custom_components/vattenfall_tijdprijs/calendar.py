@@ -0,0 +1,76 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Calendar of the tariff periods, generated from the tariff schedule."""
+
+import inspect
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+
+from homeassistant.components.calendar import CalendarEntity, CalendarEvent
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN
+from .pricing_data import PERIOD_LABELS, TariffTable, to_local
+
+# No tariff period lasts a day, so a period overlapping a range always
+# starts within a day before it
+_LOOKBACK = timedelta(days=1)
+
+
+async def async_setup_entry(hass, entry, async_add_entities):
+    """Set up the Vattenfall Tijdprijs tariff period calendar."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+
+    result = async_add_entities(
+        [TariffPeriodCalendar(coordinator, entry.entry_id, "Tariefperiodes", "tariff_periods")]
+    )
+    if inspect.isawaitable(result):
+        await result
+
+
+def iter_tariff_events(tariff: TariffTable, start: datetime, end: datetime) -> Iterator[CalendarEvent]:
+    """Generate an event for every tariff period overlapping start to end.
+
+    Events are whole periods, so the first and last may extend beyond the
+    range. The summary is the period key (e.g. 'winter_offpeak_night').
+    """
+    for period_start, period_end, season, period, price in tariff.segments(
+        start - _LOOKBACK, end + _LOOKBACK
+    ):
+        if period_end <= start:
+            continue
+        if period_start >= end:
+            break
+        period_key = f"{season}_{period}"
+        yield CalendarEvent(
+            start=to_local(period_start),
+            end=to_local(period_end),
+            summary=period_key,
+            description=f"{PERIOD_LABELS[period_key]}: {round(price, 6)} €/kWh",
+            uid=f"{period_key}_{to_local(period_start).isoformat()}",
+        )
+
+
+class TariffPeriodCalendar(CoordinatorEntity, CalendarEntity):
+    """Calendar with one event per tariff period.
+
+    Nothing is stored: events are generated from the tariff schedule for
+    whatever range the frontend or a calendar trigger asks for.
+    """
+
+    def __init__(self, coordinator, entry_id, name, calendar_type):
+        """Initialize the calendar."""
+        super().__init__(coordinator)
+        self._attr_name = name
+        self._attr_unique_id = f"{entry_id}_{calendar_type}"
+        self._attr_icon = "mdi:calendar-clock"
+
+    @property
+    def event(self) -> CalendarEvent | None:
+        """Return the tariff period active at the last coordinator update."""
+        now = self.coordinator.data["time"]
+        return next(iter_tariff_events(self.coordinator.tariff, now, now + _LOOKBACK), None)
+
+    async def async_get_events(self, hass, start_date: datetime, end_date: datetime) -> list:
+        """Return the tariff periods between start_date and end_date."""
+        return list(iter_tariff_events(self.coordinator.tariff, start_date, end_date))
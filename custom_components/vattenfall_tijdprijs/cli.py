@@ -0,0 +1,147 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Command-line tariff series generator, for use outside Home Assistant.
+
+Run the integration directory as a script; see __main__.py:
+
+    python custom_components/vattenfall_tijdprijs --start 2024-01-01 --end 2027-01-01
+
+Only const.py and pricing_data.py are loaded. The series is generated and
+written one chunk at a time, so memory stays constant over any range.
+"""
+
+import argparse
+import csv
+import json
+import sys
+from collections.abc import Iterator
+from datetime import date, datetime, timedelta, timezone
+from typing import TextIO
+
+from .const import RESOLUTION_OPTIONS
+from .pricing_data import (
+    PERIOD_KEYS,
+    TariffTable,
+    compile_tariff,
+    local_day_start,
+    to_local,
+)
+
+# Length of the range generated at once; a whole number of every resolution
+CHUNK = timedelta(days=7)
+
+FORMATS = ("csv", "jsonl")
+STEP_COLUMNS = ("time", "period", "price")
+SEGMENT_COLUMNS = ("start", "end", "period", "price")
+
+
+def iter_steps(tariff: TariffTable, start: datetime, end: datetime,
+               resolution: timedelta) -> Iterator[tuple]:
+    """Generate (time, period, price) for every step from start to end.
+
+    Times are local with a UTC offset, stepped in UTC as in the forecast.
+    """
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(chunk_start + CHUNK, end)
+        series = tariff.price_range(chunk_start, chunk_end, resolution)
+        # NumPy arrays and array.array both convert to plain Python lists
+        for ts, price, period in zip(
+            series.timestamps.tolist(), series.prices.tolist(), series.periods.tolist()
+        ):
+            time = to_local(datetime.fromtimestamp(ts, timezone.utc))
+            yield time.isoformat(), PERIOD_KEYS[period], round(price, 6)
+        chunk_start = chunk_end
+
+
+def iter_segments(tariff: TariffTable, start: datetime, end: datetime) -> Iterator[tuple]:
+    """Generate (start, end, period, price) for every run of equal prices.
+
+    Segments of consecutive chunks are merged, so the output does not
+    depend on the chunk length.
+    """
+    pending = None
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(chunk_start + CHUNK, end)
+        for segment_start, segment_end, season, period, price in tariff.segments(chunk_start, chunk_end):
+            segment = (f"{season}_{period}", price)
+            if pending is not None and pending[2:] == segment:
+                pending = (pending[0], segment_end, *segment)
+                continue
+            if pending is not None:
+                yield _segment_row(pending)
+            pending = (segment_start, segment_end, *segment)
+        chunk_start = chunk_end
+    if pending is not None:
+        yield _segment_row(pending)
+
+
+def _segment_row(segment: tuple) -> tuple:
+    """Format a segment as an output row."""
+    start, end, period, price = segment
+    return to_local(start).isoformat(), to_local(end).isoformat(), period, round(price, 6)
+
+
+def write_rows(rows: Iterator[tuple], columns: tuple, output: TextIO, output_format: str) -> int:
+    """Write rows as CSV with a header or as JSON lines.
+
+    Returns:
+        Number of rows written
+    """
+    count = 0
+    if output_format == "csv":
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in rows:
+            output.write(json.dumps(dict(zip(columns, row))) + "\n")
+            count += 1
+    return count
+
+
+def _parse_args(argv):
+    """Parse the command line."""
+    parser = argparse.ArgumentParser(
+        prog="vattenfall_tijdprijs",
+        description="Generate the Vattenfall Tijdprijs price and period series for a date range.",
+    )
+    parser.add_argument("--start", type=date.fromisoformat, required=True,
+                        help="first local day, YYYY-MM-DD")
+    parser.add_argument("--end", type=date.fromisoformat, required=True,
+                        help="local day after the last one, YYYY-MM-DD")
+    parser.add_argument("--config", type=argparse.FileType("r", encoding="utf-8"),
+                        help="JSON file with the rates, as in the entry options")
+    parser.add_argument("--resolution", type=int, choices=RESOLUTION_OPTIONS, default=60,
+                        help="minutes per step (default 60)")
+    parser.add_argument("--segments", action="store_true",
+                        help="one row per run of equal prices instead of per step")
+    parser.add_argument("--format", choices=FORMATS, default="csv", dest="output_format")
+    args = parser.parse_args(argv)
+    if args.end <= args.start:
+        parser.error("--end must be after --start")
+    return args
+
+
+def main(argv: list[str] | None = None, output: TextIO | None = None) -> int:
+    """Write the series selected on the command line to output (stdout)."""
+    args = _parse_args(argv)
+    output = output or sys.stdout
+    config = {}
+    if args.config is not None:
+        with args.config:
+            config = json.load(args.config)
+
+    tariff = compile_tariff(config)
+    start = local_day_start(args.start)
+    end = local_day_start(args.end)
+    if args.segments:
+        rows, columns = iter_segments(tariff, start, end), SEGMENT_COLUMNS
+    else:
+        rows = iter_steps(tariff, start, end, timedelta(minutes=args.resolution))
+        columns = STEP_COLUMNS
+    write_rows(rows, columns, output, args.output_format)
+    return 0
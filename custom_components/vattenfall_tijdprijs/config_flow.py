@@ -5,20 +5,52 @@
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.core import callback
+from homeassistant.helpers import selector
 
 from .const import (
+    CONF_BELASTING,
+    CONF_COST_SOURCE,
     CONF_EXPORT_COMPENSATION,
     CONF_EXPORT_COSTS,
     CONF_FIXED_DELIVERY,
     CONF_FIXED_GRID,
     CONF_FIXED_TAX_REDUCTION,
+    CONF_FORECAST_LISTS,
+    CONF_FORECAST_SEGMENTS,
+    CONF_RATE_HISTORY,
+    CONF_RESOLUTION,
+    CONF_VALID_FROM,
     DEFAULT_EXPORT_COMPENSATION,
     DEFAULT_EXPORT_COSTS,
     DEFAULT_FIXED_DELIVERY,
     DEFAULT_FIXED_GRID,
     DEFAULT_FIXED_TAX_REDUCTION,
+    DEFAULT_FORECAST_LISTS,
+    DEFAULT_FORECAST_SEGMENTS,
+    DEFAULT_RESOLUTION,
     DOMAIN,
+    RESOLUTION_OPTIONS,
 )
+from .pricing_data import (
+    BELASTING,
+    DEFAULT_LEVERING_PRICES,
+    LEVERING_CONFIG_KEYS,
+    add_rate_change,
+)
+
+# Option fields with their defaults, in form order
+OPTION_DEFAULTS = {
+    CONF_FIXED_DELIVERY: DEFAULT_FIXED_DELIVERY,
+    CONF_FIXED_TAX_REDUCTION: DEFAULT_FIXED_TAX_REDUCTION,
+    CONF_FIXED_GRID: DEFAULT_FIXED_GRID,
+    CONF_EXPORT_COMPENSATION: DEFAULT_EXPORT_COMPENSATION,
+    CONF_EXPORT_COSTS: DEFAULT_EXPORT_COSTS,
+    **{
+        config_key: DEFAULT_LEVERING_PRICES[config_key.removesuffix("_levering")]
+        for config_key in LEVERING_CONFIG_KEYS
+    },
+    CONF_BELASTING: BELASTING,
+}
 
 
 class VattenfallConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -26,6 +58,12 @@ class VattenfallConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Get the options flow for this handler."""
+        return VattenfallOptionsFlow(config_entry)
+
     async def async_step_user(self, user_input=None):
         """Handle the initial step - creates entry with all defaults."""
         if user_input is not None:
@@ -44,6 +82,13 @@ class VattenfallConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 CONF_EXPORT_COSTS: user_input.get(
                     CONF_EXPORT_COSTS, DEFAULT_EXPORT_COSTS
                 ),
+                CONF_RESOLUTION: user_input.get(CONF_RESOLUTION, DEFAULT_RESOLUTION),
+                CONF_FORECAST_LISTS: user_input.get(
+                    CONF_FORECAST_LISTS, DEFAULT_FORECAST_LISTS
+                ),
+                CONF_FORECAST_SEGMENTS: user_input.get(
+                    CONF_FORECAST_SEGMENTS, DEFAULT_FORECAST_SEGMENTS
+                ),
             }
 
             return self.async_create_entry(
@@ -54,5 +99,71 @@ class VattenfallConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         # Show simple form - all fields optional, will use defaults if not provided
         return self.async_show_form(
             step_id="user",
-            data_schema=vol.Schema({}),
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_RESOLUTION, default=DEFAULT_RESOLUTION
+                    ): vol.In(RESOLUTION_OPTIONS),
+                    vol.Optional(
+                        CONF_FORECAST_LISTS, default=DEFAULT_FORECAST_LISTS
+                    ): bool,
+                    vol.Optional(
+                        CONF_FORECAST_SEGMENTS, default=DEFAULT_FORECAST_SEGMENTS
+                    ): bool,
+                }
+            ),
+        )
+
+
+class VattenfallOptionsFlow(config_entries.OptionsFlow):
+    """Edit the fixed costs, export terms and levering prices of an entry.
+
+    The new values are applied to the running entry by its update listener,
+    without reloading the integration. With a 'valid from' date the new
+    levering prices and energy tax only apply from that date; the rates
+    they replace are kept in the rate history for the time before it.
+    Choosing or clearing the cost source reloads the entry, as it adds or
+    removes the cost sensor.
+    """
+
+    def __init__(self, config_entry):
+        """Initialize the flow for an entry.
+
+        Home Assistant only sets config_entry on options flows itself from
+        2024.11, so the entry is kept here for older versions.
+        """
+        self._entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        """Show the rates, prefilled with the current values."""
+        current = {**self._entry.data, **self._entry.options}
+        if user_input is not None:
+            options = dict(user_input)
+            valid_from = options.pop(CONF_VALID_FROM, None)
+            if valid_from:
+                history = add_rate_change(current, valid_from)
+            else:
+                history = current.get(CONF_RATE_HISTORY)
+            if history:
+                options[CONF_RATE_HISTORY] = history
+            return self.async_create_entry(title="", data=options)
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    **{
+                        vol.Required(key, default=current.get(key, default)): vol.Coerce(float)
+                        for key, default in OPTION_DEFAULTS.items()
+                    },
+                    # Returns YYYY-MM-DD, as taken by add_rate_change
+                    vol.Optional(CONF_VALID_FROM): selector.DateSelector(),
+                    vol.Optional(
+                        CONF_COST_SOURCE,
+                        description={"suggested_value": current.get(CONF_COST_SOURCE)},
+                    ): selector.EntitySelector(
+                        selector.EntitySelectorConfig(domain="sensor")
+                    ),
+                }
+            ),
         )
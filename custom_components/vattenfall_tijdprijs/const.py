@@ -22,6 +22,75 @@ DEFAULT_FIXED_GRID = 1.303654
 DEFAULT_EXPORT_COMPENSATION = -0.134000
 DEFAULT_EXPORT_COSTS = 0.055781
 
+# Energy tax in €/kWh; defaults to BELASTING in pricing_data
+CONF_BELASTING = "belasting"
+
+# Earlier rates: a list of rate sets, each valid until a local date (exclusive)
+CONF_RATE_HISTORY = "rate_history"
+CONF_VALID_UNTIL = "valid_until"
+
+# Options field: local date from which the entered rates apply
+CONF_VALID_FROM = "valid_from"
+
+# Options field: power or energy sensor whose cost is summed by the cost sensor
+CONF_COST_SOURCE = "cost_source"
+
+# Minimum number of seconds between two state writes of the cost and energy sensors
+COST_WRITE_INTERVAL = 60
+
+# Storage of the meter totals: version and seconds a change may wait to be saved
+METER_STORAGE_VERSION = 1
+METER_SAVE_DELAY = 300
+
+# Time zone the tariff periods are defined in
+TIME_ZONE = "Europe/Amsterdam"
+
+# Number of hours in the price forecast
+FORECAST_HOURS = 48
+
+# Forecast resolution in minutes
+CONF_RESOLUTION = "resolution"
+DEFAULT_RESOLUTION = 60
+RESOLUTION_OPTIONS = [60, 15]
+
+# Per-entry forecast lists, derived from the forecast segments on request
+CONF_FORECAST_LISTS = "forecast_lists"
+DEFAULT_FORECAST_LISTS = False
+FORECAST_LIST_ATTRIBUTES = ("hourly_prices", "apexcharts_data", "apexcharts_data_colored")
+
+# Forecast segments as a sensor attribute; new entries only get the summary
+# and read the segments through the get_forecast service
+CONF_FORECAST_SEGMENTS = "forecast_segments"
+DEFAULT_FORECAST_SEGMENTS = False
+
+# Forecast attributes that are excluded from the recorder
+FORECAST_ATTRIBUTES = ("segments",) + FORECAST_LIST_ATTRIBUTES
+
+# Longest forecast returned by the get_forecast service, in hours
+FORECAST_MAX_HOURS = 24 * 366
+
+# Services and their fields
+SERVICE_FIND_CHEAPEST_WINDOW = "find_cheapest_window"
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_DURATION = "duration"
+ATTR_LATEST_END = "latest_end"
+ATTR_ALLOWED_PERIODS = "allowed_periods"
+SERVICE_GET_FORECAST = "get_forecast"
+ATTR_START = "start"
+ATTR_HOURS = "hours"
+ATTR_RESOLUTION = "resolution"
+
+# Websocket command streaming the forecast segments
+WS_TYPE_SUBSCRIBE_FORECAST = f"{DOMAIN}/forecast/subscribe"
+
+# Long-term statistics import: days imported on first run and daily import time
+STATISTICS_BACKFILL_DAYS = 365
+STATISTICS_IMPORT_HOUR = 0
+STATISTICS_IMPORT_MINUTE = 5
+
+# Number of update timings kept for the latency percentiles
+STATS_SAMPLES = 500
+
 # Unit constants
 DEFAULT_UNIT_PRICE = "€/kWh"
 DEFAULT_UNIT_FIXED = "€/dag"
@@ -0,0 +1,165 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Update coordinator shared by the price sensors of a config entry."""
+
+import logging
+import time
+from datetime import datetime, timedelta
+
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+
+from .const import (
+    CONF_FORECAST_LISTS,
+    CONF_FORECAST_SEGMENTS,
+    CONF_RESOLUTION,
+    DEFAULT_RESOLUTION,
+    DOMAIN,
+    FORECAST_HOURS,
+)
+from .forecast import acquire_window, floor_time, release_window, window_references
+from .instrumentation import UpdateStats
+from .pricing_data import (
+    LOCAL_TZ,
+    compile_tariff,
+    local_day_start,
+    tariff_cache_info,
+    to_utc,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def entry_config(entry) -> dict:
+    """Get the configuration of an entry with its options applied."""
+    return {**entry.data, **entry.options}
+
+
+class VattenfallPriceCoordinator(DataUpdateCoordinator):
+    """Compute the current price and forecast once per tick for all sensors.
+
+    Refreshes are not polled: after every refresh a timer is set for the
+    start of the next forecast slot (a whole hour or quarter hour), where the
+    forecast window rolls and any tariff change takes effect. The timer
+    fires once per boundary, never before it, and also runs when polling
+    is disabled for the entry.
+
+    The forecast window is taken from a process-wide registry, so entries
+    with the same rates share it and only the first refresh of a slot
+    computes it. The coordinator holds a reference until async_shutdown.
+    """
+
+    def __init__(self, hass, config_data):
+        """Initialize the coordinator."""
+        super().__init__(hass, _LOGGER, name=DOMAIN, update_interval=None)
+        self.config_data = config_data
+        self.tariff = compile_tariff(config_data)
+        self.resolution = timedelta(
+            minutes=int(config_data.get(CONF_RESOLUTION, DEFAULT_RESOLUTION))
+        )
+        self.forecast = acquire_window(self.tariff, FORECAST_HOURS, self.resolution)
+        # Entries created before the segment format keep the per-entry lists
+        self.forecast_lists = bool(config_data.get(CONF_FORECAST_LISTS, True))
+        # Entries created before the get_forecast service keep the segments
+        self.forecast_segments = bool(config_data.get(CONF_FORECAST_SEGMENTS, True))
+        self.stats = UpdateStats(_LOGGER)
+        self._shutdown_listeners = []
+        self._cancel_slot_timer = None
+
+    async def _async_update_data(self):
+        """Compute the price data and schedule the next refresh."""
+        now = datetime.now(LOCAL_TZ)
+        self._schedule_next_slot(now)
+        if not self.stats.enabled:
+            return self._compute(now)
+
+        started = time.perf_counter()
+        data = self._compute(now)
+        self.stats.record_update(time.perf_counter() - started)
+        _LOGGER.debug("Update statistics: %s", self.stats_summary())
+        return data
+
+    def async_apply_config(self, config_data: dict) -> datetime:
+        """Recompile the tariff for new rates and push them to the entities.
+
+        The coordinator moves to the forecast window for the new rates, which
+        other entries may keep using for the old ones, and all listeners get
+        the recomputed data at once; no entity is recreated.
+
+        Returns:
+            Time from which prices may have changed: now, or the start of
+            the earliest new rate change when that lies in the past
+        """
+        now = datetime.now(LOCAL_TZ)
+        changes = set(compile_tariff(config_data).change_dates) - set(self.tariff.change_dates)
+        changed_from = min([local_day_start(day) for day in changes], default=now)
+
+        self.config_data = config_data
+        self.tariff = compile_tariff(config_data)
+        forecast = acquire_window(self.tariff, FORECAST_HOURS, self.resolution)
+        release_window(self.forecast)
+        self.forecast = forecast
+        self._schedule_next_slot(now)
+        self.async_set_updated_data(self._compute(now))
+        return min(changed_from, now)
+
+    @callback
+    def async_add_shutdown_listener(self, shutdown_callback):
+        """Call back on shutdown; returns a function removing the listener.
+
+        Listeners that outlive an entry, like websocket subscriptions, use
+        this to end when the entry is unloaded or reloaded.
+        """
+        self._shutdown_listeners.append(shutdown_callback)
+        return lambda: self._shutdown_listeners.remove(shutdown_callback)
+
+    async def async_shutdown(self):
+        """Stop the coordinator and release the shared forecast window."""
+        await super().async_shutdown()
+        if self._cancel_slot_timer is not None:
+            self._cancel_slot_timer()
+            self._cancel_slot_timer = None
+        release_window(self.forecast)
+        for shutdown_callback in list(self._shutdown_listeners):
+            shutdown_callback()
+
+    def _schedule_next_slot(self, now: datetime):
+        """Set the refresh timer to the start of the next forecast slot."""
+        if self._cancel_slot_timer is not None:
+            self._cancel_slot_timer()
+        next_update = floor_time(to_utc(now), self.resolution) + self.resolution
+        self._cancel_slot_timer = async_track_point_in_utc_time(
+            self.hass, self._async_slot_started, next_update
+        )
+
+    async def _async_slot_started(self, _now: datetime):
+        """Refresh at the start of a forecast slot."""
+        self._cancel_slot_timer = None
+        await self.async_refresh()
+
+    def stats_summary(self) -> dict:
+        """Return the update instrumentation counters."""
+        return self.stats.summary(
+            self.forecast, tariff_cache_info(), window_references(self.forecast)
+        )
+
+    def _compute(self, now: datetime) -> dict:
+        """Compute current price, forecast and derived statistics for now."""
+        season, period, price = self.tariff.lookup(now)
+        self.forecast.update(now)
+
+        export_price = round(self.tariff.export_price, 6)
+        data = {
+            "time": now,
+            "season": season,
+            "period": period,
+            "price": round(price, 6),
+            "export_price": export_price,
+            "spread": round(round(price, 6) + export_price, 6),
+            "next_change": self.forecast.next_change(now),
+            "forecast_version": self.forecast.version,
+            # Shared with the previous tick when the window has not moved
+            **self.forecast.payload(self.forecast_lists),
+        }
+        return data
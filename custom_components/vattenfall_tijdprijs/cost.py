@@ -0,0 +1,204 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Running cost and energy per tariff period of a power or energy sensor."""
+
+from datetime import date, datetime, timedelta
+
+from .pricing_data import PERIOD_KEYS, TariffTable, local_day_start, to_local, to_utc
+
+# Factors to kW and kWh for the supported source units
+POWER_UNITS = {"W": 0.001, "kW": 1.0}
+ENERGY_UNITS = {"Wh": 0.001, "kWh": 1.0, "MWh": 1000.0}
+
+_SECONDS_PER_HOUR = 3600
+
+
+class CostIntegrator:
+    """Sum the cost of a metered sensor and its imported energy per tariff period.
+
+    The cost and energy are kept for today and this month; the energy per
+    period of DEFAULT_LEVERING_PRICES is a running total, like a utility
+    meter with one tariff per period.
+
+    A power source is integrated with the left Riemann sum: the power of a
+    reading holds until the next one. The energy between two readings of an
+    energy meter is spread evenly over their interval. Either way the
+    interval is split exactly where the price or the local day changes.
+    Times are taken in UTC, so an interval over a DST change counts its
+    real length rather than its wall-clock length.
+
+    The price and the end of the current tariff segment are cached, so a
+    reading inside the segment costs O(1); only the first reading past a
+    boundary looks up the next segment. Imported energy is priced with the
+    tariff, exported (negative) energy with the export price. The fixed
+    daily costs are added in full when a day starts.
+    """
+
+    def __init__(self, tariff: TariffTable, fixed_daily: float):
+        """Initialize the integrator without totals."""
+        self.tariff = tariff
+        self.fixed_daily = fixed_daily
+        self.day = None
+        self.today_cost = 0.0
+        self.month_cost = 0.0
+        self.today_kwh = 0.0
+        self.month_kwh = 0.0
+        self.period_kwh = dict.fromkeys(PERIOD_KEYS, 0.0)
+        self._time = None
+        self._power = None
+        self._energy = None
+        self._price = 0.0
+        self._period = None
+        self._segment_end = None
+        self._day_end = None
+
+    def as_dict(self) -> dict:
+        """Get the totals, and the last meter reading, for storage."""
+        return {
+            "day": self.day.isoformat() if self.day else None,
+            "today_cost": self.today_cost,
+            "month_cost": self.month_cost,
+            "today_kwh": self.today_kwh,
+            "month_kwh": self.month_kwh,
+            "period_kwh": dict(self.period_kwh),
+            "time": self._time.isoformat() if self._energy is not None else None,
+            "energy": self._energy,
+        }
+
+    def restore(self, data: dict):
+        """Continue from totals saved by as_dict on an earlier day or run.
+
+        Totals of an earlier day or month are reset by the first reading
+        that falls past them. The energy a meter counted while stopped is
+        spread over the time since its last saved reading.
+        """
+        for period_key, kwh in data.get("period_kwh", {}).items():
+            if period_key in self.period_kwh:
+                self.period_kwh[period_key] = float(kwh)
+        if data.get("day"):
+            self.day = date.fromisoformat(data["day"])
+            self.today_cost = float(data["today_cost"])
+            self.month_cost = float(data["month_cost"])
+            self.today_kwh = float(data["today_kwh"])
+            self.month_kwh = float(data["month_kwh"])
+            self._day_end = local_day_start(self.day + timedelta(days=1))
+        if data.get("energy") is not None:
+            self._time = to_utc(datetime.fromisoformat(data["time"]))
+            self._energy = float(data["energy"])
+        self._segment_end = None
+
+    def set_tariff(self, tariff: TariffTable, fixed_daily: float):
+        """Price energy from now on with new rates.
+
+        A new fixed daily cost applies from the next day on.
+        """
+        self.tariff = tariff
+        self.fixed_daily = fixed_daily
+        self._segment_end = None
+
+    def add_reading(self, time: datetime, value: float, unit: str) -> bool:
+        """Add a power (W, kW) or meter (Wh, kWh, MWh) reading.
+
+        Args:
+            time: Aware time of the reading
+            value: Power or meter value in the given unit
+            unit: Unit of measurement of the source
+
+        Returns:
+            False when the unit is not supported and the reading is ignored
+        """
+        time = to_utc(time)
+        if self._time is not None and time < self._time:
+            time = self._time
+        if unit in POWER_UNITS:
+            if self._power is not None:
+                self._integrate(self._time, time, self._power)
+            self._power = value * POWER_UNITS[unit]
+            self._energy = None
+        elif unit in ENERGY_UNITS:
+            kwh = value * ENERGY_UNITS[unit]
+            if self._energy is not None:
+                delta = kwh - self._energy
+                # A meter that went back was reset and counts from zero
+                self._spread(self._time, time, delta if delta >= 0 else kwh)
+            self._energy = kwh
+            self._power = None
+        else:
+            return False
+        self._time = time
+        self._roll(time)
+        return True
+
+    def advance(self, time: datetime):
+        """Bring the totals up to a time without a new reading.
+
+        The power of the last reading is integrated up to the time, and a
+        new day starts when the time has passed midnight.
+        """
+        time = to_utc(time)
+        if self._time is not None and time < self._time:
+            return
+        if self._power is not None:
+            self._integrate(self._time, time, self._power)
+            self._time = time
+        self._roll(time)
+
+    def interrupt(self, time: datetime):
+        """Stop integrating at a time, when the source became unavailable.
+
+        The next reading starts a new interval; the gap is not counted.
+        """
+        self.advance(time)
+        self._time = None
+        self._power = None
+        self._energy = None
+
+    def _spread(self, start: datetime, end: datetime, kwh: float):
+        """Add energy measured over an interval, spread evenly over it."""
+        hours = (end - start).total_seconds() / _SECONDS_PER_HOUR
+        if hours <= 0:
+            self._roll(end)
+            self._add(kwh)
+            return
+        self._integrate(start, end, kwh / hours)
+
+    def _integrate(self, start: datetime, end: datetime, kw: float):
+        """Add a constant power over an interval, split at tariff changes."""
+        while start < end:
+            self._roll(start)
+            stop = min(end, self._segment_end)
+            self._add(kw * (stop - start).total_seconds() / _SECONDS_PER_HOUR)
+            start = stop
+
+    def _add(self, kwh: float):
+        """Add energy at the price and period of the current segment."""
+        if kwh >= 0:
+            cost = kwh * self._price
+            self.period_kwh[self._period] += kwh
+        else:
+            cost = -kwh * self.tariff.export_price
+        self.today_cost += cost
+        self.month_cost += cost
+        self.today_kwh += kwh
+        self.month_kwh += kwh
+
+    def _roll(self, time: datetime):
+        """Move to the segment containing a time when it lies past the current one."""
+        if self._segment_end is not None and time < self._segment_end:
+            return
+        if self._day_end is None or time >= self._day_end:
+            self._start_day(to_local(time).date())
+        season, period, self._price = self.tariff.lookup(time)
+        self._period = f"{season}_{period}"
+        self._segment_end = min(self.tariff.next_change(time), self._day_end)
+
+    def _start_day(self, day: date):
+        """Reset the totals of today, and of the month when it changed."""
+        if self.day is None or (day.year, day.month) != (self.day.year, self.day.month):
+            self.month_cost = 0.0
+            self.month_kwh = 0.0
+        self.day = day
+        self.today_cost = self.fixed_daily
+        self.month_cost += self.fixed_daily
+        self.today_kwh = 0.0
+        self._day_end = local_day_start(day + timedelta(days=1))
@@ -0,0 +1,374 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Rolling price forecast window for the forecast sensor."""
+
+from bisect import bisect_left, insort
+from collections import deque
+from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import count
+
+from .pricing_data import TariffTable, to_local, to_utc
+
+# ApexCharts colors for low (at or below median) and high tariffs
+COLOR_LOW = "#27ae60"
+COLOR_HIGH = "#e74c3c"
+
+HOUR = timedelta(hours=1)
+
+# Forecast windows shared by entries with the same rates: key -> [window, references]
+_WINDOWS = {}
+
+# Window versions are unique over all windows, so a version identifies a payload
+_VERSIONS = count(1)
+
+
+def floor_time(dt: datetime, resolution: timedelta) -> datetime:
+    """Round a datetime down to a resolution that divides an hour."""
+    minutes = int(resolution.total_seconds()) // 60
+    return dt.replace(minute=dt.minute - dt.minute % minutes, second=0, microsecond=0)
+
+
+def _segment(
+    start: datetime, end: datetime, season: str, period: str, price: float, export_price: float
+) -> dict:
+    """Format one forecast segment in local time.
+
+    'spread' is what a kWh used directly is worth more than exporting it:
+    the import price saved minus the export credit given up.
+    """
+    return {
+        "start": to_local(start).isoformat(),
+        "end": to_local(end).isoformat(),
+        "price": price,
+        "export_price": export_price,
+        "spread": round(price + export_price, 6),
+        "period": period,
+        "season": season,
+    }
+
+
+def _colored_point(entry: dict, median_price: float) -> dict:
+    """Format a forecast entry as a colored ApexCharts point."""
+    price = entry["price"]
+    # Color: green for low tariffs, red for high tariffs
+    return {
+        "x": entry["time"],
+        "y": price,
+        "fillColor": COLOR_LOW if price <= median_price else COLOR_HIGH,
+    }
+
+
+class ForecastWindow:
+    """Price forecast that rolls forward one slot at a time.
+
+    The window is kept as run-length segments that end exactly at the tariff
+    boundaries, so a 48-hour window holds only about 6-10 segments. When the
+    clock advances by exactly one slot the first segment loses its head and
+    the last one grows (or a new segment is appended); the median over all
+    slots is kept up to date with a sorted price list. Any other clock
+    change rebuilds the whole window. The tariff of a window is fixed, as
+    it keys the shared registry; new rates get their own window from
+    acquire_window. Every segment also carries the net export price and the
+    import/export spread, formatted in the same pass.
+
+    Aware times are kept in UTC and only shown in local time, so every slot
+    is exactly one resolution long, also on DST nights.
+
+    The per-entry lists for ApexCharts are only derived from the segments
+    when they are read, and cached until the window changes. With hourly
+    resolution they hold one entry per hour; with a finer resolution one
+    entry per segment that also carries its 'end'.
+
+    'version' changes with the window. The attribute payload is built once
+    per version and shared by every read until the window moves again, so
+    repeated updates within a slot neither copy the lists nor format any
+    timestamp again.
+    """
+
+    def __init__(self, tariff: TariffTable, hours: int, resolution: timedelta = HOUR):
+        """Initialize an empty window."""
+        if resolution <= timedelta(0) or HOUR % resolution:
+            raise ValueError("resolution must divide an hour")
+        self.tariff = tariff
+        self.hours = hours
+        self.resolution = resolution
+        self.compact = resolution < HOUR
+        self.start = None
+        self.median_price = None
+        self.version = 0
+        self.rebuilds = 0
+        self.rolls = 0
+        self.payload_reads = 0
+        self.payload_builds = 0
+        self._spans = deque()
+        self._segments = deque()
+        self._sorted_prices = []
+        self._lists = None
+        self._payloads = {}
+        self._next_change = None
+
+    def update(self, now: datetime) -> bool:
+        """Move the window so that it starts at the slot containing now.
+
+        Returns:
+            True if the window changed
+        """
+        start = floor_time(to_utc(now), self.resolution)
+        if start == self.start:
+            return False
+
+        if self.start is not None and start == self.start + self.resolution:
+            self._roll()
+        else:
+            self._rebuild(start)
+        self.start = start
+        self.version = next(_VERSIONS)
+        self._lists = None
+        self._payloads = {}
+        self._next_change = None
+        return True
+
+    def next_change(self, now: datetime) -> datetime:
+        """Return the next price change after now, a time in the current slot.
+
+        Tariffs and rates change on whole hours, never inside a slot, so the
+        result is the same for every time in the slot and computed once per
+        window.
+        """
+        if self._next_change is None:
+            self._next_change = self.tariff.next_change(now)
+        return self._next_change
+
+    def payload(self, lists: bool = False) -> dict:
+        """Return the forecast attributes of the current window.
+
+        The payload and its lists are shared until the window changes and
+        must not be mutated.
+
+        Args:
+            lists: include the per-entry and ApexCharts lists
+        """
+        self.payload_reads += 1
+        payload = self._payloads.get(lists)
+        if payload is None:
+            self.payload_builds += 1
+            payload = {
+                "segments": list(self._segments),
+                "median_price": round(self.median_price, 6),
+                "min_price": self._sorted_prices[0],
+                "max_price": self._sorted_prices[-1],
+            }
+            if lists:
+                entries, points, colored = self._derived_lists()
+                payload["hourly_prices"] = entries
+                payload["apexcharts_data"] = points
+                payload["apexcharts_data_colored"] = colored
+            self._payloads[lists] = payload
+        return payload
+
+    @property
+    def segments(self) -> list:
+        """Return the forecast segments as a new list."""
+        return list(self._segments)
+
+    @property
+    def hourly_prices(self) -> list:
+        """Return the forecast entries as a new list."""
+        return list(self._derived_lists()[0])
+
+    @property
+    def apexcharts_data(self) -> list:
+        """Return the [timestamp, price] pairs for ApexCharts as a new list."""
+        return list(self._derived_lists()[1])
+
+    @property
+    def apexcharts_data_colored(self) -> list:
+        """Return the colored ApexCharts points as a new list."""
+        return list(self._derived_lists()[2])
+
+    def _rebuild(self, start: datetime):
+        """Recompute every segment of the window."""
+        self.rebuilds += 1
+        self._spans.clear()
+        self._segments.clear()
+        self._sorted_prices = []
+
+        end = start + timedelta(hours=self.hours)
+        export_price = round(self.tariff.export_price, 6)
+        for segment_start, segment_end, season, period, price in self.tariff.segments(start, end):
+            price = round(price, 6)
+            self._spans.append((segment_start, segment_end))
+            self._segments.append(
+                _segment(segment_start, segment_end, season, period, price, export_price)
+            )
+            self._sorted_prices.extend([price] * self._slots(segment_start, segment_end))
+
+        self._sorted_prices.sort()
+        self.median_price = self._median()
+
+    def _roll(self):
+        """Drop the expired slot and append the next one."""
+        self.rolls += 1
+        new_start = self.start + self.resolution
+        old_end = self.start + timedelta(hours=self.hours)
+        new_end = old_end + self.resolution
+
+        # Drop the first slot; a longer first segment only loses its head
+        first = self._segments[0]
+        del self._sorted_prices[bisect_left(self._sorted_prices, first["price"])]
+        first_end = self._spans[0][1]
+        if first_end <= new_start:
+            self._spans.popleft()
+            self._segments.popleft()
+        else:
+            self._replace(0, new_start, first_end, first)
+
+        # Append the new slot, extending the last segment when it continues
+        season, period, price = self.tariff.lookup(old_end)
+        price = round(price, 6)
+        last = self._segments[-1] if self._segments else None
+        if last is not None and (last["price"], last["period"], last["season"]) == (price, period, season):
+            self._replace(-1, self._spans[-1][0], new_end, last)
+        else:
+            self._spans.append((old_end, new_end))
+            self._segments.append(_segment(
+                old_end, new_end, season, period, price, round(self.tariff.export_price, 6)
+            ))
+        insort(self._sorted_prices, price)
+
+        self.median_price = self._median()
+
+    def _replace(self, index: int, start: datetime, end: datetime, segment: dict):
+        """Replace a segment with a copy covering a new span.
+
+        Published lists share segment objects, so segments are never mutated.
+        """
+        self._spans[index] = (start, end)
+        self._segments[index] = _segment(
+            start, end, segment["season"], segment["period"], segment["price"], segment["export_price"]
+        )
+
+    def _slots(self, start: datetime, end: datetime) -> int:
+        """Return the number of slots between two datetimes."""
+        return (end - start) // self.resolution
+
+    def _median(self) -> float:
+        """Return the median price over all slots of the window."""
+        return self._sorted_prices[len(self._sorted_prices) // 2]
+
+    def _derived_lists(self) -> tuple:
+        """Derive and cache the entry and ApexCharts lists from the segments."""
+        if self._lists is None:
+            entries = []
+            for (start, end), segment in zip(self._spans, self._segments):
+                step = end - start if self.compact else HOUR
+                for offset in range((end - start) // step):
+                    entry_start = to_local(start + offset * step)
+                    entry = {
+                        "time": entry_start.isoformat(),
+                        "hour": entry_start.hour,
+                        "price": segment["price"],
+                        "period": segment["period"],
+                        "season": segment["season"],
+                    }
+                    if self.compact:
+                        entry["end"] = segment["end"]
+                    entries.append(entry)
+            self._lists = (
+                entries,
+                [[entry["time"], entry["price"]] for entry in entries],
+                [_colored_point(entry, self.median_price) for entry in entries],
+            )
+        return self._lists
+
+
+def segment_delta(old: list, new: list) -> dict | None:
+    """Get the splice that turns an old list of forecast segments into a new one.
+
+    The longest run of segments found in both lists is kept. The receiver
+    drops 'drop_head' segments before it and 'drop_tail' after it, then puts
+    'head' in front of it and 'tail' behind it. A roll of the window thus
+    sends only the changed first and last segments. The lists are about ten
+    segments long, so the plain search is cheap.
+
+    Returns:
+        The splice, or None when no segment is kept, e.g. after a repricing
+    """
+    length, old_index, new_index = 0, 0, 0
+    for i in range(len(old)):
+        for j in range(len(new)):
+            run = 0
+            while i + run < len(old) and j + run < len(new) and old[i + run] == new[j + run]:
+                run += 1
+            if run > length:
+                length, old_index, new_index = run, i, j
+    if not length:
+        return None
+    return {
+        "drop_head": old_index,
+        "head": new[:new_index],
+        "drop_tail": len(old) - old_index - length,
+        "tail": new[new_index + length:],
+    }
+
+
+def forecast_range(
+    tariff: TariffTable, start: datetime, hours: int, resolution: timedelta = HOUR
+) -> dict:
+    """Compute the forecast for any window, from the slot containing start.
+
+    Results are memoized per tariff and window. Compiled tariffs are shared
+    per configuration, so repeated requests for the same rates within a slot
+    return the same result without computing it again. The result is shared
+    and must not be mutated.
+    """
+    return _forecast_range(tariff, floor_time(to_utc(start), resolution), hours, resolution)
+
+
+@lru_cache(maxsize=64)
+def _forecast_range(tariff: TariffTable, start: datetime, hours: int, resolution: timedelta) -> dict:
+    """Compute and cache the forecast of one window."""
+    window = ForecastWindow(tariff, hours, resolution)
+    window.update(start)
+    return {
+        "start": to_local(start).isoformat(),
+        "end": to_local(start + timedelta(hours=hours)).isoformat(),
+        "resolution": int(resolution.total_seconds()) // 60,
+        **window.payload(),
+    }
+
+
+def _window_key(tariff: TariffTable, hours: int, resolution: timedelta) -> tuple:
+    """Get the registry key of a forecast window."""
+    return tariff.key, hours, resolution
+
+
+def acquire_window(tariff: TariffTable, hours: int, resolution: timedelta = HOUR) -> ForecastWindow:
+    """Get the shared forecast window for a tariff and take a reference to it.
+
+    Entries with the same rates, forecast length and resolution share one
+    window, so its segments and payload are computed once per slot however
+    many entries use it. Every call must be paired with release_window.
+    """
+    key = _window_key(tariff, hours, resolution)
+    shared = _WINDOWS.get(key)
+    if shared is None:
+        shared = _WINDOWS[key] = [ForecastWindow(tariff, hours, resolution), 0]
+    shared[1] += 1
+    return shared[0]
+
+
+def release_window(window: ForecastWindow):
+    """Drop a reference to a shared window; the last one removes the window."""
+    key = _window_key(window.tariff, window.hours, window.resolution)
+    shared = _WINDOWS[key]
+    shared[1] -= 1
+    if not shared[1]:
+        del _WINDOWS[key]
+
+
+def window_references(window: ForecastWindow) -> int:
+    """Get the number of entries sharing a forecast window."""
+    shared = _WINDOWS.get(_window_key(window.tariff, window.hours, window.resolution))
+    return shared[1] if shared is not None and shared[0] is window else 0
@@ -0,0 +1,82 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Optional timing and payload-size instrumentation of the updates."""
+
+import logging
+from collections import deque
+
+from .const import STATS_SAMPLES
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    """Get a nearest-rank percentile from a sorted list."""
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class UpdateStats:
+    """Counters for the coordinator updates and the state writes they cause.
+
+    Collection is off unless a diagnostics sensor is subscribed or debug
+    logging is enabled for the integration; while off, callers only pay
+    for the 'enabled' check.
+    """
+
+    def __init__(self, logger: logging.Logger, samples: int = STATS_SAMPLES):
+        """Initialize empty counters."""
+        self.logger = logger
+        self.subscribers = 0
+        self.updates = 0
+        self.latencies = deque(maxlen=samples)
+        self.payload_bytes = {}
+        self.state_writes = {}
+
+    @property
+    def enabled(self) -> bool:
+        """Return whether updates should be measured."""
+        return self.subscribers > 0 or self.logger.isEnabledFor(logging.DEBUG)
+
+    def record_update(self, seconds: float):
+        """Record the duration of one coordinator update."""
+        self.updates += 1
+        self.latencies.append(seconds)
+
+    def record_state_write(self, name: str, payload: str):
+        """Record the serialized attribute size of one state write."""
+        self.state_writes[name] = self.state_writes.get(name, 0) + 1
+        self.payload_bytes[name] = len(payload)
+
+    def latency_percentiles(self) -> dict:
+        """Return the p50, p95 and p99 update latency in milliseconds."""
+        if not self.latencies:
+            return {"p50": None, "p95": None, "p99": None}
+        ordered = sorted(self.latencies)
+        return {
+            name: round(_percentile(ordered, fraction) * 1000, 3)
+            for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+        }
+
+    def summary(self, forecast, tariff_cache, forecast_entries: int = 1) -> dict:
+        """Return all counters, including the forecast and tariff caches.
+
+        Args:
+            forecast: ForecastWindow of the coordinator
+            tariff_cache: cache_info() of the compiled tariff cache
+            forecast_entries: number of entries sharing the forecast window
+        """
+        payload_hits = forecast.payload_reads - forecast.payload_builds
+        tariff_lookups = tariff_cache.hits + tariff_cache.misses
+        return {
+            "updates": self.updates,
+            "latency_ms": self.latency_percentiles(),
+            "forecast_rebuilds": forecast.rebuilds,
+            "forecast_rolls": forecast.rolls,
+            "forecast_entries": forecast_entries,
+            "forecast_payload_hit_rate": (
+                round(payload_hits / forecast.payload_reads, 3) if forecast.payload_reads else None
+            ),
+            "tariff_cache_hit_rate": (
+                round(tariff_cache.hits / tariff_lookups, 3) if tariff_lookups else None
+            ),
+            "state_writes": dict(self.state_writes),
+            "payload_bytes": dict(self.payload_bytes),
+        }
@@ -0,0 +1,137 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Meter of the power or energy sensor shared by the cost and energy sensors."""
+
+import time
+
+from homeassistant.const import ATTR_UNIT_OF_MEASUREMENT
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later, async_track_state_change_event
+from homeassistant.helpers.storage import Store
+
+from .const import COST_WRITE_INTERVAL, DOMAIN, METER_SAVE_DELAY, METER_STORAGE_VERSION
+from .cost import CostIntegrator
+from .pricing_data import get_fixed_daily_cost
+
+
+def meter_store(hass, entry_id: str) -> Store:
+    """Get the storage of the meter totals of an entry."""
+    return Store(hass, METER_STORAGE_VERSION, f"{DOMAIN}.{entry_id}.meter")
+
+
+class SourceMeter:
+    """Follow a power or energy sensor and keep its totals for an entry.
+
+    Every state change of the source is added to a CostIntegrator in
+    memory. The entities listening to the meter are told at most once per
+    COST_WRITE_INTERVAL, and the totals are saved METER_SAVE_DELAY after
+    the first unsaved change, so a source reporting every second causes
+    one state write per interval and one save per delay. The coordinator
+    tick carries a steady power forward and applies changed rates.
+    """
+
+    def __init__(self, hass, coordinator, entry_id: str, source: str):
+        """Initialize the meter without totals."""
+        self.hass = hass
+        self.coordinator = coordinator
+        self.source = source
+        self.integrator = CostIntegrator(
+            coordinator.tariff, get_fixed_daily_cost(coordinator.config_data)
+        )
+        self._store = meter_store(hass, entry_id)
+        self._save_pending = False
+        self._listeners = []
+        self._unsubscribe = []
+        self._last_notify = None
+        self._cancel_notify = None
+
+    async def async_start(self):
+        """Restore the saved totals and follow the source."""
+        data = await self._store.async_load()
+        if data:
+            self.integrator.restore(data)
+        self._unsubscribe = [
+            async_track_state_change_event(self.hass, [self.source], self._handle_source_event),
+            self.coordinator.async_add_listener(self._handle_coordinator_update),
+        ]
+
+    async def async_stop(self):
+        """Stop following the source and save the totals."""
+        for unsubscribe in self._unsubscribe:
+            unsubscribe()
+        self._unsubscribe = []
+        if self._cancel_notify is not None:
+            self._cancel_notify()
+            self._cancel_notify = None
+        await self._store.async_save(self._data_to_save())
+
+    @callback
+    def async_add_listener(self, update_callback):
+        """Call back on changed totals; returns a function removing the listener."""
+        self._listeners.append(update_callback)
+        return lambda: self._listeners.remove(update_callback)
+
+    @callback
+    def _handle_source_event(self, event):
+        """Add a state change of the source to the totals."""
+        new_state = event.data["new_state"]
+        if new_state is None:
+            return
+        try:
+            value = float(new_state.state)
+        except ValueError:
+            # Unavailable or unknown: do not count the gap
+            self.integrator.interrupt(new_state.last_updated)
+            return
+        unit = new_state.attributes.get(ATTR_UNIT_OF_MEASUREMENT)
+        if self.integrator.add_reading(new_state.last_updated, value, unit):
+            self._changed()
+
+    @callback
+    def _handle_coordinator_update(self):
+        """Take over changed rates and carry the totals to the new slot.
+
+        Compiled tariffs are shared by configurations that only differ in
+        their fixed costs, so those are compared separately.
+        """
+        coordinator = self.coordinator
+        integrator = self.integrator
+        fixed_daily = get_fixed_daily_cost(coordinator.config_data)
+        if coordinator.tariff is not integrator.tariff or fixed_daily != integrator.fixed_daily:
+            integrator.set_tariff(coordinator.tariff, fixed_daily)
+        integrator.advance(coordinator.data["time"])
+        self._changed()
+
+    @callback
+    def _changed(self):
+        """Schedule a save and tell the listeners, both batched."""
+        if not self._save_pending:
+            self._save_pending = True
+            self._store.async_delay_save(self._data_to_save, METER_SAVE_DELAY)
+        if self._cancel_notify is not None:
+            return
+        now = time.monotonic()
+        if self._last_notify is None or now - self._last_notify >= COST_WRITE_INTERVAL:
+            self._notify()
+        else:
+            self._cancel_notify = async_call_later(
+                self.hass, self._last_notify + COST_WRITE_INTERVAL - now, self._notify_later
+            )
+
+    @callback
+    def _notify_later(self, _now):
+        """Tell the listeners about changes held back by the write interval."""
+        self._cancel_notify = None
+        self._notify()
+
+    @callback
+    def _notify(self):
+        """Tell the listeners about the current totals."""
+        self._last_notify = time.monotonic()
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    def _data_to_save(self) -> dict:
+        """Get the totals when the store writes them."""
+        self._save_pending = False
+        return self.integrator.as_dict()
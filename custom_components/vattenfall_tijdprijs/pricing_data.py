@@ -2,7 +2,37 @@
 
 """Pricing data for Vattenfall TijdPrijs with time-of-use periods."""
 
-from datetime import datetime, timedelta
+from array import array
+from bisect import bisect_right
+from collections import defaultdict
+from collections.abc import Iterable, Sequence
+from copy import deepcopy
+from datetime import date, datetime, timedelta, timezone
+from functools import cache, lru_cache
+from typing import NamedTuple
+from zoneinfo import ZoneInfo
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+from .const import (
+    CONF_BELASTING,
+    CONF_EXPORT_COMPENSATION,
+    CONF_EXPORT_COSTS,
+    CONF_FIXED_DELIVERY,
+    CONF_FIXED_GRID,
+    CONF_FIXED_TAX_REDUCTION,
+    CONF_RATE_HISTORY,
+    CONF_VALID_UNTIL,
+    DEFAULT_EXPORT_COMPENSATION,
+    DEFAULT_EXPORT_COSTS,
+    DEFAULT_FIXED_DELIVERY,
+    DEFAULT_FIXED_GRID,
+    DEFAULT_FIXED_TAX_REDUCTION,
+    TIME_ZONE,
+)
 
 # Fixed energy tax rate (government-set, same for all periods)
 # All prices in €/kWh including VAT
@@ -30,6 +60,12 @@ LEVERING_CONFIG_KEYS = [
     "winter_offpeak_night_levering",
 ]
 
+# Configuration keys that make up one version of the rates
+RATE_CONFIG_KEYS = LEVERING_CONFIG_KEYS + [CONF_BELASTING]
+
+# Configuration keys of the net export price
+EXPORT_CONFIG_KEYS = [CONF_EXPORT_COMPENSATION, CONF_EXPORT_COSTS]
+
 # Period labels for UI
 PERIOD_LABELS = {
     "summer_normal": "Zomer normaal (00:00-12:00, 18:00-24:00)",
@@ -59,16 +95,12 @@ TOU_PERIODS = {
 }
 
 
-def get_season(dt: datetime) -> str:
-    """Determine season (summer or winter) for a given datetime."""
-    return "summer" if dt.month in SUMMER_MONTHS else "winter"
+# Seasons in lookup table order
+SEASONS = ("summer", "winter")
 
 
-def get_period(dt: datetime, season: str) -> str:
-    """Determine time-of-use period for a given datetime and season."""
-    hour = dt.hour
-    is_weekend = dt.weekday() >= 5  # Saturday=5, Sunday=6
-    
+def _resolve_period(hour: int, is_weekend: bool, season: str) -> str:
+    """Walk TOU_PERIODS to find the period for an hour of the day."""
     periods = TOU_PERIODS[season]
     
     # Check each period to see if hour falls within it
@@ -84,6 +116,550 @@ def get_period(dt: datetime, season: str) -> str:
     return "normal"
 
 
+# Season index per month (index 0 unused) and period per hour of the week,
+# laid out as [season][weekday][hour] in one flat tuple
+_HOURS_PER_WEEK = 7 * 24
+_SEASON_INDEX_BY_MONTH = tuple(
+    0 if month in SUMMER_MONTHS else 1 for month in range(13)
+)
+_PERIOD_TABLE = tuple(
+    _resolve_period(hour, weekday >= 5, season)
+    for season in SEASONS
+    for weekday in range(7)
+    for hour in range(24)
+)
+
+
+# Period codes used by the columnar API: index into PERIOD_KEYS
+PERIOD_KEYS = tuple(DEFAULT_LEVERING_PRICES)
+_PERIOD_CODE_TABLE = tuple(
+    PERIOD_KEYS.index(f"{SEASONS[i // _HOURS_PER_WEEK]}_{period}")
+    for i, period in enumerate(_PERIOD_TABLE)
+)
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+_EPOCH_WEEKDAY = _EPOCH.weekday()
+
+# Tariff periods follow Dutch local time
+LOCAL_TZ = ZoneInfo(TIME_ZONE)
+HOUR = timedelta(hours=1)
+
+
+class PriceSeries(NamedTuple):
+    """Price series as parallel arrays.
+    
+    Arrays are NumPy arrays when NumPy is installed, otherwise ``array.array``.
+    """
+    
+    timestamps: Sequence[int]  # Epoch seconds
+    prices: Sequence[float]  # €/kWh
+    periods: Sequence[int]  # Index into PERIOD_KEYS
+
+
+def _epoch_seconds(dt: datetime) -> int:
+    """Get epoch seconds; naive datetimes are taken as wall-clock time at UTC."""
+    if dt.tzinfo is None:
+        return int((dt - _EPOCH).total_seconds())
+    return int(dt.timestamp())
+
+
+def _offset_changes(tzinfo, start: int, end: int) -> tuple:
+    """Get the UTC offsets that apply between two epoch timestamps.
+    
+    The offset is probed once per day; a change is then narrowed down to the
+    exact second by bisection.
+    
+    Returns:
+        Tuple of (change timestamps, offsets in seconds) where offsets[i]
+        applies from timestamps[i]
+    """
+    def offset_at(ts):
+        return int(datetime.fromtimestamp(ts, tzinfo).utcoffset().total_seconds())
+    
+    change_times = [start]
+    offsets = [offset_at(start)]
+    previous = start
+    while previous < end:
+        probe = min(previous + 86400, end)
+        offset = offset_at(probe)
+        if offset != offsets[-1]:
+            low, high = previous, probe
+            while high - low > 1:
+                middle = (low + high) // 2
+                if offset_at(middle) == offsets[-1]:
+                    low = middle
+                else:
+                    high = middle
+            change_times.append(high)
+            offsets.append(offset)
+        previous = probe
+    
+    return change_times, offsets
+
+
+def _year_of(ts: int) -> int:
+    """Get the UTC year of an epoch timestamp."""
+    return date.fromordinal(_EPOCH_ORDINAL + ts // 86400).year
+
+
+@lru_cache(maxsize=16)
+def _year_offsets(year: int) -> tuple:
+    """Get the local UTC offset changes within a UTC year.
+    
+    The tz database is only consulted here, once per year; every other
+    conversion bisects into this table.
+    
+    Returns:
+        Tuple of (change timestamps, offsets in seconds), as tuples
+    """
+    start = _epoch_seconds(datetime(year, 1, 1))
+    end = _epoch_seconds(datetime(year + 1, 1, 1))
+    change_times, offsets = _offset_changes(LOCAL_TZ, start, end)
+    return tuple(change_times), tuple(offsets)
+
+
+def _utc_offset(ts: int) -> int:
+    """Get the local UTC offset in seconds at an epoch timestamp."""
+    change_times, offsets = _year_offsets(_year_of(ts))
+    return offsets[bisect_right(change_times, ts) - 1]
+
+
+def _local_offsets(start: int, end: int) -> tuple:
+    """Get the local UTC offsets that apply between two epoch timestamps.
+    
+    Returns:
+        Tuple of (change timestamps, offsets in seconds) where offsets[i]
+        applies from timestamps[i]
+    """
+    change_times = [start]
+    offsets = [_utc_offset(start)]
+    for year in range(_year_of(start), _year_of(end) + 1):
+        for ts, offset in zip(*_year_offsets(year)):
+            if start < ts < end and offset != offsets[-1]:
+                change_times.append(ts)
+                offsets.append(offset)
+    return change_times, offsets
+
+
+@cache
+def _fixed_zone(offset: int) -> timezone:
+    """Get a fixed-offset timezone for a UTC offset in seconds."""
+    return timezone(timedelta(seconds=offset))
+
+
+def to_local(dt: datetime) -> datetime:
+    """Convert an aware datetime to local time with a fixed UTC offset.
+    
+    Naive datetimes are already local wall-clock time and are returned as-is.
+    """
+    if dt.tzinfo is None:
+        return dt
+    ts = dt.timestamp()
+    return datetime.fromtimestamp(ts, _fixed_zone(_utc_offset(int(ts // 1))))
+
+
+def to_utc(dt: datetime) -> datetime:
+    """Convert an aware datetime to UTC; naive datetimes are returned as-is.
+    
+    Stepping through time in UTC keeps every hour exactly one hour long,
+    also on DST nights.
+    """
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc)
+
+
+def local_day_start(day: date) -> datetime:
+    """Get local midnight of a day as an aware datetime."""
+    local_ts = (day.toordinal() - _EPOCH_ORDINAL) * 86400
+    offset = _utc_offset(local_ts)
+    offset = _utc_offset(local_ts - offset)
+    return datetime.fromtimestamp(local_ts - offset, _fixed_zone(offset))
+
+
+def _wall_seconds(dt: datetime) -> int:
+    """Get the local wall-clock time of a datetime as seconds since the epoch."""
+    if dt.tzinfo is None:
+        return _epoch_seconds(dt)
+    ts = int(dt.timestamp())
+    return ts + _utc_offset(ts)
+
+
+def _wall_index(dt: datetime) -> int:
+    """Get the lookup table index for local wall-clock fields."""
+    return (_SEASON_INDEX_BY_MONTH[dt.month] * 7 + dt.weekday()) * 24 + dt.hour
+
+
+def _table_index(dt: datetime) -> int:
+    """Get the lookup table index for a datetime."""
+    if dt.tzinfo is not None:
+        dt = to_local(dt)
+    return (_SEASON_INDEX_BY_MONTH[dt.month] * 7 + dt.weekday()) * 24 + dt.hour
+
+
+def _period_prices(rates: dict) -> dict:
+    """Get the import price per period for one version of the rates."""
+    belasting = float(rates.get(CONF_BELASTING, BELASTING))
+    return {
+        period_key: float(rates.get(f"{period_key}_levering", default_levering)) + belasting
+        for period_key, default_levering in DEFAULT_LEVERING_PRICES.items()
+    }
+
+
+class TariffTable:
+    """Import prices compiled into an hour-of-week lookup table.
+    
+    Built once per levering price configuration so that every lookup is a
+    single index into precomputed tuples instead of a walk over TOU_PERIODS.
+    
+    Earlier rates from the 'rate_history' of the config each get their own
+    table. The tables are selected by binary search over the sorted dates
+    on which the rates changed, taken as local midnight; without a history
+    every lookup goes straight to the current table.
+    
+    The net export price is part of the table as well, so forecasts built
+    from it can carry the export value next to every import price.
+    """
+    
+    __slots__ = (
+        "_period_tables",
+        "_prices",
+        "_starts",
+        "_tables",
+        "change_dates",
+        "export_price",
+        "key",
+        "period_prices",
+    )
+    
+    def __init__(self, levering_prices: dict):
+        """Compile the table.
+        
+        Args:
+            levering_prices: Dict with levering prices per period (from config),
+                optionally with the energy tax and a 'rate_history'
+        """
+        history = sorted(
+            levering_prices.get(CONF_RATE_HISTORY, ()), key=lambda rates: rates[CONF_VALID_UNTIL]
+        )
+        
+        # One table per version; version i applies until change_dates[i]
+        self._period_tables = tuple(
+            _period_prices(rates) for rates in [*history, levering_prices]
+        )
+        self.period_prices = self._period_tables[-1]
+        self.change_dates = tuple(date.fromisoformat(rates[CONF_VALID_UNTIL]) for rates in history)
+        self._starts = tuple(
+            (day.toordinal() - _EPOCH_ORDINAL) * 86400 for day in self.change_dates
+        )
+        self._tables = tuple(
+            tuple(
+                period_prices[f"{SEASONS[i // _HOURS_PER_WEEK]}_{period}"]
+                for i, period in enumerate(_PERIOD_TABLE)
+            )
+            for period_prices in self._period_tables
+        )
+        self._prices = self._tables[-1]
+        self.export_price = get_export_price(levering_prices)
+        # Equal for tables with the same prices, however the config spells them
+        self.key = self.change_dates, tuple(
+            tuple(period_prices.values()) for period_prices in self._period_tables
+        ), self.export_price
+    
+    def _prices_at(self, dt: datetime) -> tuple:
+        """Get the price table of the rates valid at a datetime."""
+        if not self._starts:
+            return self._prices
+        return self._tables[bisect_right(self._starts, _wall_seconds(dt))]
+    
+    def lookup(self, dt: datetime) -> tuple:
+        """Get (season, period, price) for a datetime."""
+        index = _table_index(dt)
+        return SEASONS[index // _HOURS_PER_WEEK], _PERIOD_TABLE[index], self._prices_at(dt)[index]
+    
+    def price_at(self, dt: datetime) -> float:
+        """Get the import price in €/kWh for a datetime."""
+        return self._prices_at(dt)[_table_index(dt)]
+    
+    def next_change(self, dt: datetime) -> datetime:
+        """Get the next time the price can change: a new period or new rates.
+        
+        Returns:
+            Datetime of the change, same tzinfo as dt
+        """
+        transition = get_next_transition(dt)
+        version = bisect_right(self._starts, _wall_seconds(dt))
+        if version == len(self._starts):
+            return transition
+        change = self.change_dates[version]
+        if dt.tzinfo is None:
+            return min(transition, datetime(change.year, change.month, change.day))
+        return min(transition, local_day_start(change).astimezone(dt.tzinfo))
+    
+    def price_range(
+        self, start: datetime, end: datetime, resolution: timedelta = timedelta(hours=1)
+    ) -> PriceSeries:
+        """Get prices for every step from start (inclusive) to end (exclusive).
+        
+        Aware datetimes are priced in Dutch local time from the cached offset
+        table, so the series follows DST changes. Naive datetimes are treated
+        as wall-clock time without DST. Every step uses the rates valid at
+        its local time.
+        
+        Args:
+            start: First timestamp of the series
+            end: End of the series (exclusive)
+            resolution: Step between timestamps, whole seconds
+        
+        Returns:
+            PriceSeries with parallel timestamp, price and period code arrays
+        """
+        step = int(resolution.total_seconds())
+        if step <= 0:
+            raise ValueError("resolution must be at least one second")
+        
+        start_ts = _epoch_seconds(start)
+        end_ts = _epoch_seconds(end)
+        count = max(0, -(-(end_ts - start_ts) // step))
+        if start.tzinfo is None:
+            change_times, offsets = [start_ts], [0]
+        else:
+            change_times, offsets = _local_offsets(start_ts, end_ts)
+        
+        if np is not None:
+            return self._price_range_numpy(start_ts, step, count, change_times, offsets)
+        return self._price_range_array(start_ts, step, count, change_times, offsets)
+    
+    def _price_range_numpy(self, start_ts, step, count, change_times, offsets) -> PriceSeries:
+        """Vectorized price_range."""
+        timestamps = start_ts + step * np.arange(count, dtype=np.int64)
+        segment = np.searchsorted(np.asarray(change_times), timestamps, side="right") - 1
+        local = timestamps + np.asarray(offsets, dtype=np.int64)[segment]
+        
+        days = local // 86400
+        hours = (local % 86400) // 3600
+        weekdays = (days + _EPOCH_WEEKDAY) % 7
+        months = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64) % 12 + 1
+        seasons = np.asarray(_SEASON_INDEX_BY_MONTH, dtype=np.int64)[months]
+        index = (seasons * 7 + weekdays) * 24 + hours
+        
+        if self._starts:
+            versions = np.searchsorted(np.asarray(self._starts), local, side="right")
+            prices = np.asarray(self._tables, dtype=np.float64)[versions, index]
+        else:
+            prices = np.asarray(self._prices, dtype=np.float64)[index]
+        periods = np.asarray(_PERIOD_CODE_TABLE, dtype=np.int8)[index]
+        return PriceSeries(timestamps, prices, periods)
+    
+    def _price_range_array(self, start_ts, step, count, change_times, offsets) -> PriceSeries:
+        """Pure Python price_range, used when NumPy is not installed."""
+        timestamps = array("q")
+        prices = array("d")
+        periods = array("b")
+        
+        day = None
+        day_base = 0
+        for i in range(count):
+            ts = start_ts + i * step
+            local = ts + offsets[bisect_right(change_times, ts) - 1]
+            local_day, seconds = divmod(local, 86400)
+            if local_day != day:
+                # Season and weekday only change with the day
+                day = local_day
+                month = date.fromordinal(_EPOCH_ORDINAL + day).month
+                weekday = (day + _EPOCH_WEEKDAY) % 7
+                day_base = (_SEASON_INDEX_BY_MONTH[month] * 7 + weekday) * 24
+                # Rates change at local midnight
+                table_prices = self._tables[bisect_right(self._starts, day * 86400)]
+            index = day_base + seconds // 3600
+            
+            timestamps.append(ts)
+            prices.append(table_prices[index])
+            periods.append(_PERIOD_CODE_TABLE[index])
+        
+        return PriceSeries(timestamps, prices, periods)
+    
+    def segments(self, start: datetime, end: datetime) -> list:
+        """Get the periods between start and end as run-length segments.
+        
+        Segment ends are the exact tariff boundaries, so a 48-hour range has
+        only about 6-10 segments regardless of its length in hours. A change
+        of rates ends a segment only when the price changes.
+        
+        Args:
+            start: Start of the first segment
+            end: End of the last segment
+        
+        Returns:
+            List of (start, end, season, period, price) tuples
+        """
+        segments = []
+        segment_start = start
+        while segment_start < end:
+            index = _table_index(segment_start)
+            segment_end = min(self.next_change(segment_start), end)
+            segment = (
+                SEASONS[index // _HOURS_PER_WEEK],
+                _PERIOD_TABLE[index],
+                self._prices_at(segment_start)[index],
+            )
+            if segments and segments[-1][2:] == segment:
+                segments[-1] = (segments[-1][0], segment_end, *segment)
+            else:
+                segments.append((segment_start, segment_end, *segment))
+            segment_start = segment_end
+        return segments
+    
+    def hourly_prices(self, start_time: datetime, hours: int = 24) -> list:
+        """Get hourly prices for the next N hours.
+        
+        Aware start times step through real hours, so a DST night has one
+        hour less or more in wall-clock terms; times are local.
+        
+        Args:
+            start_time: Starting datetime
+            hours: Number of hours to calculate (default 24)
+        
+        Returns:
+            List of dicts with 'time' and 'price' for each hour
+        """
+        hourly_data = []
+        start_time = to_utc(start_time)
+        
+        for i in range(hours):
+            dt = to_local(start_time + i * HOUR)
+            index = _wall_index(dt)
+            
+            hourly_data.append({
+                "time": dt.isoformat(),
+                "hour": dt.hour,
+                "price": round(self._prices_at(dt)[index], 6),
+                "period": _PERIOD_TABLE[index],
+                "season": SEASONS[index // _HOURS_PER_WEEK],
+            })
+        
+        return hourly_data
+    
+    def day_prices(self, day: date) -> list:
+        """Get the hourly prices of a local day: 23, 24 or 25 hours."""
+        start = local_day_start(day)
+        hours = (local_day_start(day + timedelta(days=1)) - start) // HOUR
+        return self.hourly_prices(start, hours)
+
+
+def _rates_key(rates: dict) -> tuple:
+    """Get the rates of one version as a hashable key."""
+    return tuple(
+        (key, float(rates[key]))
+        for key in RATE_CONFIG_KEYS
+        if key in rates
+    )
+
+
+def _levering_key(levering_prices: dict) -> tuple:
+    """Get the part of a config that determines a TariffTable."""
+    export = tuple(
+        (key, float(levering_prices[key]))
+        for key in EXPORT_CONFIG_KEYS
+        if key in levering_prices
+    )
+    return _rates_key(levering_prices), tuple(sorted(
+        (rates[CONF_VALID_UNTIL], _rates_key(rates))
+        for rates in levering_prices.get(CONF_RATE_HISTORY, ())
+    )), export
+
+
+_TARIFF_MEMO_SIZE = 32
+
+# id(config) -> (snapshot of the config, compiled TariffTable)
+_tariff_memo: dict[int, tuple[dict, TariffTable]] = {}
+
+
+@lru_cache(maxsize=_TARIFF_MEMO_SIZE)
+def _compile_tariff(levering_key: tuple) -> TariffTable:
+    """Compile and cache a TariffTable."""
+    rates, history, export = levering_key
+    return TariffTable({
+        **dict(rates),
+        **dict(export),
+        CONF_RATE_HISTORY: [
+            {CONF_VALID_UNTIL: valid_until, **dict(version)} for valid_until, version in history
+        ],
+    })
+
+
+def compile_tariff(levering_prices: dict) -> TariffTable:
+    """Get the compiled TariffTable for a levering price configuration.
+    
+    Tables are cached, so configurations with the same levering prices share
+    one instance.
+    
+    Args:
+        levering_prices: Dict with levering prices per period (from config)
+    
+    Returns:
+        Compiled TariffTable
+    """
+    # Most callers pass the same config object again; an equal snapshot
+    # proves it unchanged without re-deriving the full key
+    memo = _tariff_memo.get(id(levering_prices))
+    if memo is not None and memo[0] == levering_prices:
+        return memo[1]
+    
+    table = _compile_tariff(_levering_key(levering_prices))
+    if len(_tariff_memo) >= _TARIFF_MEMO_SIZE:
+        _tariff_memo.clear()
+    _tariff_memo[id(levering_prices)] = deepcopy(dict(levering_prices)), table
+    return table
+
+
+def tariff_cache_info():
+    """Get the hit and miss counts of the compiled tariff cache."""
+    return _compile_tariff.cache_info()
+
+
+def add_rate_change(config: dict, valid_from: str) -> list:
+    """Get the rate history for new rates that apply from a local date.
+    
+    The rates valid just before valid_from are kept in the history until
+    that date, and history after it is dropped, so the new rates in the
+    config apply from valid_from onwards and earlier prices are unchanged.
+    
+    Args:
+        config: Config with the current rates and 'rate_history'
+        valid_from: ISO date from which the new rates apply
+    
+    Returns:
+        New sorted 'rate_history' list
+    """
+    history = sorted(config.get(CONF_RATE_HISTORY, ()), key=lambda rates: rates[CONF_VALID_UNTIL])
+    kept = [rates for rates in history if rates[CONF_VALID_UNTIL] <= valid_from]
+    if kept and kept[-1][CONF_VALID_UNTIL] == valid_from:
+        return kept
+    
+    replaced = next(
+        (rates for rates in history if rates[CONF_VALID_UNTIL] > valid_from), config
+    )
+    kept.append({
+        **{key: replaced[key] for key in RATE_CONFIG_KEYS if key in replaced},
+        CONF_VALID_UNTIL: valid_from,
+    })
+    return kept
+
+
+def get_season(dt: datetime) -> str:
+    """Determine season (summer or winter) for a given datetime."""
+    return SEASONS[_SEASON_INDEX_BY_MONTH[dt.month]]
+
+
+def get_period(dt: datetime, season: str) -> str:
+    """Determine time-of-use period for a given datetime and season."""
+    return _PERIOD_TABLE[
+        (SEASONS.index(season) * 7 + dt.weekday()) * 24 + dt.hour
+    ]
+
+
 def get_import_price(levering_prices: dict, season: str, period: str) -> float:
     """Get the import price for a given season and period.
     
@@ -96,44 +672,317 @@ def get_import_price(levering_prices: dict, season: str, period: str) -> float:
         Total price (levering + belasting) in €/kWh
     """
     period_key = f"{season}_{period}"
-    config_key = f"{period_key}_levering"
+    price = compile_tariff(levering_prices).period_prices.get(period_key)
+    if price is not None:
+        return price
     
-    # Get levering price from config or use default
+    # Not a period of the schedule; keep the lenient per-key lookup
+    config_key = f"{period_key}_levering"
     if config_key in levering_prices:
-        levering = float(levering_prices[config_key])
-    else:
-        levering = DEFAULT_LEVERING_PRICES.get(period_key, 0)
+        return float(levering_prices[config_key]) + BELASTING
+    return BELASTING
+
+
+def get_fixed_daily_cost(config: dict) -> float:
+    """Get the sum of the fixed daily costs in €/day."""
+    return (
+        float(config.get(CONF_FIXED_DELIVERY, DEFAULT_FIXED_DELIVERY))
+        + float(config.get(CONF_FIXED_GRID, DEFAULT_FIXED_GRID))
+        + float(config.get(CONF_FIXED_TAX_REDUCTION, DEFAULT_FIXED_TAX_REDUCTION))
+    )
+
+
+def get_export_price(config: dict) -> float:
+    """Get the net price of exported energy in €/kWh (negative is a credit)."""
+    return float(config.get(CONF_EXPORT_COMPENSATION, DEFAULT_EXPORT_COMPENSATION)) + float(
+        config.get(CONF_EXPORT_COSTS, DEFAULT_EXPORT_COSTS)
+    )
+
+
+def _cost_bucket() -> dict:
+    """Create an empty cost breakdown bucket."""
+    return {"import_kwh": 0.0, "export_kwh": 0.0, "cost": 0.0}
+
+
+def calculate_consumption_cost(config: dict, readings: Iterable) -> dict:
+    """Calculate the cost of a consumption series.
+    
+    Readings are streamed once and their energy is summed per day and tariff
+    period; every bucket is priced once at the end, so memory does not grow
+    with the number of readings.
+    
+    Args:
+        config: Config entry data with levering prices, fixed costs and export terms
+        readings: Iterable of (datetime, kWh) pairs, where kWh is the energy of
+            the interval starting at datetime; negative values are exported.
+            Aware datetimes are bucketed by local day and hour
+    
+    Returns:
+        Dict with total, import, export and fixed cost, import and export kWh,
+        and the breakdowns 'by_season', 'by_period' and 'by_day'
+    """
+    tariff = compile_tariff(config)
+    export_price = get_export_price(config)
+    fixed_daily = get_fixed_daily_cost(config)
+    
+    # Energy per bucket, keyed by day ordinal * len(PERIOD_KEYS) + period code
+    period_count = len(PERIOD_KEYS)
+    imported = defaultdict(float)
+    exported = defaultdict(float)
+    
+    day = None
+    day_base = 0
+    for dt, kwh in readings:
+        if dt.tzinfo is not None:
+            dt = to_local(dt)
+        ordinal = dt.toordinal()
+        if ordinal != day:
+            day = ordinal
+            # date.weekday() == (ordinal + 6) % 7
+            day_base = (_SEASON_INDEX_BY_MONTH[dt.month] * 7 + (ordinal + 6) % 7) * 24
+        key = ordinal * period_count + _PERIOD_CODE_TABLE[day_base + dt.hour]
+        if kwh >= 0:
+            imported[key] += kwh
+        else:
+            exported[key] -= kwh
+    
+    # Prices per period code for every version of the rates
+    code_prices = [
+        [period_prices[key] for key in PERIOD_KEYS] for period_prices in tariff._period_tables
+    ]
+    by_season = {season: 0.0 for season in SEASONS}
+    by_period = defaultdict(_cost_bucket)
+    by_day = defaultdict(_cost_bucket)
+    import_kwh = import_cost = export_kwh = export_cost = 0.0
+    
+    for key in imported.keys() | exported.keys():
+        ordinal, code = divmod(key, period_count)
+        period_key = PERIOD_KEYS[code]
+        bucket_import = imported.get(key, 0.0)
+        bucket_export = exported.get(key, 0.0)
+        version = bisect_right(tariff._starts, (ordinal - _EPOCH_ORDINAL) * 86400)
+        bucket_import_cost = bucket_import * code_prices[version][code]
+        bucket_export_cost = bucket_export * export_price
+        bucket_cost = bucket_import_cost + bucket_export_cost
+        
+        import_kwh += bucket_import
+        import_cost += bucket_import_cost
+        export_kwh += bucket_export
+        export_cost += bucket_export_cost
+        by_season[period_key.split("_", 1)[0]] += bucket_cost
+        for bucket in (by_period[period_key], by_day[ordinal]):
+            bucket["import_kwh"] += bucket_import
+            bucket["export_kwh"] += bucket_export
+            bucket["cost"] += bucket_cost
+    
+    for bucket in by_day.values():
+        bucket["cost"] += fixed_daily
+    fixed_cost = fixed_daily * len(by_day)
     
-    # Belasting is fixed
-    return levering + BELASTING
+    return {
+        "total_cost": round(import_cost + export_cost + fixed_cost, 6),
+        "import_cost": round(import_cost, 6),
+        "export_cost": round(export_cost, 6),
+        "fixed_cost": round(fixed_cost, 6),
+        "import_kwh": round(import_kwh, 6),
+        "export_kwh": round(export_kwh, 6),
+        "by_season": {season: round(cost, 6) for season, cost in by_season.items()},
+        "by_period": {
+            period_key: {name: round(value, 6) for name, value in bucket.items()}
+            for period_key, bucket in sorted(by_period.items())
+        },
+        "by_day": {
+            date.fromordinal(ordinal).isoformat(): {
+                name: round(value, 6) for name, value in bucket.items()
+            }
+            for ordinal, bucket in sorted(by_day.items())
+        },
+    }
 
 
-def get_hourly_prices(levering_prices: dict, start_time: datetime, hours: int = 24) -> list:
-    """Get hourly prices for the next N hours.
+def find_cheapest_window(
+    hourly_data: list,
+    duration: timedelta,
+    earliest_start: datetime | None = None,
+    latest_end: datetime | None = None,
+    allowed_periods: Iterable | None = None,
+    resolution: timedelta = timedelta(minutes=15),
+) -> dict | None:
+    """Find the cheapest contiguous block in a forecast.
+    
+    The forecast is split into slots of the given resolution and a sliding
+    window keeps a running sum, so the search is linear in the number of slots.
     
     Args:
-        levering_prices: Dict with levering prices per period (from config)
-        start_time: Starting datetime
-        hours: Number of hours to calculate (default 24)
+        hourly_data: Forecast as returned by get_hourly_prices or
+            get_price_segments; entries with an 'end' cover up to that time,
+            other entries cover one hour
+        duration: Length of the block, a multiple of resolution
+        earliest_start: Block must not start before this time
+        latest_end: Block must end at or before this time
+        allowed_periods: Period keys (e.g. 'winter_offpeak_night') every slot
+            of the block must fall in; all periods when omitted
+        resolution: Granularity of possible start times (default 15 minutes)
     
     Returns:
-        List of dicts with 'time' and 'price' for each hour
+        Dict with 'start', 'end' and 'average_price', or None if no block fits
     """
-    hourly_data = []
+    size, remainder = divmod(duration, resolution)
+    if size <= 0 or remainder:
+        raise ValueError("duration must be a positive multiple of the resolution")
+    allowed = set(allowed_periods) if allowed_periods is not None else None
+    if timedelta(hours=1) % resolution:
+        raise ValueError("resolution must divide an hour")
     
-    for i in range(hours):
-        dt = start_time + timedelta(hours=i)
-        season = get_season(dt)
-        period = get_period(dt, season)
-        price = get_import_price(levering_prices, season, period)
+    # Expand the forecast into slots of (start, price, allowed)
+    slots = []
+    for entry in hourly_data:
+        entry_start = datetime.fromisoformat(entry["start"] if "start" in entry else entry["time"])
+        if "end" in entry:
+            entry_end = datetime.fromisoformat(entry["end"])
+        else:
+            entry_end = entry_start + timedelta(hours=1)
+        ok = allowed is None or f"{entry['season']}_{entry['period']}" in allowed
+        for i in range((entry_end - entry_start) // resolution):
+            slot_start = entry_start + i * resolution
+            if earliest_start is not None and slot_start < earliest_start:
+                continue
+            slots.append((slot_start, entry["price"], ok))
+    
+    best_sum = None
+    best_start = None
+    window_sum = 0.0
+    blocked = 0
+    for i, (slot_start, price, ok) in enumerate(slots):
+        window_sum += price
+        blocked += not ok
+        if i >= size:
+            _, old_price, old_ok = slots[i - size]
+            window_sum -= old_price
+            blocked -= not old_ok
+        if i < size - 1 or blocked:
+            continue
         
-        hourly_data.append({
-            "time": dt.isoformat(),
-            "hour": dt.hour,
+        start = slots[i - size + 1][0]
+        if latest_end is not None and start + duration > latest_end:
+            break
+        # Round against float drift so equal blocks keep the earliest start
+        if best_sum is None or round(window_sum, 9) < round(best_sum, 9):
+            best_sum = window_sum
+            best_start = start
+    
+    if best_start is None:
+        return None
+    return {
+        "start": to_local(best_start),
+        "end": to_local(best_start + duration),
+        "average_price": round(best_sum / size, 6),
+    }
+
+
+def get_next_transition(dt: datetime) -> datetime:
+    """Get the start of the first tariff period after the one active at dt.
+    
+    Tariff periods always change on a whole hour, so the search steps through
+    hours until the season or period differs from the one at dt. Aware
+    datetimes are stepped in UTC, so DST nights are handled correctly.
+    
+    Args:
+        dt: Reference datetime (naive local time or timezone-aware)
+    
+    Returns:
+        Datetime of the next season or period change, same tzinfo as dt
+    """
+    index = _table_index(dt)
+    season_index = index // _HOURS_PER_WEEK
+    period = _PERIOD_TABLE[index]
+    # Local offsets are whole hours, so a UTC hour is also a local hour
+    candidate = to_utc(dt).replace(minute=0, second=0, microsecond=0)
+    
+    # No period lasts longer than a day; a week bounds the search safely
+    for _ in range(7 * 24):
+        candidate += HOUR
+        index = _table_index(candidate)
+        if index // _HOURS_PER_WEEK != season_index or _PERIOD_TABLE[index] != period:
+            break
+    
+    if dt.tzinfo is None:
+        return candidate
+    return candidate.astimezone(dt.tzinfo)
+
+
+def get_price_range(
+    levering_prices: dict,
+    start: datetime,
+    end: datetime,
+    resolution: timedelta = timedelta(hours=1),
+) -> PriceSeries:
+    """Get prices for a long range as parallel arrays.
+    
+    Args:
+        levering_prices: Dict with levering prices per period (from config)
+        start: First timestamp of the series
+        end: End of the series (exclusive)
+        resolution: Step between timestamps (default one hour)
+    
+    Returns:
+        PriceSeries with epoch timestamps, prices and period codes
+        (index into PERIOD_KEYS)
+    """
+    return compile_tariff(levering_prices).price_range(start, end, resolution)
+
+
+def get_price_segments(levering_prices: dict, start: datetime, end: datetime) -> list:
+    """Get the tariff periods between start and end as segments.
+    
+    Args:
+        levering_prices: Dict with levering prices per period (from config)
+        start: Start of the first segment
+        end: End of the last segment
+    
+    Returns:
+        List of dicts with 'start', 'end', 'price', 'export_price', 'spread',
+        'period' and 'season'
+    """
+    tariff = compile_tariff(levering_prices)
+    export_price = round(tariff.export_price, 6)
+    return [
+        {
+            "start": segment_start.isoformat(),
+            "end": segment_end.isoformat(),
             "price": round(price, 6),
+            "export_price": export_price,
+            "spread": round(round(price, 6) + export_price, 6),
             "period": period,
             "season": season,
-        })
+        }
+        for segment_start, segment_end, season, period, price in tariff.segments(start, end)
+    ]
+
+
+def get_day_prices(levering_prices: dict, day: date) -> list:
+    """Get the hourly prices of a local day.
     
-    return hourly_data
+    Args:
+        levering_prices: Dict with levering prices per period (from config)
+        day: Local calendar day
+    
+    Returns:
+        List of hourly price dicts: 23 on the spring DST day, 25 on the
+        autumn DST day and 24 otherwise
+    """
+    return compile_tariff(levering_prices).day_prices(day)
+
 
+def get_hourly_prices(levering_prices: dict, start_time: datetime, hours: int = 24) -> list:
+    """Get hourly prices for the next N hours.
+    
+    Args:
+        levering_prices: Dict with levering prices per period (from config)
+        start_time: Starting datetime
+        hours: Number of hours to calculate (default 24)
+    
+    Returns:
+        List of dicts with 'time' and 'price' for each hour
+    """
+    return compile_tariff(levering_prices).hourly_prices(start_time, hours)
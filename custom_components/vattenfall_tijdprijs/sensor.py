@@ -1,9 +1,20 @@
 # SPDX-License-Identifier: AGPL-3.0-only
 
-from datetime import datetime, timedelta
 import inspect
-from homeassistant.components.sensor import SensorEntity, SensorStateClass
+import json
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity, SensorStateClass
+from homeassistant.const import EntityCategory
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from .coordinator import entry_config
+from .meter import SourceMeter
+from .pricing_data import PERIOD_KEYS, PERIOD_LABELS, local_day_start
 from .const import (
+    DOMAIN,
+    CONF_COST_SOURCE,
+    FORECAST_ATTRIBUTES,
+    FORECAST_HOURS,
+    FORECAST_LIST_ATTRIBUTES,
     CONF_EXPORT_COSTS,
     CONF_EXPORT_COMPENSATION,
     CONF_FIXED_DELIVERY,
@@ -12,143 +23,308 @@ from .const import (
     DEFAULT_UNIT_PRICE,
     DEFAULT_UNIT_FIXED,
 )
-from .pricing_data import get_hourly_prices, get_season, get_period, get_import_price
 
 async def async_setup_entry(hass, entry, async_add_entities):
     """Set up Vattenfall Tijdprijs sensors."""
-    data = entry.data
+    data = entry_config(entry)
     entry_id = entry.entry_id
+    coordinator = hass.data[DOMAIN][entry_id]
+
+    # Sensors showing a configured value, updated when the options change
+    config_sensors = {
+        CONF_EXPORT_COMPENSATION: PriceSensor(entry_id, "Terugleververgoeding", data[CONF_EXPORT_COMPENSATION], DEFAULT_UNIT_PRICE, "export_compensation"),
+        CONF_EXPORT_COSTS: PriceSensor(entry_id, "Terugleverkosten", data[CONF_EXPORT_COSTS], DEFAULT_UNIT_PRICE, "export_costs"),
+        CONF_FIXED_DELIVERY: FixedCostSensor(entry_id, "Vaste leveringskosten", data[CONF_FIXED_DELIVERY], "fixed_delivery"),
+        CONF_FIXED_TAX_REDUCTION: FixedCostSensor(entry_id, "Vaste belastingvermindering", data[CONF_FIXED_TAX_REDUCTION], "fixed_tax_reduction"),
+        CONF_FIXED_GRID: FixedCostSensor(entry_id, "Vaste netbeheerkosten", data[CONF_FIXED_GRID], "fixed_grid"),
+    }
+
+    @callback
+    def _handle_config_update():
+        """Push changed configured values to their sensors."""
+        for key, sensor in config_sensors.items():
+            sensor.async_set_value(coordinator.config_data[key])
+
+    entry.async_on_unload(coordinator.async_add_listener(_handle_config_update))
 
     sensors = [
         # Current price sensor
-        CurrentPriceSensor(data, entry_id, "Huidige Importprijs", "import_price"),
+        CurrentPriceSensor(coordinator, entry_id, "Huidige Importprijs", "import_price"),
         
         # Hourly forecast sensor
-        HourlyPriceSensor(data, entry_id, "Importprijs per uur", "hourly_prices"),
+        HourlyPriceSensor(coordinator, entry_id, "Importprijs per uur", "hourly_prices"),
         
-        # Export sensors
-        PriceSensor(entry_id, "Terugleververgoeding", data[CONF_EXPORT_COMPENSATION], DEFAULT_UNIT_PRICE, "export_compensation"),
-        PriceSensor(entry_id, "Terugleverkosten", data[CONF_EXPORT_COSTS], DEFAULT_UNIT_PRICE, "export_costs"),
-
-        # Fixed cost sensors
-        FixedCostSensor(entry_id, "Vaste leveringskosten", data[CONF_FIXED_DELIVERY], "fixed_delivery"),
-        FixedCostSensor(entry_id, "Vaste belastingvermindering", data[CONF_FIXED_TAX_REDUCTION], "fixed_tax_reduction"),
-        FixedCostSensor(entry_id, "Vaste netbeheerkosten", data[CONF_FIXED_GRID], "fixed_grid"),
+        # Update instrumentation, disabled by default
+        UpdateStatsSensor(coordinator, entry_id, "Update statistieken", "update_stats"),
+        
+        # Export and fixed cost sensors
+        *config_sensors.values(),
     ]
 
+    # Cost so far and energy per period of a metered sensor, when one is chosen
+    if data.get(CONF_COST_SOURCE):
+        meter = SourceMeter(hass, coordinator, entry_id, data[CONF_COST_SOURCE])
+        await meter.async_start()
+        entry.async_on_unload(meter.async_stop)
+        sensors.append(CostSensor(meter, entry_id, "Kosten vandaag", "cost_today"))
+        sensors.extend(
+            PeriodEnergySensor(meter, entry_id, period_key) for period_key in PERIOD_KEYS
+        )
+
     result = async_add_entities(sensors)
     if inspect.isawaitable(result):
         await result
 
 
-class CurrentPriceSensor(SensorEntity):
+class CurrentPriceSensor(CoordinatorEntity, SensorEntity):
     """Sensor for current import price based on time-of-use."""
     
-    _attr_should_poll = True
-    
-    def __init__(self, config_data, entry_id, name, sensor_type):
+    def __init__(self, coordinator, entry_id, name, sensor_type):
         """Initialize the sensor."""
-        self._config_data = config_data
+        super().__init__(coordinator)
         self._entry_id = entry_id
         self._attr_name = name
+        self._sensor_type = sensor_type
         self._attr_unique_id = f"{entry_id}_{sensor_type}"
         self._attr_native_unit_of_measurement = DEFAULT_UNIT_PRICE
         self._attr_state_class = SensorStateClass.MEASUREMENT
         self._attr_icon = "mdi:currency-eur"
-        self._attr_native_value = None
-        self._attr_extra_state_attributes = {}
-        
+        self._written_state = None
+    
     @property
     def native_value(self):
         """Return the current price."""
-        return self._attr_native_value
-    
-    async def async_update(self):
-        """Update the sensor every minute."""
-        now = datetime.now()
-        season = get_season(now)
-        period = get_period(now, season)
-        self._attr_native_value = round(get_import_price(self._config_data, season, period), 6)
-        self._attr_extra_state_attributes = {
-            "season": season,
-            "period": period,
-            "hour": now.hour,
-        }
+        return self.coordinator.data["price"]
     
     @property
     def extra_state_attributes(self):
         """Return additional state attributes."""
-        return self._attr_extra_state_attributes
+        data = self.coordinator.data
+        return {
+            "season": data["season"],
+            "period": data["period"],
+            "next_change": data["next_change"].isoformat(),
+            "export_price": data["export_price"],
+            "spread": data["spread"],
+        }
+    
+    @property
+    def serialized_attributes(self):
+        """Return the attributes as JSON."""
+        return json.dumps(self.extra_state_attributes)
+    
+    @callback
+    def _handle_coordinator_update(self):
+        """Write the state only when the tariff period or its prices have changed."""
+        data = self.coordinator.data
+        state = (data["next_change"], data["price"], data["spread"])
+        if state == self._written_state:
+            return
+        self._written_state = state
+        _record_state_write(self)
+        super()._handle_coordinator_update()
 
 
-class HourlyPriceSensor(SensorEntity):
+class HourlyPriceSensor(CoordinatorEntity, SensorEntity):
     """Sensor with hourly price forecast for next 48 hours."""
     
-    _attr_should_poll = True
+    # The forecast lists stay available in the state machine but are not
+    # written to the recorder database, where they made up most of the rows
+    _unrecorded_attributes = frozenset(FORECAST_ATTRIBUTES)
     
-    def __init__(self, config_data, entry_id, name, sensor_type):
+    def __init__(self, coordinator, entry_id, name, sensor_type):
         """Initialize the sensor."""
-        self._config_data = config_data
+        super().__init__(coordinator)
         self._entry_id = entry_id
         self._attr_name = name
+        self._sensor_type = sensor_type
         self._attr_unique_id = f"{entry_id}_{sensor_type}"
         self._attr_native_unit_of_measurement = DEFAULT_UNIT_PRICE
         self._attr_icon = "mdi:chart-line"
-        self._attr_native_value = None
-        self._attr_extra_state_attributes = {}
-        
+        self._attributes = None
+        self._attributes_json = None
+        self._attributes_version = None
+        self._written_version = None
+    
     @property
     def native_value(self):
         """Return the current hour price."""
-        return self._attr_native_value
-    
-    async def async_update(self):
-        """Update hourly forecast every hour."""
-        now = datetime.now()
-        season = get_season(now)
-        period = get_period(now, season)
-        current_price = round(get_import_price(self._config_data, season, period), 6)
-        self._attr_native_value = current_price
-        
-        # Update forecast data
-        hourly_data = get_hourly_prices(self._config_data, now, hours=48)
-        
-        # Calculate median price for determining high/low tariffs
-        prices = [entry["price"] for entry in hourly_data]
-        sorted_prices = sorted(prices)
-        median_price = sorted_prices[len(sorted_prices) // 2]
-        
-        # Format data for ApexCharts
-        apexcharts_data = []
-        apexcharts_data_colored = []
-        for entry in hourly_data:
-            price = entry["price"]
-            # Color: green for low tariffs, red for high tariffs
-            color = "#27ae60" if price <= median_price else "#e74c3c"
-
-            # ApexCharts-card expects a list of [timestamp, value]
-            apexcharts_data.append([entry["time"], round(price, 6)])
-
-            # Optional richer format for custom cards/scripts
-            apexcharts_data_colored.append({
-                "x": entry["time"],
-                "y": round(price, 6),
-                "fillColor": color,
-            })
+        return self.coordinator.data["price"]
+    
+    @property
+    def extra_state_attributes(self):
+        """Return the forecast summary as attributes, built once per forecast window.
         
-        self._attr_extra_state_attributes = {
-            "hourly_prices": hourly_data,
-            "forecast_hours": 48,
-            "last_update": now.isoformat(),
-            "apexcharts_data": apexcharts_data,
-            "apexcharts_data_colored": apexcharts_data_colored,
-            "median_price": round(median_price, 6),
-        }
+        The segments are only included for entries that keep them as an
+        attribute; others read them through the get_forecast service.
+        """
+        data = self.coordinator.data
+        if data["forecast_version"] != self._attributes_version:
+            attributes = {
+                "forecast_hours": FORECAST_HOURS,
+                "resolution": int(self.coordinator.resolution.total_seconds()) // 60,
+                "last_update": data["time"].isoformat(),
+                "median_price": data["median_price"],
+                "min_price": data["min_price"],
+                "max_price": data["max_price"],
+            }
+            if self.coordinator.forecast_segments:
+                attributes["segments"] = data["segments"]
+            for name in FORECAST_LIST_ATTRIBUTES:
+                if name in data:
+                    attributes[name] = data[name]
+            self._attributes = attributes
+            self._attributes_json = None
+            self._attributes_version = data["forecast_version"]
+        return self._attributes
+    
+    @property
+    def serialized_attributes(self):
+        """Return the attributes as JSON, serialized once per forecast window."""
+        attributes = self.extra_state_attributes
+        if self._attributes_json is None:
+            self._attributes_json = json.dumps(attributes)
+        return self._attributes_json
+    
+    @callback
+    def _handle_coordinator_update(self):
+        """Write the forecast only when the window has moved or been repriced."""
+        version = self.coordinator.data["forecast_version"]
+        if version == self._written_version:
+            return
+        self._written_version = version
+        _record_state_write(self)
+        super()._handle_coordinator_update()
+
+
+class UpdateStatsSensor(CoordinatorEntity, SensorEntity):
+    """Diagnostic sensor with the update latency and payload counters.
+    
+    Disabled by default; enabling it switches the instrumentation on.
+    """
+    
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    
+    def __init__(self, coordinator, entry_id, name, sensor_type):
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._entry_id = entry_id
+        self._attr_name = name
+        self._attr_unique_id = f"{entry_id}_{sensor_type}"
+        self._attr_native_unit_of_measurement = "ms"
+        self._attr_state_class = SensorStateClass.MEASUREMENT
+        self._attr_icon = "mdi:timer-outline"
+    
+    async def async_added_to_hass(self):
+        """Switch the instrumentation on."""
+        await super().async_added_to_hass()
+        self.coordinator.stats.subscribers += 1
+    
+    async def async_will_remove_from_hass(self):
+        """Switch the instrumentation off when nothing else uses it."""
+        self.coordinator.stats.subscribers -= 1
+        await super().async_will_remove_from_hass()
+    
+    @property
+    def native_value(self):
+        """Return the 95th percentile update latency."""
+        return self.coordinator.stats.latency_percentiles()["p95"]
+    
+    @property
+    def extra_state_attributes(self):
+        """Return all update counters."""
+        return self.coordinator.stats_summary()
+
+
+class MeterSensor(SensorEntity):
+    """Base for the sensors showing the totals of the source meter."""
+    
+    _attr_should_poll = False
+    
+    def __init__(self, meter, entry_id, name, sensor_type, set_state):
+        """Initialize the sensor; set_state sets its state from the meter totals."""
+        self._meter = meter
+        self._entry_id = entry_id
+        self._attr_name = name
+        self._sensor_type = sensor_type
+        self._attr_unique_id = f"{entry_id}_{sensor_type}"
+        self._set_state = set_state
+        self._set_state()
+    
+    async def async_added_to_hass(self):
+        """Write the state whenever the meter tells about new totals."""
+        self.async_on_remove(self._meter.async_add_listener(self._handle_meter_update))
+    
+    @callback
+    def _handle_meter_update(self):
+        """Write the new totals."""
+        self._set_state()
+        self.async_write_ha_state()
+
+
+class CostSensor(MeterSensor):
+    """Sensor with the cost so far today of a metered power or energy sensor.
+    
+    This month's cost and the energy are attributes; the cost is reset at
+    local midnight.
+    """
+    
+    _attr_device_class = SensorDeviceClass.MONETARY
+    _attr_state_class = SensorStateClass.TOTAL
+    _attr_native_unit_of_measurement = "€"
+    _attr_icon = "mdi:cash-clock"
+    
+    def __init__(self, meter, entry_id, name, sensor_type):
+        """Initialize the sensor."""
+        super().__init__(meter, entry_id, name, sensor_type, self._show_today)
     
     @property
     def extra_state_attributes(self):
-        """Return hourly forecast as attributes."""
-        return self._attr_extra_state_attributes
+        """Return this month's cost, the energy and the source."""
+        integrator = self._meter.integrator
+        return {
+            "month_cost": round(integrator.month_cost, 6),
+            "today_energy": round(integrator.today_kwh, 6),
+            "month_energy": round(integrator.month_kwh, 6),
+            "day": integrator.day.isoformat() if integrator.day else None,
+            "source": self._meter.source,
+        }
+    
+    def _show_today(self):
+        """Show today's cost, reset at local midnight."""
+        integrator = self._meter.integrator
+        self._attr_native_value = round(integrator.today_cost, 6)
+        if integrator.day is not None:
+            self._attr_last_reset = local_day_start(integrator.day)
+
+
+class PeriodEnergySensor(MeterSensor):
+    """Sensor with the energy imported in one tariff period, a running total."""
+    
+    _attr_device_class = SensorDeviceClass.ENERGY
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_native_unit_of_measurement = "kWh"
+    _attr_icon = "mdi:counter"
+    
+    def __init__(self, meter, entry_id, period_key):
+        """Initialize the sensor for a period of DEFAULT_LEVERING_PRICES."""
+        self._period_key = period_key
+        name = PERIOD_LABELS[period_key].split(" (")[0]
+        super().__init__(
+            meter, entry_id, f"Verbruik {name.lower()}", f"energy_{period_key}", self._show_energy
+        )
+    
+    def _show_energy(self):
+        """Show the energy of the period."""
+        self._attr_native_value = round(self._meter.integrator.period_kwh[self._period_key], 6)
+
+
+def _record_state_write(sensor):
+    """Record the attribute size of a state write when instrumentation is on."""
+    stats = sensor.coordinator.stats
+    if stats.enabled:
+        stats.record_state_write(sensor._sensor_type, sensor.serialized_attributes)
 
 
 class PriceSensor(SensorEntity):
@@ -158,12 +334,17 @@ class PriceSensor(SensorEntity):
         self._attr_unique_id = f"{entry_id}_{sensor_type}"
         self._attr_native_value = value
         self._attr_native_unit_of_measurement = unit
+    
+    @callback
+    def async_set_value(self, value):
+        """Show a new configured value, writing the state only if it changed."""
+        if value == self._attr_native_value:
+            return
+        self._attr_native_value = value
+        if self.hass is not None:
+            self.async_write_ha_state()
 
 
-class FixedCostSensor(SensorEntity):
+class FixedCostSensor(PriceSensor):
     def __init__(self, entry_id, name, value, sensor_type):
-        self._entry_id = entry_id
-        self._attr_name = name
-        self._attr_unique_id = f"{entry_id}_{sensor_type}"
-        self._attr_native_value = value
-        self._attr_native_unit_of_measurement = DEFAULT_UNIT_FIXED
+        super().__init__(entry_id, name, value, DEFAULT_UNIT_FIXED, sensor_type)
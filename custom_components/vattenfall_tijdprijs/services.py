@@ -0,0 +1,142 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Services for the Vattenfall Tijdprijs integration."""
+
+from datetime import datetime, timedelta
+
+import homeassistant.helpers.config_validation as cv
+import voluptuous as vol
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
+
+from .const import (
+    ATTR_ALLOWED_PERIODS,
+    ATTR_CONFIG_ENTRY_ID,
+    ATTR_DURATION,
+    ATTR_HOURS,
+    ATTR_LATEST_END,
+    ATTR_RESOLUTION,
+    ATTR_START,
+    DOMAIN,
+    FORECAST_HOURS,
+    FORECAST_MAX_HOURS,
+    RESOLUTION_OPTIONS,
+    SERVICE_FIND_CHEAPEST_WINDOW,
+    SERVICE_GET_FORECAST,
+)
+from .forecast import forecast_range
+from .pricing_data import LOCAL_TZ, PERIOD_KEYS, find_cheapest_window
+
+QUARTER_HOUR = timedelta(minutes=15)
+
+
+def _quarter_hours(value: timedelta) -> timedelta:
+    """Validate that a duration is a positive number of quarter hours."""
+    if value <= timedelta(0) or value % QUARTER_HOUR:
+        raise vol.Invalid("duration must be a positive multiple of 15 minutes")
+    return value
+
+
+FIND_CHEAPEST_WINDOW_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Required(ATTR_DURATION): vol.All(cv.time_period, _quarter_hours),
+        vol.Optional(ATTR_LATEST_END): cv.datetime,
+        vol.Optional(ATTR_ALLOWED_PERIODS): vol.All(
+            cv.ensure_list, [vol.In(PERIOD_KEYS)]
+        ),
+    }
+)
+
+GET_FORECAST_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_HOURS, default=FORECAST_HOURS): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=FORECAST_MAX_HOURS)
+        ),
+        vol.Optional(ATTR_RESOLUTION): vol.All(
+            vol.Coerce(int), vol.In(RESOLUTION_OPTIONS)
+        ),
+    }
+)
+
+
+def _local_aware(value: datetime) -> datetime:
+    """Take a naive datetime as Dutch local time, like the forecast."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=LOCAL_TZ)
+    return value
+
+
+def get_coordinator(hass: HomeAssistant, entry_id: str | None = None):
+    """Get the coordinator of a loaded entry, or of the first one if not given."""
+    coordinators = hass.data.get(DOMAIN, {})
+    if entry_id is None:
+        if coordinators:
+            return next(iter(coordinators.values()))
+        raise HomeAssistantError("No Vattenfall Tijdprijs entry is loaded")
+    if entry_id not in coordinators:
+        raise HomeAssistantError(f"Config entry {entry_id} is not loaded")
+    return coordinators[entry_id]
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration services."""
+
+    async def async_find_cheapest_window(call: ServiceCall) -> dict:
+        """Return the cheapest block of the requested length in the forecast."""
+        coordinator = get_coordinator(hass, call.data.get(ATTR_CONFIG_ENTRY_ID))
+        latest_end = call.data.get(ATTR_LATEST_END)
+
+        try:
+            window = find_cheapest_window(
+                coordinator.data["segments"],
+                call.data[ATTR_DURATION],
+                earliest_start=datetime.now(LOCAL_TZ),
+                latest_end=_local_aware(latest_end) if latest_end else None,
+                allowed_periods=call.data.get(ATTR_ALLOWED_PERIODS),
+            )
+        except ValueError as err:
+            raise HomeAssistantError(str(err)) from err
+
+        if window is None:
+            return {"start": None, "end": None, "average_price": None}
+        return {
+            "start": window["start"].isoformat(),
+            "end": window["end"].isoformat(),
+            "average_price": window["average_price"],
+        }
+
+    async def async_get_forecast(call: ServiceCall) -> dict:
+        """Return the forecast segments of the requested window.
+
+        The forecast is computed on request and memoized, so automations
+        asking for the same window within a slot share one result.
+        """
+        coordinator = get_coordinator(hass, call.data.get(ATTR_CONFIG_ENTRY_ID))
+        start = call.data.get(ATTR_START)
+        resolution = call.data.get(ATTR_RESOLUTION)
+
+        return forecast_range(
+            coordinator.tariff,
+            _local_aware(start) if start else datetime.now(LOCAL_TZ),
+            call.data[ATTR_HOURS],
+            timedelta(minutes=resolution) if resolution else coordinator.resolution,
+        )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_FIND_CHEAPEST_WINDOW,
+        async_find_cheapest_window,
+        schema=FIND_CHEAPEST_WINDOW_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_FORECAST,
+        async_get_forecast,
+        schema=GET_FORECAST_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
@@ -0,0 +1,103 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Import of the hourly tariff into long-term statistics."""
+
+import logging
+from datetime import date, datetime, timedelta, timezone
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+    get_last_statistics,
+)
+from homeassistant.core import HomeAssistant
+
+from .const import DEFAULT_UNIT_PRICE, DOMAIN, STATISTICS_BACKFILL_DAYS
+from .pricing_data import HOUR, LOCAL_TZ, TariffTable, local_day_start
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def statistic_id(entry_id: str) -> str:
+    """Get the external statistic id of the import price of an entry."""
+    return f"{DOMAIN}:import_price_{entry_id.lower()}"
+
+
+def statistics_metadata(entry_id: str, name: str) -> dict:
+    """Get the statistics metadata of the import price of an entry."""
+    return {
+        "has_mean": True,
+        "has_sum": False,
+        "name": f"{name} importprijs",
+        "source": DOMAIN,
+        "statistic_id": statistic_id(entry_id),
+        "unit_of_measurement": DEFAULT_UNIT_PRICE,
+    }
+
+
+def import_range(last_start: datetime | None, today: date) -> tuple:
+    """Get the hours still to import, through the end of tomorrow.
+
+    Args:
+        last_start: Start of the last imported hour, None if nothing was imported
+        today: Current local day
+
+    Returns:
+        Tuple of (start, end); start is not before end when up to date
+    """
+    end = local_day_start(today + timedelta(days=2))
+    if last_start is None:
+        return local_day_start(today - timedelta(days=STATISTICS_BACKFILL_DAYS)), end
+    return last_start + HOUR, end
+
+
+def build_statistics(tariff: TariffTable, start: datetime, end: datetime) -> list:
+    """Get hourly statistics rows, computed in one bulk price range.
+
+    The tariff is constant within an hour, so mean, min and max are equal.
+    """
+    series = tariff.price_range(start, end)
+    return [
+        {
+            "start": datetime.fromtimestamp(ts, timezone.utc),
+            "mean": price,
+            "min": price,
+            "max": price,
+        }
+        for ts, price in zip(
+            series.timestamps.tolist(), (round(price, 6) for price in series.prices.tolist())
+        )
+    ]
+
+
+async def async_import_statistics(
+    hass: HomeAssistant, coordinator, entry_id: str, name: str, since: datetime | None = None
+) -> int:
+    """Import the hours since the last import as one batch.
+
+    Args:
+        since: Reimport from the hour containing this time instead, e.g.
+            after the rates have changed; existing rows are overwritten
+
+    Returns:
+        Number of imported hours
+    """
+    stat_id = statistic_id(entry_id)
+    if since is not None:
+        last_start = since.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0) - HOUR
+    else:
+        last = await get_instance(hass).async_add_executor_job(
+            get_last_statistics, hass, 1, stat_id, True, {"start"}
+        )
+        last_start = None
+        if last.get(stat_id):
+            last_start = datetime.fromtimestamp(last[stat_id][0]["start"], timezone.utc)
+
+    start, end = import_range(last_start, datetime.now(LOCAL_TZ).date())
+    if start >= end:
+        return 0
+
+    rows = build_statistics(coordinator.tariff, start, end)
+    async_add_external_statistics(hass, statistics_metadata(entry_id, name), rows)
+    _LOGGER.debug("Imported %d hourly tariff statistics for %s", len(rows), stat_id)
+    return len(rows)
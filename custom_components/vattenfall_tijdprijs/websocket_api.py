@@ -0,0 +1,88 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Websocket command streaming the price forecast to dashboards."""
+
+import voluptuous as vol
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+
+from .const import ATTR_CONFIG_ENTRY_ID, WS_TYPE_SUBSCRIBE_FORECAST
+from .forecast import segment_delta
+from .services import get_coordinator
+
+
+def async_setup_websocket_api(hass: HomeAssistant) -> None:
+    """Register the websocket commands."""
+    websocket_api.async_register_command(hass, ws_subscribe_forecast)
+
+
+def forecast_event(sent_segments: list | None, data: dict) -> dict:
+    """Get the event that brings a subscriber from the sent segments to data.
+
+    The first event, and one after a repricing that keeps no segment, is a
+    'snapshot' with all segments; every other one is a 'delta' with the
+    splice of segment_delta.
+    """
+    event = {"version": data["forecast_version"], "median_price": data["median_price"]}
+    delta = segment_delta(sent_segments, data["segments"]) if sent_segments is not None else None
+    if delta is None:
+        return {"type": "snapshot", **event, "segments": data["segments"]}
+    return {"type": "delta", **event, **delta}
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): WS_TYPE_SUBSCRIBE_FORECAST,
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): str,
+    }
+)
+@callback
+def ws_subscribe_forecast(hass: HomeAssistant, connection, msg: dict) -> None:
+    """Send the forecast segments once, then only their changes.
+
+    An event is sent when the forecast window moves or is repriced; the
+    coordinator ticks in between send nothing. When the entry is unloaded
+    or reloaded the subscription ends with an error, so the card can
+    subscribe again to the new coordinator.
+    """
+    try:
+        coordinator = get_coordinator(hass, msg.get(ATTR_CONFIG_ENTRY_ID))
+    except HomeAssistantError as err:
+        connection.send_error(msg["id"], websocket_api.ERR_NOT_FOUND, str(err))
+        return
+
+    sent = {"version": None, "segments": None}
+
+    @callback
+    def _forward():
+        """Send the change of the forecast since the last event."""
+        data = coordinator.data
+        if data["forecast_version"] == sent["version"]:
+            return
+        connection.send_message(
+            websocket_api.event_message(msg["id"], forecast_event(sent["segments"], data))
+        )
+        sent["version"] = data["forecast_version"]
+        sent["segments"] = data["segments"]
+
+    @callback
+    def _unsubscribe():
+        """Stop following the coordinator."""
+        remove_listener()
+        remove_shutdown_listener()
+
+    @callback
+    def _shutdown():
+        """End the subscription when the coordinator shuts down."""
+        _unsubscribe()
+        connection.subscriptions.pop(msg["id"], None)
+        connection.send_error(
+            msg["id"], websocket_api.ERR_NOT_FOUND, "Config entry was unloaded"
+        )
+
+    remove_listener = coordinator.async_add_listener(_forward)
+    remove_shutdown_listener = coordinator.async_add_shutdown_listener(_shutdown)
+    connection.subscriptions[msg["id"]] = _unsubscribe
+    connection.send_result(msg["id"])
+    _forward()
@@ -0,0 +1,3 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Performance benchmarks, run with pytest-benchmark."""
@@ -0,0 +1,30 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Benchmarks for the running cost integrator."""
+
+import pytest
+from datetime import datetime, timedelta
+
+pytest.importorskip("pytest_benchmark")
+
+from custom_components.vattenfall_tijdprijs.cost import CostIntegrator
+from custom_components.vattenfall_tijdprijs.pricing_data import LOCAL_TZ, compile_tariff
+
+START = datetime(2024, 6, 10, 0, 0, tzinfo=LOCAL_TZ)
+# One reading per second for a day, as from a P1 meter
+READINGS = [(START + timedelta(seconds=second), 500 + second % 1000) for second in range(86400)]
+
+
+def _integrate_day():
+    """Add a day of per-second power readings."""
+    integrator = CostIntegrator(compile_tariff({}), 0.0)
+    for time, watts in READINGS:
+        integrator.add_reading(time, watts, "W")
+    return integrator
+
+
+def test_day_of_per_second_readings(benchmark):
+    """Time a day of per-second readings, split at every tariff change."""
+    integrator = benchmark(_integrate_day)
+
+    assert integrator.today_kwh > 0
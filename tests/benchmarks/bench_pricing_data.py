@@ -0,0 +1,90 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Benchmarks for the pricing engine."""
+
+import pytest
+from datetime import datetime, timedelta
+from timeit import repeat
+
+pytest.importorskip("pytest_benchmark")
+
+from custom_components.vattenfall_tijdprijs.pricing_data import (
+    BELASTING,
+    LOCAL_TZ,
+    compile_tariff,
+    get_hourly_prices,
+    get_import_price,
+    get_period,
+    get_price_range,
+    get_price_segments,
+    to_utc,
+)
+
+# Spans the spring DST night; UTC keeps every range exactly YEAR_HOURS long
+START = to_utc(datetime(2024, 3, 29, 10, 0, tzinfo=LOCAL_TZ))
+YEAR_HOURS = 366 * 24
+
+
+def test_get_period(benchmark):
+    """Time one period lookup."""
+    assert benchmark(get_period, START, "summer") == "normal"
+
+
+def _direct_import_price(levering_prices, season, period):
+    """Get an import price by direct config lookup, as the uncached baseline."""
+    config_key = f"{season}_{period}_levering"
+    if config_key in levering_prices:
+        return float(levering_prices[config_key]) + BELASTING
+    return BELASTING
+
+
+def test_get_import_price(benchmark):
+    """Time one price lookup for a configured entry against the direct lookup."""
+    config = {"winter_offpeak_night_levering": 0.05, "rate_history": [
+        {"valid_until": "2024-01-01", "winter_offpeak_night_levering": 0.04},
+    ]}
+    args = (config, "winter", "offpeak_night")
+
+    assert benchmark(get_import_price, *args) == _direct_import_price(*args)
+
+    # A repeated config must stay O(1), not re-derive the tariff every call
+    wrapper = min(repeat(lambda: get_import_price(*args), number=10_000, repeat=5))
+    baseline = min(repeat(lambda: _direct_import_price(*args), number=10_000, repeat=5))
+    assert wrapper < 3 * baseline
+
+
+def test_hourly_prices_48_hours(benchmark):
+    """Time the 48-hour hourly forecast."""
+    assert len(benchmark(get_hourly_prices, {}, START, 48)) == 48
+
+
+def test_hourly_prices_year(benchmark):
+    """Time a year of hourly prices as dicts."""
+    assert len(benchmark(get_hourly_prices, {}, START, YEAR_HOURS)) == YEAR_HOURS
+
+
+def test_price_range_year(benchmark):
+    """Time a year of hourly prices as columnar arrays."""
+    series = benchmark(get_price_range, {}, START, START + timedelta(hours=YEAR_HOURS))
+    assert len(series.prices) == YEAR_HOURS
+
+
+def test_price_segments_year(benchmark):
+    """Time a year of run-length segments."""
+    assert benchmark(get_price_segments, {}, START, START + timedelta(hours=YEAR_HOURS))
+
+
+def test_price_range_versioned_years(benchmark):
+    """Time three years of hourly prices with a rate change every half year."""
+    history = [
+        {"valid_until": f"{year}-{month:02d}-01", "belasting": 0.10 + year % 10 / 100}
+        for year in (2022, 2023, 2024)
+        for month in (1, 7)
+    ]
+    config = {"rate_history": history}
+    start = to_utc(datetime(2022, 1, 1, tzinfo=LOCAL_TZ))
+    end = to_utc(datetime(2025, 1, 1, tzinfo=LOCAL_TZ))
+    compile_tariff(config)
+
+    series = benchmark(get_price_range, config, start, end)
+    assert len(series.prices) == (end - start) // timedelta(hours=1)
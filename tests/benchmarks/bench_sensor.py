@@ -0,0 +1,111 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Benchmarks for the forecast sensor update and its attribute payload."""
+
+import json
+import pytest
+from datetime import datetime, timedelta
+from itertools import count
+from unittest.mock import MagicMock
+
+pytest.importorskip("pytest_benchmark")
+
+from custom_components.vattenfall_tijdprijs.const import CONF_FORECAST_LISTS, CONF_RESOLUTION
+from custom_components.vattenfall_tijdprijs.coordinator import VattenfallPriceCoordinator
+from custom_components.vattenfall_tijdprijs.pricing_data import LOCAL_TZ, to_utc
+from custom_components.vattenfall_tijdprijs.sensor import HourlyPriceSensor
+
+HOUR = timedelta(hours=1)
+START = to_utc(datetime(2024, 3, 29, 10, 0, tzinfo=LOCAL_TZ))
+
+CONFIGS = {
+    "segments": {CONF_FORECAST_LISTS: False},
+    "lists": {CONF_FORECAST_LISTS: True},
+    "lists_quarter_hour": {CONF_FORECAST_LISTS: True, CONF_RESOLUTION: 15},
+}
+
+
+def _sensor(config):
+    """Return a forecast sensor with its own coordinator."""
+    coordinator = VattenfallPriceCoordinator(MagicMock(), config)
+    return HourlyPriceSensor(coordinator, "bench", "Importprijs per uur", "hourly_prices")
+
+
+@pytest.mark.parametrize("config", CONFIGS.values(), ids=CONFIGS.keys())
+def test_sensor_update_tick(benchmark, config):
+    """Time one coordinator tick that rolls the window, plus the attribute read."""
+    sensor = _sensor(config)
+    coordinator = sensor.coordinator
+    ticks = count()
+
+    def tick():
+        now = START + next(ticks) * coordinator.resolution
+        coordinator.async_set_updated_data(coordinator._compute(now))
+        return sensor.extra_state_attributes
+
+    assert benchmark(tick)["segments"]
+
+
+@pytest.mark.parametrize("config", CONFIGS.values(), ids=CONFIGS.keys())
+def test_sensor_update_repeat(benchmark, config):
+    """Time a refresh within the same slot, which reuses the cached payload."""
+    sensor = _sensor(config)
+    coordinator = sensor.coordinator
+    coordinator.async_set_updated_data(coordinator._compute(START))
+
+    def repeat():
+        coordinator.async_set_updated_data(coordinator._compute(START))
+        return sensor.serialized_attributes
+
+    assert benchmark(repeat)
+
+
+@pytest.mark.parametrize("config", CONFIGS.values(), ids=CONFIGS.keys())
+def test_sensor_update_rebuild(benchmark, config):
+    """Time a tick that rebuilds the window, as after a restart or clock jump."""
+    sensor = _sensor(config)
+    coordinator = sensor.coordinator
+    ticks = count()
+
+    def rebuild():
+        # Jumping a day ahead never rolls
+        now = START + next(ticks) * timedelta(days=1)
+        coordinator.async_set_updated_data(coordinator._compute(now))
+        return sensor.extra_state_attributes
+
+    assert benchmark(rebuild)["segments"]
+
+
+@pytest.mark.parametrize("entries", [1, 24])
+def test_shared_entries_tick(benchmark, entries):
+    """Time one tick of many entries with the same rates, which share one forecast."""
+    sensors = [_sensor(CONFIGS["lists"]) for _ in range(entries)]
+    ticks = count()
+
+    def tick():
+        now = START + next(ticks) * HOUR
+        for sensor in sensors:
+            coordinator = sensor.coordinator
+            coordinator.async_set_updated_data(coordinator._compute(now))
+            sensor.extra_state_attributes
+        return sensors[-1].extra_state_attributes
+
+    assert benchmark(tick)["segments"]
+
+
+@pytest.mark.parametrize("config", CONFIGS.values(), ids=CONFIGS.keys())
+def test_attribute_serialization(benchmark, config):
+    """Time serializing the attributes and store their size with the results."""
+    sensor = _sensor(config)
+    coordinator = sensor.coordinator
+    coordinator.async_set_updated_data(coordinator._compute(START))
+    attributes = sensor.extra_state_attributes
+    recorded = {
+        name: value for name, value in attributes.items()
+        if name not in sensor._unrecorded_attributes
+    }
+
+    payload = benchmark(json.dumps, attributes)
+
+    benchmark.extra_info["attribute_bytes"] = len(payload)
+    benchmark.extra_info["recorded_bytes"] = len(json.dumps(recorded))
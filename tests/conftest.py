@@ -3,9 +3,12 @@
 """Pytest configuration and fixtures."""
 
 import sys
-from unittest.mock import MagicMock
+from dataclasses import dataclass
+from datetime import date, datetime
+from unittest.mock import MagicMock, patch
 
 import pytest
+import voluptuous as vol
 
 
 # Create real base classes for mocked Home Assistant entities
@@ -18,9 +21,137 @@ class MockSensorEntity:
     _attr_icon = None
     _attr_unique_id = None
     _attr_extra_state_attributes = {}
+    _unrecorded_attributes = frozenset()
+    hass = None
     
     def __init__(self):
         pass
+    
+    def async_write_ha_state(self):
+        pass
+    
+    def async_on_remove(self, func):
+        self.__dict__.setdefault("_on_remove", []).append(func)
+
+
+class MockStore:
+    """Mock Store keeping the saved data in memory."""
+    
+    def __init__(self, hass, version, key):
+        self.key = key
+        self.data = None
+        self.saves = 0
+        self.delayed = []
+    
+    async def async_load(self):
+        return self.data
+    
+    async def async_save(self, data):
+        self.data = data
+        self.saves += 1
+    
+    def async_delay_save(self, data_func, delay=0):
+        self.delayed.append((data_func, delay))
+    
+    async def async_write_delayed(self):
+        """Write the delayed saves, as the timer of the real Store would."""
+        while self.delayed:
+            data_func, _delay = self.delayed.pop(0)
+            await self.async_save(data_func())
+    
+    async def async_remove(self):
+        self.data = None
+
+
+class MockCalendarEntity:
+    """Mock CalendarEntity base class."""
+    _attr_name = None
+    _attr_icon = None
+    _attr_unique_id = None
+    hass = None
+    
+    def async_write_ha_state(self):
+        pass
+
+
+@dataclass
+class MockCalendarEvent:
+    """Mock CalendarEvent."""
+    start: datetime
+    end: datetime
+    summary: str
+    description: str | None = None
+    location: str | None = None
+    uid: str | None = None
+
+
+class MockDataUpdateCoordinator:
+    """Mock DataUpdateCoordinator base class."""
+    
+    def __init__(self, hass, logger, *, name, update_interval=None, **kwargs):
+        self.hass = hass
+        self.logger = logger
+        self.name = name
+        self.update_interval = update_interval
+        self.data = None
+        self.last_update_success = True
+        self._listeners = []
+    
+    def __class_getitem__(cls, item):
+        return cls
+    
+    async def _async_update_data(self):
+        return None
+    
+    async def async_refresh(self):
+        self.data = await self._async_update_data()
+        self.async_update_listeners()
+    
+    async def async_config_entry_first_refresh(self):
+        await self.async_refresh()
+    
+    async def async_request_refresh(self):
+        await self.async_refresh()
+    
+    def async_add_listener(self, update_callback, context=None):
+        self._listeners.append(update_callback)
+        return lambda: self._listeners.remove(update_callback)
+    
+    def async_update_listeners(self):
+        for update_callback in list(self._listeners):
+            update_callback()
+    
+    def async_set_updated_data(self, data):
+        self.data = data
+        self.async_update_listeners()
+    
+    async def async_shutdown(self):
+        pass
+
+
+class MockCoordinatorEntity:
+    """Mock CoordinatorEntity base class."""
+    
+    def __init__(self, coordinator, context=None):
+        self.coordinator = coordinator
+    
+    def __class_getitem__(cls, item):
+        return cls
+    
+    @property
+    def available(self):
+        return self.coordinator.last_update_success
+    
+    async def async_added_to_hass(self):
+        self._remove_listener = self.coordinator.async_add_listener(
+            self._handle_coordinator_update
+        )
+    
+    async def async_will_remove_from_hass(self):
+        self._remove_listener()
+    
+    def _handle_coordinator_update(self):
+        self.async_write_ha_state()
 
 
 class MockConfigFlow:
@@ -42,12 +173,37 @@ class MockConfigFlow:
         return {"version": self.VERSION, "title": title, "data": data}
 
 
+class MockOptionsFlow:
+    """Mock OptionsFlow base class, without the config_entry of Home Assistant 2024.11+."""
+    
+    def async_show_form(self, step_id, data_schema=None, errors=None):
+        return {"type": "form", "step_id": step_id, "data_schema": data_schema, "errors": errors}
+    
+    def async_create_entry(self, title, data):
+        return {"type": "create_entry", "title": title, "data": data}
+
+
+class MockDateSelector:
+    """Mock DateSelector, which checks an ISO date and keeps it as a string."""
+    
+    def __init__(self, config=None):
+        self.config = config
+    
+    def __call__(self, data):
+        try:
+            date.fromisoformat(data)
+        except (TypeError, ValueError) as err:
+            raise vol.Invalid(f"Invalid date: {data}") from err
+        return data
+
+
 # Mock homeassistant modules before any test imports
 homeassistant_mock = MagicMock()
 homeassistant_mock.__path__ = []
 
 config_entries_mock = MagicMock()
 config_entries_mock.ConfigFlow = MockConfigFlow
+config_entries_mock.OptionsFlow = MockOptionsFlow
 homeassistant_mock.config_entries = config_entries_mock
 
 core_mock = MagicMock()
@@ -61,11 +217,24 @@ homeassistant_mock.helpers = helpers_mock
 config_validation_mock = MagicMock()
 helpers_mock.config_validation = config_validation_mock
 
+event_mock = MagicMock()
+helpers_mock.event = event_mock
+
+update_coordinator_mock = MagicMock()
+update_coordinator_mock.DataUpdateCoordinator = MockDataUpdateCoordinator
+update_coordinator_mock.CoordinatorEntity = MockCoordinatorEntity
+helpers_mock.update_coordinator = update_coordinator_mock
+
+storage_mock = MagicMock()
+storage_mock.Store = MockStore
+helpers_mock.storage = storage_mock
+
 selector_mock = MagicMock()
-selector_mock.EntitySelector = MagicMock
-selector_mock.EntitySelectorConfig = MagicMock
+selector_mock.EntitySelector = MagicMock()
+selector_mock.EntitySelectorConfig = MagicMock()
 selector_mock.NumberSelector = MagicMock
 selector_mock.NumberSelectorConfig = MagicMock
+selector_mock.DateSelector = MockDateSelector
 helpers_mock.selector = selector_mock
 
 components_mock = MagicMock()
@@ -76,8 +245,35 @@ sensor_mock = MagicMock()
 sensor_mock.SensorEntity = MockSensorEntity
 components_mock.sensor = sensor_mock
 
+calendar_mock = MagicMock()
+calendar_mock.CalendarEntity = MockCalendarEntity
+calendar_mock.CalendarEvent = MockCalendarEvent
+components_mock.calendar = calendar_mock
+
+websocket_api_mock = MagicMock()
+websocket_api_mock.websocket_command = lambda schema: (lambda func: func)
+websocket_api_mock.ERR_NOT_FOUND = "not_found"
+websocket_api_mock.event_message = lambda msg_id, event: {"id": msg_id, "type": "event", "event": event}
+components_mock.websocket_api = websocket_api_mock
+
+recorder_mock = MagicMock()
+recorder_mock.__path__ = []
+components_mock.recorder = recorder_mock
+
+recorder_statistics_mock = MagicMock()
+recorder_mock.statistics = recorder_statistics_mock
+
+class MockHomeAssistantError(Exception):
+    """Mock HomeAssistantError."""
+
+
+exceptions_mock = MagicMock()
+exceptions_mock.HomeAssistantError = MockHomeAssistantError
+homeassistant_mock.exceptions = exceptions_mock
+
 const_mock = MagicMock()
 const_mock.Platform = MagicMock()
+const_mock.ATTR_UNIT_OF_MEASUREMENT = "unit_of_measurement"
 homeassistant_mock.const = const_mock
 
 util_mock = MagicMock()
@@ -89,13 +285,52 @@ sys.modules['homeassistant.config_entries'] = config_entries_mock
 sys.modules['homeassistant.core'] = core_mock
 sys.modules['homeassistant.helpers'] = helpers_mock
 sys.modules['homeassistant.helpers.config_validation'] = config_validation_mock
+sys.modules['homeassistant.helpers.event'] = event_mock
+sys.modules['homeassistant.helpers.storage'] = storage_mock
 sys.modules['homeassistant.helpers.selector'] = selector_mock
+sys.modules['homeassistant.helpers.update_coordinator'] = update_coordinator_mock
 sys.modules['homeassistant.components'] = components_mock
 sys.modules['homeassistant.components.sensor'] = sensor_mock
+sys.modules['homeassistant.components.calendar'] = calendar_mock
+sys.modules['homeassistant.components.websocket_api'] = websocket_api_mock
+sys.modules['homeassistant.components.recorder'] = recorder_mock
+sys.modules['homeassistant.components.recorder.statistics'] = recorder_statistics_mock
 sys.modules['homeassistant.const'] = const_mock
+sys.modules['homeassistant.exceptions'] = exceptions_mock
 sys.modules['homeassistant.util'] = util_mock
 
 
+@pytest.fixture(autouse=True)
+def shared_forecast_windows():
+    """Start every test without forecasts shared or memoized by earlier tests."""
+    from custom_components.vattenfall_tijdprijs import forecast
+    forecast._WINDOWS.clear()
+    forecast._forecast_range.cache_clear()
+    yield forecast._WINDOWS
+    forecast._WINDOWS.clear()
+    forecast._forecast_range.cache_clear()
+
+
+@pytest.fixture
+def refreshed_coordinator():
+    """Return a function refreshing a coordinator with the clock set to a local time.
+
+    Without a coordinator it creates one for the given entry config and
+    hass; either way the refreshed coordinator is returned.
+    """
+    from custom_components.vattenfall_tijdprijs.coordinator import VattenfallPriceCoordinator
+    
+    async def _refreshed(now, config_data=None, *, hass=None, coordinator=None):
+        with patch("custom_components.vattenfall_tijdprijs.coordinator.datetime") as mock_datetime:
+            mock_datetime.now.return_value = now
+            if coordinator is None:
+                coordinator = VattenfallPriceCoordinator(hass or MagicMock(), config_data or {})
+            await coordinator.async_refresh()
+        return coordinator
+    
+    return _refreshed
+
+
 @pytest.fixture
 def hass():
     """Return a mock Home Assistant instance."""
@@ -0,0 +1,123 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Tests for the tariff period calendar."""
+
+import pytest
+import time
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+from custom_components.vattenfall_tijdprijs.calendar import (
+    TariffPeriodCalendar,
+    async_setup_entry,
+    iter_tariff_events,
+)
+from custom_components.vattenfall_tijdprijs.const import DOMAIN
+from custom_components.vattenfall_tijdprijs.coordinator import VattenfallPriceCoordinator
+from custom_components.vattenfall_tijdprijs.pricing_data import LOCAL_TZ, compile_tariff
+
+
+def _calendar(now):
+    """Return a calendar whose coordinator was computed at now."""
+    coordinator = VattenfallPriceCoordinator(MagicMock(), {})
+    coordinator.data = coordinator._compute(now)
+    return TariffPeriodCalendar(coordinator, "test_entry_123", "Tariefperiodes", "tariff_periods")
+
+
+class TestTariffEvents:
+    """Test event generation from the tariff schedule."""
+
+    def test_summer_weekday(self):
+        """Test the periods of a summer weekday."""
+        start = datetime(2024, 6, 10, tzinfo=LOCAL_TZ)
+        events = list(iter_tariff_events(compile_tariff({}), start, start + timedelta(days=1)))
+
+        assert [event.summary for event in events] == [
+            "summer_normal", "summer_offpeak_weekday", "summer_normal",
+        ]
+        # The first and last events are whole periods, not cut at the range
+        assert events[0].start == datetime(2024, 6, 9, 16, 0, tzinfo=LOCAL_TZ)
+        assert events[1].start == datetime(2024, 6, 10, 12, 0, tzinfo=LOCAL_TZ)
+        assert events[1].end == datetime(2024, 6, 10, 16, 0, tzinfo=LOCAL_TZ)
+        assert events[2].end == datetime(2024, 6, 11, 12, 0, tzinfo=LOCAL_TZ)
+
+    def test_events_are_contiguous(self):
+        """Test that events cover a range without gaps and have unique ids."""
+        start = datetime(2024, 3, 25, tzinfo=LOCAL_TZ)
+        events = list(iter_tariff_events(compile_tariff({}), start, start + timedelta(days=14)))
+
+        for previous, event in zip(events, events[1:]):
+            assert previous.end == event.start
+            assert previous.summary != event.summary
+        assert len({event.uid for event in events}) == len(events)
+
+    def test_winter_night_across_dst(self):
+        """Test that the night off-peak spans the repeated hour on the autumn DST night."""
+        start = datetime(2024, 10, 27, tzinfo=LOCAL_TZ)
+        events = list(iter_tariff_events(compile_tariff({}), start, start + timedelta(hours=4)))
+
+        night = events[-1]
+        assert night.summary == "winter_offpeak_night"
+        assert night.end.timestamp() - night.start.timestamp() == 6 * 3600
+
+    def test_description_has_label_and_price(self):
+        """Test that the description names the period and its price."""
+        tariff = compile_tariff({})
+        start = datetime(2024, 1, 10, 13, 0, tzinfo=LOCAL_TZ)
+        event = next(iter_tariff_events(tariff, start, start))
+
+        assert event.summary == "winter_offpeak_day"
+        assert event.description.startswith("Winter dal dag (12:00-16:00)")
+        assert str(round(tariff.period_prices["winter_offpeak_day"], 6)) in event.description
+
+    def test_year_is_cheap(self):
+        """Test that a whole year of events is generated on demand quickly."""
+        start = datetime(2024, 1, 1, tzinfo=LOCAL_TZ)
+
+        started = time.perf_counter()
+        events = list(iter_tariff_events(compile_tariff({}), start, start + timedelta(days=366)))
+        elapsed = time.perf_counter() - started
+
+        assert len(events) > 1000
+        assert elapsed < 0.5
+
+
+class TestTariffPeriodCalendar:
+    """Test the calendar entity."""
+
+    def test_initialization(self):
+        """Test the entity attributes."""
+        calendar = _calendar(datetime(2024, 6, 10, 14, 0, tzinfo=LOCAL_TZ))
+
+        assert calendar._attr_name == "Tariefperiodes"
+        assert calendar._attr_unique_id == "test_entry_123_tariff_periods"
+
+    def test_current_event(self):
+        """Test that the state event is the period active at the last update."""
+        calendar = _calendar(datetime(2024, 6, 10, 14, 0, tzinfo=LOCAL_TZ))
+
+        event = calendar.event
+        assert event.summary == "summer_offpeak_weekday"
+        assert event.start == datetime(2024, 6, 10, 12, 0, tzinfo=LOCAL_TZ)
+        assert event.end == datetime(2024, 6, 10, 16, 0, tzinfo=LOCAL_TZ)
+
+    async def test_get_events(self, hass):
+        """Test that the requested range is answered from the schedule."""
+        calendar = _calendar(datetime(2024, 6, 10, 14, 0, tzinfo=LOCAL_TZ))
+        start = datetime(2024, 6, 15, tzinfo=LOCAL_TZ)
+
+        events = await calendar.async_get_events(hass, start, start + timedelta(days=2))
+
+        assert [event.summary for event in events].count("summer_offpeak_weekend") == 2
+
+    async def test_setup_entry(self, hass, mock_config_entry):
+        """Test that one calendar is added per entry."""
+        mock_config_entry.entry_id = "test_entry_123"
+        hass.data[DOMAIN] = {"test_entry_123": VattenfallPriceCoordinator(hass, {})}
+        async_add_entities = MagicMock()
+
+        await async_setup_entry(hass, mock_config_entry, async_add_entities)
+
+        entities = async_add_entities.call_args[0][0]
+        assert len(entities) == 1
+        assert isinstance(entities[0], TariffPeriodCalendar)
@@ -0,0 +1,125 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Tests for the command-line tariff series generator."""
+
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.vattenfall_tijdprijs import cli
+from custom_components.vattenfall_tijdprijs.pricing_data import LOCAL_TZ, compile_tariff
+
+PACKAGE_DIR = os.path.dirname(cli.__file__)
+
+
+def _run(*argv):
+    """Run the generator and return its output."""
+    output = io.StringIO()
+    assert cli.main(list(argv), output) == 0
+    return output.getvalue()
+
+
+class TestSteps:
+    """Test the per-step series."""
+
+    def test_csv_has_header_and_one_row_per_hour(self):
+        """Test that a day is written as a header and 24 hourly rows."""
+        rows = list(csv.reader(io.StringIO(_run("--start", "2024-06-10", "--end", "2024-06-11"))))
+
+        assert rows[0] == ["time", "period", "price"]
+        assert len(rows) == 25
+        assert rows[13] == [
+            "2024-06-10T12:00:00+02:00",
+            "summer_offpeak_weekday",
+            str(round(compile_tariff({}).price_at(datetime(2024, 6, 10, 12, tzinfo=LOCAL_TZ)), 6)),
+        ]
+
+    def test_dst_day_has_23_hours(self):
+        """Test that the spring DST day is stepped in real hours."""
+        rows = _run("--start", "2024-03-31", "--end", "2024-04-01", "--format", "jsonl").splitlines()
+
+        assert len(rows) == 23
+        assert json.loads(rows[2])["time"] == "2024-03-31T03:00:00+02:00"
+
+    def test_quarter_hour_resolution(self):
+        """Test that a day has 96 quarter-hour rows."""
+        rows = _run("--start", "2024-06-10", "--end", "2024-06-11", "--resolution", "15", "--format", "jsonl")
+
+        assert len(rows.splitlines()) == 96
+
+    def test_range_longer_than_a_chunk(self):
+        """Test that chunks join without gaps or duplicates."""
+        rows = _run("--start", "2024-01-01", "--end", "2024-03-01", "--format", "jsonl").splitlines()
+        times = [datetime.fromisoformat(json.loads(row)["time"]) for row in rows]
+
+        assert len(times) == 60 * 24
+        assert all(b - a == timedelta(hours=1) for a, b in zip(times, times[1:]))
+
+    def test_rates_from_config_file(self, tmp_path):
+        """Test that the rates, including dated versions, come from the config file."""
+        config = tmp_path / "rates.json"
+        config.write_text(json.dumps({
+            "summer_normal_levering": 0.2,
+            "rate_history": [{"summer_normal_levering": 0.1, "valid_until": "2024-06-11"}],
+        }))
+
+        rows = _run("--start", "2024-06-10", "--end", "2024-06-12", "--config", str(config), "--format", "jsonl")
+        prices = [json.loads(row)["price"] for row in rows.splitlines()]
+
+        old = compile_tariff({"summer_normal_levering": 0.1})
+        assert prices[0] == round(old.price_at(datetime(2024, 6, 10, tzinfo=LOCAL_TZ)), 6)
+        assert prices[24] - prices[0] == pytest.approx(0.1)
+
+    def test_end_before_start_is_rejected(self):
+        """Test that an empty range is a usage error."""
+        with pytest.raises(SystemExit), patch("sys.stderr", io.StringIO()):
+            cli.main(["--start", "2024-06-10", "--end", "2024-06-10"], io.StringIO())
+
+
+class TestSegments:
+    """Test the run-length series."""
+
+    def test_segments_match_the_tariff(self):
+        """Test that segments are merged over chunk boundaries like the tariff's own."""
+        start = datetime(2024, 6, 1, tzinfo=LOCAL_TZ)
+        end = datetime(2024, 7, 1, tzinfo=LOCAL_TZ)
+        tariff = compile_tariff({})
+
+        rows = _run("--start", "2024-06-01", "--end", "2024-07-01", "--segments", "--format", "jsonl")
+        segments = [json.loads(row) for row in rows.splitlines()]
+
+        expected = tariff.segments(start, end)
+        assert len(segments) == len(expected)
+        assert segments[-1] == {
+            "start": expected[-1][0].isoformat(),
+            "end": "2024-07-01T00:00:00+02:00",
+            "period": "summer_normal",
+            "price": round(expected[-1][4], 6),
+        }
+
+
+class TestScript:
+    """Test running the integration directory as a script."""
+
+    def test_runs_without_home_assistant(self, tmp_path):
+        """Test that the script never imports homeassistant."""
+        # A homeassistant package that fails as soon as it is imported
+        (tmp_path / "homeassistant").mkdir()
+        (tmp_path / "homeassistant" / "__init__.py").write_text("raise ImportError('homeassistant loaded')\n")
+        env = {**os.environ, "PYTHONPATH": str(tmp_path)}
+
+        result = subprocess.run(
+            [sys.executable, PACKAGE_DIR, "--start", "2024-06-10", "--end", "2024-06-11", "--segments"],
+            capture_output=True, text=True, env=env, check=False,
+        )
+
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.splitlines()[0] == "start,end,period,price"
+        assert len(result.stdout.splitlines()) == 4
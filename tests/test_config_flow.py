@@ -3,7 +3,14 @@
 """Tests for configuration flow."""
 
 import pytest
-from custom_components.vattenfall_tijdprijs.config_flow import VattenfallConfigFlow
+import voluptuous as vol
+from unittest.mock import MagicMock
+
+from custom_components.vattenfall_tijdprijs.config_flow import (
+    OPTION_DEFAULTS,
+    VattenfallConfigFlow,
+    VattenfallOptionsFlow,
+)
 from custom_components.vattenfall_tijdprijs.const import (
     DOMAIN,
     CONF_FIXED_DELIVERY,
@@ -16,7 +23,12 @@ from custom_components.vattenfall_tijdprijs.const import (
     DEFAULT_FIXED_GRID,
     DEFAULT_EXPORT_COMPENSATION,
     DEFAULT_EXPORT_COSTS,
+    CONF_RESOLUTION,
+    DEFAULT_RESOLUTION,
+    CONF_FORECAST_LISTS,
+    CONF_FORECAST_SEGMENTS,
 )
+from custom_components.vattenfall_tijdprijs.pricing_data import BELASTING
 
 
 class TestConfigFlow:
@@ -32,6 +44,109 @@ class TestConfigFlowInitialization:
         assert flow.VERSION == 1
 
 
+class TestConfigFlowUserStep:
+    """Test the user step."""
+
+    async def test_user_step_uses_defaults(self):
+        """Test that an empty form creates an entry with all defaults."""
+        flow = VattenfallConfigFlow()
+        result = await flow.async_step_user({})
+
+        assert result["data"][CONF_FIXED_DELIVERY] == DEFAULT_FIXED_DELIVERY
+        assert result["data"][CONF_EXPORT_COSTS] == DEFAULT_EXPORT_COSTS
+        assert result["data"][CONF_RESOLUTION] == DEFAULT_RESOLUTION
+        assert result["data"][CONF_FORECAST_LISTS] is False
+        assert result["data"][CONF_FORECAST_SEGMENTS] is False
+
+    async def test_user_step_quarter_hour_resolution(self):
+        """Test that a 15-minute resolution is stored."""
+        flow = VattenfallConfigFlow()
+        result = await flow.async_step_user({CONF_RESOLUTION: 15})
+
+        assert result["data"][CONF_RESOLUTION] == 15
+
+
+class TestOptionsFlow:
+    """Test the options flow for the rates."""
+
+    def _flow(self, data, options=None):
+        """Return an options flow for an entry."""
+        entry = MagicMock()
+        entry.data = data
+        entry.options = options or {}
+        return VattenfallConfigFlow.async_get_options_flow(entry)
+
+    def test_options_flow_handler(self):
+        """Test that the config flow provides the options flow."""
+        assert isinstance(VattenfallConfigFlow.async_get_options_flow(MagicMock()), VattenfallOptionsFlow)
+
+    async def test_form_has_all_rates_with_current_values(self):
+        """Test that the form shows every rate, prefilled from data and options."""
+        flow = self._flow(
+            {CONF_FIXED_DELIVERY: 0.4, CONF_RESOLUTION: 15},
+            {"winter_normal_levering": 0.2},
+        )
+
+        result = await flow.async_step_init()
+
+        assert result["step_id"] == "init"
+        fields = {str(key): key for key in result["data_schema"].schema}
+        assert set(fields) == set(OPTION_DEFAULTS) | {"valid_from", "cost_source"}
+        defaults = {name: fields[name].default() for name in OPTION_DEFAULTS}
+        assert len(defaults) == 12
+        assert defaults["belasting"] == BELASTING
+        assert defaults[CONF_FIXED_DELIVERY] == 0.4
+        assert defaults["winter_normal_levering"] == 0.2
+        assert defaults[CONF_EXPORT_COSTS] == DEFAULT_EXPORT_COSTS
+
+    async def test_submit_stores_options(self):
+        """Test that submitted rates become the entry options."""
+        flow = self._flow({})
+        result = await flow.async_step_init({CONF_FIXED_GRID: 1.1, "summer_normal_levering": 0.1})
+
+        assert result["type"] == "create_entry"
+        assert result["data"] == {CONF_FIXED_GRID: 1.1, "summer_normal_levering": 0.1}
+
+    async def test_valid_from_keeps_replaced_rates(self):
+        """Test that dated rates keep the previous rates in the history."""
+        flow = self._flow({CONF_FIXED_GRID: 1.1}, {"summer_normal_levering": 0.1, "belasting": 0.11})
+        result = await flow.async_step_init(
+            {"summer_normal_levering": 0.2, "belasting": 0.12, "valid_from": "2025-01-01"}
+        )
+
+        assert result["data"] == {
+            "summer_normal_levering": 0.2,
+            "belasting": 0.12,
+            "rate_history": [
+                {"summer_normal_levering": 0.1, "belasting": 0.11, "valid_until": "2025-01-01"},
+            ],
+        }
+
+    async def test_history_is_kept_without_valid_from(self):
+        """Test that correcting the current rates keeps the earlier rates."""
+        history = [{"belasting": 0.1, "valid_until": "2024-01-01"}]
+        flow = self._flow({}, {"belasting": 0.11, "rate_history": history})
+        result = await flow.async_step_init({"belasting": 0.12})
+
+        assert result["data"] == {"belasting": 0.12, "rate_history": history}
+
+    async def test_form_suggests_current_cost_source(self):
+        """Test that the cost source is optional and shows the current choice."""
+        result = await self._flow({}, {"cost_source": "sensor.power"}).async_step_init()
+
+        fields = {str(key): key for key in result["data_schema"].schema}
+        assert isinstance(fields["cost_source"], vol.Optional)
+        assert fields["cost_source"].description == {"suggested_value": "sensor.power"}
+
+    async def test_invalid_valid_from_is_rejected(self):
+        """Test that the date field only accepts ISO dates and keeps them as text."""
+        result = await self._flow({}).async_step_init()
+
+        assert result["data_schema"]({"valid_from": "2025-07-01"})["valid_from"] == "2025-07-01"
+        with pytest.raises(vol.Invalid):
+            result["data_schema"]({"valid_from": "1 juli"})
+
+
 class TestConfigFlowDefaultValues:
     """Test default values are reasonable."""
 
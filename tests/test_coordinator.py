@@ -0,0 +1,338 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Tests for the price update coordinator."""
+
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from custom_components.vattenfall_tijdprijs import (
+    async_remove_entry,
+    async_setup_entry,
+    async_unload_entry,
+)
+from custom_components.vattenfall_tijdprijs.const import DOMAIN
+from custom_components.vattenfall_tijdprijs.coordinator import VattenfallPriceCoordinator
+from custom_components.vattenfall_tijdprijs.pricing_data import LOCAL_TZ
+
+TIMER = 'custom_components.vattenfall_tijdprijs.coordinator.async_track_point_in_utc_time'
+
+
+def _next_slot(track):
+    """Return the time the last slot timer was set for."""
+    return track.call_args[0][2]
+
+
+class TestCoordinatorUpdate:
+    """Test the data computed by the coordinator."""
+
+    @patch('custom_components.vattenfall_tijdprijs.coordinator.datetime')
+    async def test_refresh_computes_price_and_forecast(self, mock_datetime):
+        """Test that one refresh computes everything the sensors need."""
+        mock_datetime.now.return_value = datetime(2024, 6, 10, 14, 0)
+        coordinator = VattenfallPriceCoordinator(MagicMock(), {})
+
+        await coordinator.async_refresh()
+
+        data = coordinator.data
+        assert data["season"] == "summer"
+        assert data["period"] == "offpeak_weekday"
+        assert data["next_change"] == datetime(2024, 6, 10, 16, 0)
+        assert len(data["hourly_prices"]) == 48
+        assert len(data["apexcharts_data"]) == 48
+        assert len(data["apexcharts_data_colored"]) == 48
+        assert data["price"] == data["hourly_prices"][0]["price"]
+        assert data["segments"][0]["price"] == data["price"]
+
+    @patch(TIMER)
+    @patch('custom_components.vattenfall_tijdprijs.coordinator.datetime')
+    async def test_refresh_is_scheduled_for_next_whole_hour(self, mock_datetime, track):
+        """Test that a timer, not polling, targets the next hourly roll."""
+        mock_datetime.now.return_value = datetime(2024, 6, 10, 14, 25, 30)
+        hass = MagicMock()
+        coordinator = VattenfallPriceCoordinator(hass, {})
+
+        await coordinator.async_refresh()
+
+        assert coordinator.update_interval is None
+        assert track.call_args[0][0] is hass
+        assert _next_slot(track) == datetime(2024, 6, 10, 15, 0)
+
+    @patch(TIMER)
+    @patch('custom_components.vattenfall_tijdprijs.coordinator.datetime')
+    async def test_slot_timer_refreshes_and_rearms(self, mock_datetime, track):
+        """Test that the timer refreshes once and sets the timer for the slot after."""
+        mock_datetime.now.return_value = datetime(2024, 6, 10, 14, 25, tzinfo=LOCAL_TZ)
+        coordinator = VattenfallPriceCoordinator(MagicMock(), {})
+        await coordinator.async_refresh()
+        slot_started = track.call_args[0][1]
+
+        mock_datetime.now.return_value = datetime(2024, 6, 10, 15, 0, tzinfo=LOCAL_TZ)
+        await slot_started(_next_slot(track))
+
+        assert coordinator.data["hourly_prices"][0]["time"] == "2024-06-10T15:00:00+02:00"
+        assert _next_slot(track) == datetime(2024, 6, 10, 16, 0, tzinfo=LOCAL_TZ)
+        assert track.call_count == 2
+        # The fired timer is not cancelled again
+        track.return_value.assert_not_called()
+
+    @patch(TIMER)
+    @patch('custom_components.vattenfall_tijdprijs.coordinator.datetime')
+    async def test_shutdown_cancels_slot_timer(self, mock_datetime, track):
+        """Test that shutting down the coordinator cancels its pending timer."""
+        mock_datetime.now.return_value = datetime(2024, 6, 10, 14, 25, tzinfo=LOCAL_TZ)
+        coordinator = VattenfallPriceCoordinator(MagicMock(), {})
+        await coordinator.async_refresh()
+
+        await coordinator.async_shutdown()
+
+        track.return_value.assert_called_once_with()
+
+    @patch(TIMER)
+    @patch('custom_components.vattenfall_tijdprijs.coordinator.datetime')
+    async def test_refresh_in_local_time_zone(self, mock_datetime, track):
+        """Test that the clock is read in Dutch local time and the forecast is aware."""
+        mock_datetime.now.return_value = datetime(2024, 10, 27, 2, 25, tzinfo=LOCAL_TZ)
+        coordinator = VattenfallPriceCoordinator(MagicMock(), {})
+
+        await coordinator.async_refresh()
+
+        mock_datetime.now.assert_called_once_with(LOCAL_TZ)
+        # The repeated 02:00, 35 minutes later
+        assert _next_slot(track) == datetime(2024, 10, 27, 1, 0, tzinfo=timezone.utc)
+        assert coordinator.data["hourly_prices"][0]["time"] == "2024-10-27T02:00:00+02:00"
+        assert coordinator.data["hourly_prices"][1]["time"] == "2024-10-27T02:00:00+01:00"
+
+    @patch(TIMER)
+    @patch('custom_components.vattenfall_tijdprijs.coordinator.datetime')
+    async def test_quarter_hour_resolution(self, mock_datetime, track):
+        """Test that a 15-minute resolution refreshes on the next quarter hour."""
+        mock_datetime.now.return_value = datetime(2024, 6, 10, 14, 25, 30)
+        coordinator = VattenfallPriceCoordinator(MagicMock(), {"resolution": 15})
+
+        await coordinator.async_refresh()
+
+        assert _next_slot(track) == datetime(2024, 6, 10, 14, 30)
+        assert coordinator.data["hourly_prices"][0]["time"] == "2024-06-10T14:15:00"
+        assert coordinator.data["hourly_prices"][0]["end"] == "2024-06-10T16:00:00"
+
+    def test_forecast_lists_follow_entry_option(self):
+        """Test that new entries skip the lists and older entries keep them."""
+        now = datetime(2024, 6, 10, 14, 0)
+        compact = VattenfallPriceCoordinator(MagicMock(), {"forecast_lists": False})._compute(now)
+        legacy = VattenfallPriceCoordinator(MagicMock(), {})._compute(now)
+
+        assert "hourly_prices" not in compact
+        assert compact["segments"] == legacy["segments"]
+        assert len(legacy["hourly_prices"]) == 48
+
+    @patch('custom_components.vattenfall_tijdprijs.coordinator.datetime')
+    async def test_listeners_notified_once_per_refresh(self, mock_datetime):
+        """Test that all subscribed sensors are fed by a single computation."""
+        mock_datetime.now.return_value = datetime(2024, 6, 10, 14, 0)
+        coordinator = VattenfallPriceCoordinator(MagicMock(), {})
+        listeners = [MagicMock() for _ in range(3)]
+        for listener in listeners:
+            coordinator.async_add_listener(listener)
+
+        with patch.object(coordinator, "_compute", wraps=coordinator._compute) as compute:
+            await coordinator.async_refresh()
+
+        assert compute.call_count == 1
+        for listener in listeners:
+            listener.assert_called_once()
+
+    @patch(TIMER)
+    @patch('custom_components.vattenfall_tijdprijs.coordinator.datetime')
+    async def test_apply_config_recompiles_in_place(self, mock_datetime, track):
+        """Test that new rates reprice the forecast and notify every listener."""
+        mock_datetime.now.return_value = datetime(2024, 6, 10, 14, 25, tzinfo=LOCAL_TZ)
+        coordinator = VattenfallPriceCoordinator(MagicMock(), {})
+        await coordinator.async_refresh()
+        forecast = coordinator.forecast
+        listener = MagicMock()
+        coordinator.async_add_listener(listener)
+        old_price = coordinator.data["price"]
+
+        coordinator.async_apply_config({"summer_offpeak_weekday_levering": 0.5})
+
+        assert coordinator.forecast is not forecast
+        assert coordinator.data["forecast_version"] == coordinator.forecast.version
+        assert coordinator.data["price"] == round(old_price - 0.017908 + 0.5, 6)
+        assert coordinator.data["segments"][0]["price"] == coordinator.data["price"]
+        assert _next_slot(track) == datetime(2024, 6, 10, 15, 0, tzinfo=LOCAL_TZ)
+        # The timer of the first refresh is replaced
+        track.return_value.assert_called_once_with()
+        listener.assert_called_once()
+
+    @patch('custom_components.vattenfall_tijdprijs.coordinator.datetime')
+    async def test_apply_config_returns_start_of_changed_rates(self, mock_datetime):
+        """Test that a rate change dated in the past reports its local midnight."""
+        now = datetime(2024, 6, 10, 14, 25, tzinfo=LOCAL_TZ)
+        mock_datetime.now.return_value = now
+        coordinator = VattenfallPriceCoordinator(MagicMock(), {})
+        await coordinator.async_refresh()
+
+        past = {"belasting": 0.12, "rate_history": [{"valid_until": "2024-06-01"}]}
+        assert coordinator.async_apply_config(past) == datetime(2024, 6, 1, tzinfo=LOCAL_TZ)
+        assert coordinator.async_apply_config({**past, "belasting": 0.13}) == now
+        future = {**past, "rate_history": [*past["rate_history"], {"valid_until": "2024-07-01"}]}
+        assert coordinator.async_apply_config(future) == now
+
+    @patch('custom_components.vattenfall_tijdprijs.coordinator.datetime')
+    async def test_entries_with_same_rates_share_forecast(self, mock_datetime):
+        """Test that only the first entry refreshing in a slot computes the forecast."""
+        mock_datetime.now.return_value = datetime(2024, 6, 10, 14, 0, tzinfo=LOCAL_TZ)
+        coordinators = [VattenfallPriceCoordinator(MagicMock(), {}) for _ in range(20)]
+        for coordinator in coordinators:
+            await coordinator.async_refresh()
+
+        forecast = coordinators[0].forecast
+        assert all(coordinator.forecast is forecast for coordinator in coordinators)
+        assert forecast.rebuilds == 1
+        assert forecast.payload_builds == 1
+        assert coordinators[-1].data["segments"] is coordinators[0].data["segments"]
+        assert coordinators[0].stats_summary()["forecast_entries"] == 20
+
+    def test_export_terms_are_not_shared(self):
+        """Test that entries with other export terms get their own forecast."""
+        default = VattenfallPriceCoordinator(MagicMock(), {})
+        other = VattenfallPriceCoordinator(MagicMock(), {"export_compensation": -0.2})
+        now = datetime(2024, 6, 10, 14, 0)
+
+        assert default.forecast is not other.forecast
+        data = other._compute(now)
+        assert data["spread"] == round(data["price"] + data["export_price"], 6)
+        assert data["segments"][0]["spread"] == data["spread"]
+        assert default._compute(now)["spread"] != data["spread"]
+
+    @patch('custom_components.vattenfall_tijdprijs.coordinator.datetime')
+    async def test_apply_config_leaves_other_entries(self, mock_datetime):
+        """Test that new rates for one entry do not reprice entries sharing its window."""
+        mock_datetime.now.return_value = datetime(2024, 6, 10, 14, 0, tzinfo=LOCAL_TZ)
+        changed = VattenfallPriceCoordinator(MagicMock(), {})
+        other = VattenfallPriceCoordinator(MagicMock(), {})
+        await changed.async_refresh()
+        await other.async_refresh()
+        price = other.data["price"]
+
+        changed.async_apply_config({"summer_offpeak_weekday_levering": 0.5})
+        await other.async_refresh()
+
+        assert changed.forecast is not other.forecast
+        assert other.data["price"] == price
+        assert other.data["segments"][0]["price"] == price
+        assert changed.data["segments"][0]["price"] > 0.5
+
+    async def test_shutdown_releases_forecast(self, shared_forecast_windows):
+        """Test that the window is dropped with the last coordinator using it."""
+        first = VattenfallPriceCoordinator(MagicMock(), {})
+        second = VattenfallPriceCoordinator(MagicMock(), {})
+
+        await first.async_shutdown()
+        assert len(shared_forecast_windows) == 1
+        await second.async_shutdown()
+        assert not shared_forecast_windows
+
+    def test_median_splits_colors(self):
+        """Test that hours at or below the median are green and above it red."""
+        coordinator = VattenfallPriceCoordinator(MagicMock(), {})
+        data = coordinator._compute(datetime(2024, 6, 10, 0, 0))
+
+        for entry in data["apexcharts_data_colored"]:
+            expected = "#27ae60" if entry["y"] <= data["median_price"] else "#e74c3c"
+            assert entry["fillColor"] == expected
+
+
+class TestEntrySetup:
+    """Test config entry setup and unload."""
+
+    @patch('custom_components.vattenfall_tijdprijs.coordinator.datetime')
+    async def test_setup_stores_refreshed_coordinator(self, mock_datetime, hass, mock_config_entry):
+        """Test that setup creates one refreshed coordinator per entry."""
+        mock_datetime.now.return_value = datetime(2024, 6, 10, 14, 0)
+        mock_config_entry.entry_id = "test_entry_123"
+        hass.config_entries.async_forward_entry_setups = AsyncMock()
+
+        assert await async_setup_entry(hass, mock_config_entry)
+
+        coordinator = hass.data[DOMAIN]["test_entry_123"]
+        assert isinstance(coordinator, VattenfallPriceCoordinator)
+        assert coordinator.data is not None
+
+    @patch('custom_components.vattenfall_tijdprijs.coordinator.datetime')
+    async def test_setup_schedules_statistics_import(self, mock_datetime, hass, mock_config_entry):
+        """Test that setup imports statistics now and registers the daily import."""
+        mock_datetime.now.return_value = datetime(2024, 6, 10, 14, 0)
+        mock_config_entry.entry_id = "test_entry_123"
+        hass.config_entries.async_forward_entry_setups = AsyncMock()
+
+        await async_setup_entry(hass, mock_config_entry)
+
+        hass.async_create_task.assert_called_once()
+        hass.async_create_task.call_args[0][0].close()
+        # The daily import job and the options listener
+        assert mock_config_entry.async_on_unload.call_count == 2
+
+    @patch('custom_components.vattenfall_tijdprijs.coordinator.datetime')
+    async def test_options_update_is_applied_without_reload(self, mock_datetime, hass, mock_config_entry):
+        """Test that the update listener applies the options to the same coordinator."""
+        mock_datetime.now.return_value = datetime(2024, 6, 10, 14, 0, tzinfo=LOCAL_TZ)
+        mock_config_entry.entry_id = "test_entry_123"
+        hass.config_entries.async_forward_entry_setups = AsyncMock()
+        await async_setup_entry(hass, mock_config_entry)
+        hass.async_create_task.call_args[0][0].close()
+        coordinator = hass.data[DOMAIN]["test_entry_123"]
+        listener = mock_config_entry.add_update_listener.call_args[0][0]
+
+        mock_config_entry.options = {"summer_offpeak_weekday_levering": 0.5}
+        with patch('custom_components.vattenfall_tijdprijs.async_import_statistics') as import_statistics:
+            await listener(hass, mock_config_entry)
+
+        assert hass.data[DOMAIN]["test_entry_123"] is coordinator
+        assert coordinator.config_data["summer_offpeak_weekday_levering"] == 0.5
+        assert coordinator.data["price"] > 0.5
+        hass.config_entries.async_reload.assert_not_called()
+        assert import_statistics.call_args[1]["since"] is not None
+
+    @patch('custom_components.vattenfall_tijdprijs.coordinator.datetime')
+    async def test_new_cost_source_reloads_entry(self, mock_datetime, hass, mock_config_entry):
+        """Test that choosing a cost source reloads the entry to add its sensor."""
+        mock_datetime.now.return_value = datetime(2024, 6, 10, 14, 0, tzinfo=LOCAL_TZ)
+        mock_config_entry.entry_id = "test_entry_123"
+        hass.config_entries.async_forward_entry_setups = AsyncMock()
+        hass.config_entries.async_reload = AsyncMock()
+        await async_setup_entry(hass, mock_config_entry)
+        hass.async_create_task.call_args[0][0].close()
+        listener = mock_config_entry.add_update_listener.call_args[0][0]
+
+        mock_config_entry.options = {"cost_source": "sensor.power"}
+        with patch('custom_components.vattenfall_tijdprijs.async_import_statistics') as import_statistics:
+            await listener(hass, mock_config_entry)
+
+        hass.config_entries.async_reload.assert_awaited_once_with("test_entry_123")
+        import_statistics.assert_not_called()
+
+    @patch('custom_components.vattenfall_tijdprijs.coordinator.datetime')
+    async def test_unload_removes_coordinator(self, mock_datetime, hass, mock_config_entry, shared_forecast_windows):
+        """Test that unloading drops the coordinator."""
+        mock_datetime.now.return_value = datetime(2024, 6, 10, 14, 0)
+        mock_config_entry.entry_id = "test_entry_123"
+        hass.config_entries.async_forward_entry_setups = AsyncMock()
+        hass.config_entries.async_unload_platforms = AsyncMock(return_value=True)
+
+        await async_setup_entry(hass, mock_config_entry)
+        assert await async_unload_entry(hass, mock_config_entry)
+
+        assert "test_entry_123" not in hass.data[DOMAIN]
+        assert not shared_forecast_windows
+
+    async def test_remove_entry_removes_meter_totals(self, hass, mock_config_entry):
+        """Test that removing an entry removes its saved meter totals."""
+        mock_config_entry.entry_id = "test_entry_123"
+        store = MagicMock(async_remove=AsyncMock())
+        with patch('custom_components.vattenfall_tijdprijs.meter_store', return_value=store) as meter_store:
+            await async_remove_entry(hass, mock_config_entry)
+
+        meter_store.assert_called_once_with(hass, "test_entry_123")
+        store.async_remove.assert_awaited_once()
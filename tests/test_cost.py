@@ -0,0 +1,320 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Tests for the running cost integrator."""
+
+import pytest
+from datetime import date, datetime, timedelta, timezone
+
+from custom_components.vattenfall_tijdprijs.cost import CostIntegrator
+from custom_components.vattenfall_tijdprijs.pricing_data import (
+    LOCAL_TZ,
+    compile_tariff,
+    get_export_price,
+)
+
+TARIFF = compile_tariff({})
+FIXED = 0.5
+
+
+def _at(day, hour, minute=0):
+    """Return a local time in June 2024."""
+    return datetime(2024, 6, day, hour, minute, tzinfo=LOCAL_TZ)
+
+
+def _saved(day):
+    """Return saved totals of a day."""
+    return {
+        "day": day.isoformat(),
+        "today_cost": 2.0,
+        "month_cost": 20.0,
+        "today_kwh": 3.0,
+        "month_kwh": 30.0,
+    }
+
+
+class _CountingTariff:
+    """Tariff wrapper counting the segment lookups."""
+
+    def __init__(self, tariff):
+        self.tariff = tariff
+        self.export_price = tariff.export_price
+        self.lookups = 0
+
+    def lookup(self, dt):
+        self.lookups += 1
+        return self.tariff.lookup(dt)
+
+    def next_change(self, dt):
+        return self.tariff.next_change(dt)
+
+
+class TestPowerSource:
+    """Test integrating a power sensor."""
+
+    def test_power_holds_until_next_reading(self):
+        """Test that the power of a reading is counted up to the next one."""
+        integrator = CostIntegrator(TARIFF, FIXED)
+        integrator.add_reading(_at(10, 13), 1000, "W")
+        integrator.add_reading(_at(10, 14), 0, "W")
+
+        assert integrator.today_kwh == pytest.approx(1.0)
+        assert integrator.today_cost == pytest.approx(FIXED + TARIFF.price_at(_at(10, 13)))
+        assert integrator.month_cost == pytest.approx(integrator.today_cost)
+
+    def test_interval_is_split_at_tariff_change(self):
+        """Test that an interval over 16:00 is priced on both sides of it."""
+        integrator = CostIntegrator(TARIFF, 0.0)
+        integrator.add_reading(_at(10, 15, 30), 2, "kW")
+        integrator.add_reading(_at(10, 16, 30), 2, "kW")
+
+        offpeak = TARIFF.price_at(_at(10, 15))
+        normal = TARIFF.price_at(_at(10, 17))
+        assert offpeak != normal
+        assert integrator.today_cost == pytest.approx(offpeak + normal)
+
+    def test_advance_carries_steady_power(self):
+        """Test that a steady power is counted without new readings."""
+        integrator = CostIntegrator(TARIFF, 0.0)
+        integrator.add_reading(_at(10, 13), 1, "kW")
+        integrator.advance(_at(10, 15))
+        integrator.add_reading(_at(10, 15), 1, "kW")
+
+        assert integrator.today_kwh == pytest.approx(2.0)
+
+    def test_exported_energy_uses_export_price(self):
+        """Test that negative power is credited at the export price."""
+        integrator = CostIntegrator(TARIFF, 0.0)
+        integrator.add_reading(_at(10, 13), -1000, "W")
+        integrator.add_reading(_at(10, 14), 0, "W")
+
+        assert integrator.today_kwh == pytest.approx(-1.0)
+        assert integrator.today_cost == pytest.approx(get_export_price({}))
+
+    def test_interrupt_skips_the_gap(self):
+        """Test that the time a source is unavailable is not counted."""
+        integrator = CostIntegrator(TARIFF, 0.0)
+        integrator.add_reading(_at(10, 13), 1, "kW")
+        integrator.interrupt(_at(10, 13, 30))
+        integrator.add_reading(_at(10, 14), 1, "kW")
+        integrator.add_reading(_at(10, 14, 30), 0, "kW")
+
+        assert integrator.today_kwh == pytest.approx(1.0)
+
+    def test_unsupported_unit_is_ignored(self):
+        """Test that a reading in an unknown unit is not used."""
+        integrator = CostIntegrator(TARIFF, 0.0)
+
+        assert not integrator.add_reading(_at(10, 13), 20, "°C")
+        assert integrator.day is None
+
+
+class TestEnergySource:
+    """Test integrating an energy meter."""
+
+    def test_meter_delta_is_spread_over_interval(self):
+        """Test that the energy between two readings is split at 16:00."""
+        integrator = CostIntegrator(TARIFF, 0.0)
+        integrator.add_reading(_at(10, 15), 100, "kWh")
+        integrator.add_reading(_at(10, 17), 102, "kWh")
+
+        assert integrator.today_kwh == pytest.approx(2.0)
+        assert integrator.today_cost == pytest.approx(
+            TARIFF.price_at(_at(10, 15)) + TARIFF.price_at(_at(10, 16))
+        )
+
+    def test_meter_reset_counts_from_zero(self):
+        """Test that a meter that went back counts its new value."""
+        integrator = CostIntegrator(TARIFF, 0.0)
+        integrator.add_reading(_at(10, 13), 5000, "Wh")
+        integrator.add_reading(_at(10, 14), 300, "Wh")
+
+        assert integrator.today_kwh == pytest.approx(0.3)
+
+    def test_readings_at_the_same_time(self):
+        """Test that a delta without elapsed time is still counted."""
+        integrator = CostIntegrator(TARIFF, 0.0)
+        integrator.add_reading(_at(10, 13), 1, "kWh")
+        integrator.add_reading(_at(10, 13), 2, "kWh")
+
+        assert integrator.today_kwh == pytest.approx(1.0)
+
+
+class TestDayAndMonth:
+    """Test the day and month totals."""
+
+    def test_midnight_starts_new_day(self):
+        """Test that today's totals restart at local midnight."""
+        integrator = CostIntegrator(TARIFF, FIXED)
+        integrator.add_reading(_at(10, 23), 1, "kW")
+        integrator.add_reading(_at(11, 1), 1, "kW")
+
+        assert integrator.day == date(2024, 6, 11)
+        assert integrator.today_kwh == pytest.approx(1.0)
+        assert integrator.today_cost == pytest.approx(FIXED + TARIFF.price_at(_at(11, 0)))
+        assert integrator.month_kwh == pytest.approx(2.0)
+        assert integrator.month_cost == pytest.approx(
+            2 * FIXED + TARIFF.price_at(_at(10, 23)) + TARIFF.price_at(_at(11, 0))
+        )
+
+    def test_new_month_resets_month_totals(self):
+        """Test that the month totals restart on the first of the month."""
+        integrator = CostIntegrator(TARIFF, FIXED)
+        integrator.add_reading(_at(30, 23), 1, "kW")
+        integrator.add_reading(datetime(2024, 7, 1, 1, tzinfo=LOCAL_TZ), 1, "kW")
+
+        assert integrator.month_kwh == pytest.approx(1.0)
+        assert integrator.month_cost == pytest.approx(integrator.today_cost)
+
+    def test_advance_starts_day_without_readings(self):
+        """Test that a quiet meter still shows a new day after midnight."""
+        integrator = CostIntegrator(TARIFF, FIXED)
+        integrator.add_reading(_at(10, 13), 100, "kWh")
+        integrator.add_reading(_at(10, 14), 101, "kWh")
+        integrator.advance(_at(11, 0, 5))
+
+        assert integrator.day == date(2024, 6, 11)
+        assert integrator.today_kwh == 0.0
+        assert integrator.today_cost == pytest.approx(FIXED)
+
+    def test_restore_continues_today(self):
+        """Test that restored totals of today are added to."""
+        integrator = CostIntegrator(TARIFF, FIXED)
+        integrator.restore(_saved(date(2024, 6, 10)))
+        integrator.add_reading(_at(10, 13), 1, "kW")
+        integrator.add_reading(_at(10, 14), 1, "kW")
+
+        price = TARIFF.price_at(_at(10, 13))
+        assert integrator.today_cost == pytest.approx(2.0 + price)
+        assert integrator.month_cost == pytest.approx(20.0 + price)
+        assert integrator.today_kwh == pytest.approx(4.0)
+
+    def test_restore_of_earlier_day_keeps_month(self):
+        """Test that totals of an earlier day only carry over the month."""
+        integrator = CostIntegrator(TARIFF, FIXED)
+        integrator.restore(_saved(date(2024, 6, 9)))
+        integrator.add_reading(_at(10, 13), 1, "kW")
+
+        assert integrator.today_cost == pytest.approx(FIXED)
+        assert integrator.month_cost == pytest.approx(20.0 + FIXED)
+        assert integrator.month_kwh == pytest.approx(30.0)
+
+
+class TestPeriodEnergy:
+    """Test the imported energy per tariff period."""
+
+    def test_energy_is_split_per_period(self):
+        """Test that an interval over 16:00 fills both period buckets."""
+        integrator = CostIntegrator(TARIFF, 0.0)
+        integrator.add_reading(_at(10, 15), 100, "kWh")
+        integrator.add_reading(_at(10, 17), 103, "kWh")
+
+        assert integrator.period_kwh["summer_offpeak_weekday"] == pytest.approx(1.5)
+        assert integrator.period_kwh["summer_normal"] == pytest.approx(1.5)
+        assert integrator.period_kwh["winter_normal"] == 0.0
+
+    def test_period_energy_is_not_reset_at_midnight(self):
+        """Test that the period buckets keep counting over days."""
+        integrator = CostIntegrator(TARIFF, 0.0)
+        integrator.add_reading(_at(10, 23), 1, "kW")
+        integrator.add_reading(_at(11, 1), 1, "kW")
+
+        assert integrator.period_kwh["summer_normal"] == pytest.approx(2.0)
+
+    def test_export_is_not_counted(self):
+        """Test that exported energy stays out of the period buckets."""
+        integrator = CostIntegrator(TARIFF, 0.0)
+        integrator.add_reading(_at(10, 13), -1, "kW")
+        integrator.add_reading(_at(10, 14), 0, "kW")
+
+        assert sum(integrator.period_kwh.values()) == 0.0
+
+    def test_saved_totals_round_trip(self):
+        """Test that saved totals continue in a new integrator."""
+        integrator = CostIntegrator(TARIFF, FIXED)
+        integrator.add_reading(_at(10, 13), 1, "kW")
+        integrator.add_reading(_at(10, 14), 1, "kW")
+
+        restored = CostIntegrator(TARIFF, FIXED)
+        restored.restore(integrator.as_dict())
+
+        assert restored.as_dict() == integrator.as_dict()
+        assert restored.period_kwh["summer_offpeak_weekday"] == pytest.approx(1.0)
+
+    def test_meter_counts_energy_while_stopped(self):
+        """Test that a meter delta after a restart is spread over the downtime."""
+        integrator = CostIntegrator(TARIFF, 0.0)
+        integrator.add_reading(_at(10, 15), 100, "kWh")
+
+        restored = CostIntegrator(TARIFF, 0.0)
+        restored.restore(integrator.as_dict())
+        restored.add_reading(_at(10, 17), 102, "kWh")
+
+        assert restored.period_kwh["summer_offpeak_weekday"] == pytest.approx(1.0)
+        assert restored.period_kwh["summer_normal"] == pytest.approx(1.0)
+
+
+class TestDstNights:
+    """Test intervals over the DST changes, ticked with local zone times."""
+
+    def _ticked(self, start_utc, hours):
+        """Return an integrator at 1 kW advanced hourly with ZoneInfo times."""
+        integrator = CostIntegrator(TARIFF, 0.0)
+        start = datetime(*start_utc, tzinfo=timezone.utc)
+        integrator.add_reading(start.astimezone(LOCAL_TZ), 1, "kW")
+        for hour in range(1, hours + 1):
+            integrator.advance((start + timedelta(hours=hour)).astimezone(LOCAL_TZ))
+        return integrator
+
+    def test_autumn_night_counts_the_repeated_hour(self):
+        """Test that six real hours over the 25-hour day count six kWh."""
+        integrator = self._ticked((2024, 10, 26, 22), 6)
+
+        assert integrator.day == date(2024, 10, 27)
+        assert integrator.today_kwh == pytest.approx(6.0)
+        assert integrator.month_kwh == pytest.approx(6.0)
+
+    def test_spring_night_skips_the_missing_hour(self):
+        """Test that four real hours over the 23-hour day count four kWh."""
+        integrator = self._ticked((2024, 3, 30, 23), 4)
+
+        assert integrator.day == date(2024, 3, 31)
+        assert integrator.today_kwh == pytest.approx(4.0)
+
+    def test_meter_delta_over_autumn_change(self):
+        """Test that a meter delta is spread over the real length of the night."""
+        integrator = CostIntegrator(TARIFF, 0.0)
+        integrator.add_reading(datetime(2024, 10, 27, 1, 0, tzinfo=LOCAL_TZ), 100, "kWh")
+        integrator.add_reading(datetime(2024, 10, 27, 4, 0, tzinfo=LOCAL_TZ), 104, "kWh")
+
+        # 01:00 to 04:00 local is four real hours, all in the night off-peak period
+        assert integrator.period_kwh["winter_offpeak_night"] == pytest.approx(4.0)
+        assert integrator.today_cost == pytest.approx(
+            4 * TARIFF.price_at(datetime(2024, 10, 27, 2, 0, tzinfo=LOCAL_TZ))
+        )
+
+
+class TestSegments:
+    """Test the cached tariff segment."""
+
+    def test_readings_in_one_segment_look_up_price_once(self):
+        """Test that per-second readings only look up a price per segment."""
+        tariff = _CountingTariff(TARIFF)
+        integrator = CostIntegrator(tariff, 0.0)
+        start = _at(10, 13)
+        for second in range(3600):
+            integrator.add_reading(start + timedelta(seconds=second), 3600, "W")
+
+        assert tariff.lookups == 1
+        assert integrator.today_kwh == pytest.approx(3599 / 1000)
+
+    def test_new_tariff_prices_later_energy(self):
+        """Test that changed rates apply to energy after the change."""
+        integrator = CostIntegrator(TARIFF, 0.0)
+        integrator.add_reading(_at(10, 13), 1, "kW")
+        integrator.add_reading(_at(10, 14), 1, "kW")
+        integrator.set_tariff(compile_tariff({"summer_offpeak_weekday_levering": 0.5}), 0.0)
+        integrator.add_reading(_at(10, 15), 1, "kW")
+
+        old = TARIFF.price_at(_at(10, 13))
+        new = integrator.tariff.price_at(_at(10, 14))
+        assert integrator.today_cost == pytest.approx(old + new)
@@ -0,0 +1,430 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Tests for the rolling forecast window."""
+
+import pytest
+from datetime import datetime, timedelta
+
+from custom_components.vattenfall_tijdprijs.forecast import (
+    ForecastWindow,
+    _forecast_range,
+    acquire_window,
+    forecast_range,
+    release_window,
+    segment_delta,
+    window_references,
+)
+from custom_components.vattenfall_tijdprijs.pricing_data import LOCAL_TZ, compile_tariff, to_utc
+
+
+def _rebuilt(tariff, now, hours=48, resolution=timedelta(hours=1)):
+    """Return a freshly built window for comparison."""
+    window = ForecastWindow(tariff, hours, resolution)
+    window.update(now)
+    return window
+
+
+class TestForecastWindowRolling:
+    """Test incremental updates of the forecast window."""
+
+    def test_initial_update_builds_window(self):
+        """Test that the first update fills the window from the hour start."""
+        window = ForecastWindow(compile_tariff({}), 48)
+
+        assert window.update(datetime(2024, 6, 10, 14, 25))
+
+        assert len(window.hourly_prices) == 48
+        assert window.hourly_prices[0]["time"] == "2024-06-10T14:00:00"
+        assert window.hourly_prices[-1]["time"] == "2024-06-12T13:00:00"
+        assert window.rebuilds == 1
+
+    def test_same_hour_is_a_no_op(self):
+        """Test that updates within the same hour do not change the window."""
+        window = ForecastWindow(compile_tariff({}), 48)
+        window.update(datetime(2024, 6, 10, 14, 0))
+
+        assert not window.update(datetime(2024, 6, 10, 14, 59))
+        assert window.rebuilds == 1
+
+    def test_rolling_matches_rebuild(self):
+        """Test that rolling hour by hour gives the same result as rebuilding."""
+        tariff = compile_tariff({})
+        # Crosses weekend, season change and several median shifts
+        now = datetime(2024, 3, 29, 10, 0)
+        window = ForecastWindow(tariff, 48)
+        window.update(now)
+
+        for _ in range(24 * 7):
+            now += timedelta(hours=1)
+            assert window.update(now)
+            expected = _rebuilt(tariff, now)
+            assert window.segments == expected.segments
+            assert window.hourly_prices == expected.hourly_prices
+            assert window.apexcharts_data == expected.apexcharts_data
+            assert window.apexcharts_data_colored == expected.apexcharts_data_colored
+            assert window.median_price == expected.median_price
+
+        assert window.rebuilds == 1
+
+    def test_segments_end_at_tariff_boundaries(self):
+        """Test that the window is held as a few contiguous segments."""
+        window = ForecastWindow(compile_tariff({}), 48)
+        window.update(datetime(2024, 6, 10, 14, 25))
+
+        segments = window.segments
+        assert segments[0]["start"] == "2024-06-10T14:00:00"
+        assert segments[0]["end"] == "2024-06-10T16:00:00"
+        assert segments[-1]["end"] == "2024-06-12T14:00:00"
+        for previous, segment in zip(segments, segments[1:]):
+            assert previous["end"] == segment["start"]
+        assert len(segments) < 10
+
+    def test_segments_carry_export_value(self):
+        """Test that the rolled segments have the export price and the spread."""
+        window = ForecastWindow(compile_tariff({"export_compensation": -0.1, "export_costs": 0.0}), 48)
+        window.update(datetime(2024, 6, 10, 14, 0))
+        window.update(datetime(2024, 6, 10, 15, 0))
+
+        for segment in window.segments:
+            assert segment["export_price"] == -0.1
+            assert segment["spread"] == round(segment["price"] - 0.1, 6)
+        assert window.rolls == 1
+
+    def test_lists_are_derived_lazily(self):
+        """Test that the entry lists are only built when read, once per window."""
+        window = ForecastWindow(compile_tariff({}), 48)
+        window.update(datetime(2024, 6, 10, 14, 0))
+        assert window._lists is None
+
+        window.hourly_prices
+        derived = window._lists
+        window.apexcharts_data
+        assert window._lists is derived
+
+        window.update(datetime(2024, 6, 10, 15, 0))
+        assert window._lists is None
+
+    def test_payload_is_shared_per_window(self):
+        """Test that the payload is built once per window and replaced when it moves."""
+        window = ForecastWindow(compile_tariff({}), 48)
+        window.update(datetime(2024, 6, 10, 14, 0))
+        payload = window.payload(lists=True)
+        version = window.version
+
+        window.update(datetime(2024, 6, 10, 14, 45))
+        assert window.version == version
+        assert window.payload(lists=True) is payload
+        assert window.payload() is not payload
+        assert window.payload()["segments"] == payload["segments"]
+        assert "hourly_prices" not in window.payload()
+
+        window.update(datetime(2024, 6, 10, 15, 0))
+        assert window.payload(lists=True) is not payload
+        assert payload["hourly_prices"][0]["time"] == "2024-06-10T14:00:00"
+        assert window.version > version
+        assert (window.payload_reads, window.payload_builds) == (6, 3)
+
+    def test_next_change_is_computed_once_per_window(self):
+        """Test that the next tariff change is shared within a slot and moves with the window."""
+        window = ForecastWindow(compile_tariff({}), 48)
+        window.update(datetime(2024, 6, 10, 15, 0))
+        assert window.next_change(datetime(2024, 6, 10, 15, 0)) == datetime(2024, 6, 10, 16, 0)
+
+        window.update(datetime(2024, 6, 10, 15, 59))
+        assert window.next_change(datetime(2024, 6, 10, 15, 59)) == datetime(2024, 6, 10, 16, 0)
+
+        window.update(datetime(2024, 6, 10, 16, 0))
+        assert window.next_change(datetime(2024, 6, 10, 16, 0)) == datetime(2024, 6, 11, 12, 0)
+
+    def test_clock_jump_rebuilds(self):
+        """Test that a jump of more than one hour rebuilds the window."""
+        window = ForecastWindow(compile_tariff({}), 48)
+        window.update(datetime(2024, 6, 10, 14, 0))
+
+        window.update(datetime(2024, 6, 10, 17, 0))
+
+        assert window.rebuilds == 2
+        assert window.hourly_prices[0]["time"] == "2024-06-10T17:00:00"
+
+    def test_clock_going_back_rebuilds(self):
+        """Test that the clock going backwards rebuilds the window."""
+        window = ForecastWindow(compile_tariff({}), 48)
+        window.update(datetime(2024, 6, 10, 14, 0))
+
+        window.update(datetime(2024, 6, 10, 13, 0))
+
+        assert window.rebuilds == 2
+        assert window.hourly_prices[0]["time"] == "2024-06-10T13:00:00"
+
+    def test_published_lists_are_new_objects(self):
+        """Test that each update publishes new lists, so old states stay intact."""
+        window = ForecastWindow(compile_tariff({}), 48)
+        window.update(datetime(2024, 6, 10, 14, 0))
+        before = window.hourly_prices
+
+        window.update(datetime(2024, 6, 10, 15, 0))
+
+        assert before[0]["time"] == "2024-06-10T14:00:00"
+        assert window.hourly_prices is not before
+
+
+class TestSharedWindows:
+    """Test the registry of forecast windows shared between entries."""
+
+    def test_same_rates_share_one_window(self, shared_forecast_windows):
+        """Test that entries with the same rates get the same window."""
+        first = acquire_window(compile_tariff({}), 48)
+        second = acquire_window(compile_tariff({"summer_normal_levering": 0.115434}), 48)
+
+        assert first is second
+        assert window_references(first) == 2
+        assert len(shared_forecast_windows) == 1
+
+    def test_different_rates_or_resolution_get_own_window(self):
+        """Test that windows are only shared for identical forecasts."""
+        tariff = compile_tariff({})
+        window = acquire_window(tariff, 48)
+
+        assert acquire_window(compile_tariff({"summer_normal_levering": 0.5}), 48) is not window
+        assert acquire_window(tariff, 48, timedelta(minutes=15)) is not window
+        assert acquire_window(tariff, 24) is not window
+
+    def test_last_release_removes_window(self, shared_forecast_windows):
+        """Test that the window lives until the last entry releases it."""
+        first = acquire_window(compile_tariff({}), 48)
+        acquire_window(compile_tariff({}), 48)
+
+        release_window(first)
+        assert window_references(first) == 1
+        release_window(first)
+        assert window_references(first) == 0
+        assert not shared_forecast_windows
+        assert acquire_window(compile_tariff({}), 48) is not first
+
+
+class TestForecastWindowQuarterHours:
+    """Test the compact quarter-hour forecast."""
+
+    QUARTER = timedelta(minutes=15)
+
+    def test_equal_quarters_are_merged(self):
+        """Test that entries cover runs of equal price ending at tariff boundaries."""
+        window = ForecastWindow(compile_tariff({}), 48, self.QUARTER)
+        window.update(datetime(2024, 6, 10, 14, 20))
+
+        entries = window.hourly_prices
+        assert entries[0]["time"] == "2024-06-10T14:15:00"
+        assert entries[0]["end"] == "2024-06-10T16:00:00"
+        assert entries[1]["time"] == "2024-06-10T16:00:00"
+        assert entries[1]["end"] == "2024-06-11T12:00:00"
+        assert entries[-1]["end"] == "2024-06-12T14:15:00"
+        assert len(entries) < 10
+        assert len(window.apexcharts_data) == len(window.apexcharts_data_colored) == len(entries)
+
+    def test_median_is_weighted_by_slots(self):
+        """Test that the median is taken over all quarters, not over entries."""
+        tariff = compile_tariff({})
+        quarter = _rebuilt(tariff, datetime(2024, 6, 10, 14, 0), resolution=self.QUARTER)
+        hourly = _rebuilt(tariff, datetime(2024, 6, 10, 14, 0))
+
+        assert quarter.median_price == hourly.median_price
+
+    def test_rolling_matches_rebuild(self):
+        """Test that rolling quarter by quarter gives the same result as rebuilding."""
+        tariff = compile_tariff({})
+        now = datetime(2024, 3, 29, 10, 0)
+        window = ForecastWindow(tariff, 48, self.QUARTER)
+        window.update(now)
+
+        for _ in range(4 * 24 * 4):
+            now += self.QUARTER
+            assert window.update(now)
+            expected = _rebuilt(tariff, now, resolution=self.QUARTER)
+            assert window.segments == expected.segments
+            assert window.hourly_prices == expected.hourly_prices
+            assert window.apexcharts_data == expected.apexcharts_data
+            assert window.apexcharts_data_colored == expected.apexcharts_data_colored
+            assert window.median_price == expected.median_price
+
+        assert window.rebuilds == 1
+
+    def test_invalid_resolution(self):
+        """Test that a resolution that does not divide an hour is rejected."""
+        with pytest.raises(ValueError):
+            ForecastWindow(compile_tariff({}), 48, timedelta(minutes=25))
+
+
+class TestForecastWindowDst:
+    """Test the forecast over DST nights."""
+
+    def test_spring_forward_has_no_missing_hour(self):
+        """Test that 48 real hours are forecast across the short night."""
+        window = ForecastWindow(compile_tariff({}), 48)
+        window.update(datetime(2024, 3, 30, 12, 0, tzinfo=LOCAL_TZ))
+
+        times = [entry["time"] for entry in window.hourly_prices]
+        assert len(times) == len(set(times)) == 48
+        assert "2024-03-31T01:00:00+01:00" in times
+        assert times[times.index("2024-03-31T01:00:00+01:00") + 1] == "2024-03-31T03:00:00+02:00"
+        assert times[-1] == "2024-04-01T12:00:00+02:00"
+
+    def test_fall_back_keeps_repeated_hour(self):
+        """Test that the repeated hour is forecast twice with its own offset."""
+        window = ForecastWindow(compile_tariff({}), 48)
+        window.update(datetime(2024, 10, 26, 12, 0, tzinfo=LOCAL_TZ))
+
+        times = [entry["time"] for entry in window.hourly_prices]
+        assert len(set(times)) == 48
+        assert "2024-10-27T02:00:00+02:00" in times
+        assert "2024-10-27T02:00:00+01:00" in times
+        assert times[-1] == "2024-10-28T10:00:00+01:00"
+
+    def test_rolling_matches_rebuild_across_dst(self):
+        """Test that rolling through both DST nights matches rebuilding."""
+        tariff = compile_tariff({})
+        for now in (
+            datetime(2024, 3, 29, 10, 0, tzinfo=LOCAL_TZ),
+            datetime(2024, 10, 25, 10, 0, tzinfo=LOCAL_TZ),
+        ):
+            window = ForecastWindow(tariff, 48)
+            window.update(now)
+            for _ in range(24 * 4):
+                now = to_utc(now) + timedelta(hours=1)
+                assert window.update(now)
+                expected = _rebuilt(tariff, now)
+                assert window.segments == expected.segments
+                assert window.hourly_prices == expected.hourly_prices
+                assert window.median_price == expected.median_price
+
+            assert window.rebuilds == 1
+
+
+class TestForecastWindowRateChanges:
+    """Test the forecast over a change of rates."""
+
+    def test_rolling_matches_rebuild_across_rate_change(self):
+        """Test that rolling through a new rate version matches rebuilding."""
+        tariff = compile_tariff({
+            "belasting": 0.12,
+            "rate_history": [{"belasting": 0.11, "valid_until": "2025-01-01"}],
+        })
+        now = datetime(2024, 12, 30, 10, 0, tzinfo=LOCAL_TZ)
+        window = ForecastWindow(tariff, 48)
+        window.update(now)
+
+        for _ in range(24 * 3):
+            now = to_utc(now) + timedelta(hours=1)
+            window.update(now)
+            expected = _rebuilt(tariff, now)
+            assert window.segments == expected.segments
+            assert window.median_price == expected.median_price
+            assert window.next_change(now) == tariff.next_change(now)
+
+        assert window.rebuilds == 1
+
+
+class TestForecastRange:
+    """Test the forecast computed on request."""
+
+    def test_matches_window(self):
+        """Test that a requested forecast equals a window over the same range."""
+        tariff = compile_tariff({})
+        now = datetime(2024, 6, 10, 14, 25, tzinfo=LOCAL_TZ)
+
+        result = forecast_range(tariff, now, 72, timedelta(minutes=15))
+        window = _rebuilt(tariff, now, 72, timedelta(minutes=15))
+
+        assert result["start"] == "2024-06-10T14:15:00+02:00"
+        assert result["end"] == "2024-06-13T14:15:00+02:00"
+        assert result["resolution"] == 15
+        assert result["segments"] == window.segments
+        assert result["median_price"] == round(window.median_price, 6)
+        assert result["min_price"] == min(s["price"] for s in window.segments)
+        assert result["max_price"] == max(s["price"] for s in window.segments)
+
+    def test_same_slot_is_memoized(self):
+        """Test that requests within one slot share a single computation."""
+        tariff = compile_tariff({})
+
+        first = forecast_range(tariff, datetime(2024, 6, 10, 14, 5, tzinfo=LOCAL_TZ), 168)
+        again = forecast_range(tariff, datetime(2024, 6, 10, 14, 55, tzinfo=LOCAL_TZ), 168)
+        later = forecast_range(tariff, datetime(2024, 6, 10, 15, 5, tzinfo=LOCAL_TZ), 168)
+
+        assert again is first
+        assert later is not first
+        assert _forecast_range.cache_info().hits == 1
+        assert _forecast_range.cache_info().misses == 2
+
+    def test_rates_are_part_of_the_key(self):
+        """Test that other rates do not get the memoized forecast."""
+        now = datetime(2024, 6, 10, 14, 0, tzinfo=LOCAL_TZ)
+
+        default = forecast_range(compile_tariff({}), now, 48)
+        changed = forecast_range(compile_tariff({"summer_normal_levering": 0.5}), now, 48)
+
+        assert changed["max_price"] > default["max_price"]
+
+    def test_long_horizon_crosses_dst(self):
+        """Test that a forecast over a DST change keeps every slot one hour long."""
+        result = forecast_range(
+            compile_tariff({}), datetime(2024, 10, 20, 0, 0, tzinfo=LOCAL_TZ), 24 * 14
+        )
+
+        assert result["start"] == "2024-10-20T00:00:00+02:00"
+        assert result["end"] == "2024-11-02T23:00:00+01:00"
+        assert result["segments"][-1]["end"] == result["end"]
+
+
+def _apply_delta(segments, delta):
+    """Apply a segment delta as a subscriber would."""
+    kept = segments[delta["drop_head"]:len(segments) - delta["drop_tail"]]
+    return delta["head"] + kept + delta["tail"]
+
+
+class TestSegmentDelta:
+    """Test the splice between two lists of forecast segments."""
+
+    def test_roll_sends_only_first_and_last_segments(self):
+        """Test that every hourly roll is a small splice reproducing the window."""
+        now = datetime(2024, 6, 10, 9, 0, tzinfo=LOCAL_TZ)
+        window = ForecastWindow(compile_tariff({}), 48)
+        window.update(now)
+
+        for _ in range(48):
+            old = window.segments
+            now = to_utc(now) + timedelta(hours=1)
+            window.update(now)
+            delta = segment_delta(old, window.segments)
+
+            assert _apply_delta(old, delta) == window.segments
+            assert len(delta["head"]) + len(delta["tail"]) <= 2
+
+    def test_quarter_hour_roll(self):
+        """Test the splice of a quarter-hour window."""
+        now = datetime(2024, 6, 10, 11, 45, tzinfo=LOCAL_TZ)
+        window = ForecastWindow(compile_tariff({}), 48, timedelta(minutes=15))
+        window.update(now)
+        old = window.segments
+        window.update(now + timedelta(minutes=15))
+
+        delta = segment_delta(old, window.segments)
+
+        assert delta["drop_head"] == 1
+        assert delta["head"] == []
+        assert _apply_delta(old, delta) == window.segments
+
+    def test_repricing_keeps_nothing(self):
+        """Test that new prices for every segment give no splice."""
+        now = datetime(2024, 6, 10, 9, 0, tzinfo=LOCAL_TZ)
+        old = _rebuilt(compile_tariff({}), now).segments
+        new = _rebuilt(compile_tariff({"belasting": 0.2}), now).segments
+
+        assert segment_delta(old, new) is None
+
+    def test_unchanged_segments(self):
+        """Test that equal lists give an empty splice."""
+        segments = _rebuilt(compile_tariff({}), datetime(2024, 6, 10, 9, 0, tzinfo=LOCAL_TZ)).segments
+
+        assert segment_delta(segments, list(segments)) == {
+            "drop_head": 0, "head": [], "drop_tail": 0, "tail": [],
+        }
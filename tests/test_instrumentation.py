@@ -0,0 +1,103 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Tests for the update instrumentation."""
+
+import logging
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from custom_components.vattenfall_tijdprijs.coordinator import VattenfallPriceCoordinator
+from custom_components.vattenfall_tijdprijs.instrumentation import UpdateStats
+
+
+class TestUpdateStats:
+    """Test the counters."""
+
+    def test_disabled_without_subscribers_or_debug(self):
+        """Test that collection is off by default and follows debug logging."""
+        logger = logging.getLogger("test_instrumentation")
+        logger.setLevel(logging.INFO)
+        stats = UpdateStats(logger)
+        assert not stats.enabled
+
+        logger.setLevel(logging.DEBUG)
+        assert stats.enabled
+
+        logger.setLevel(logging.INFO)
+        stats.subscribers = 1
+        assert stats.enabled
+
+    def test_latency_percentiles(self):
+        """Test nearest-rank percentiles in milliseconds."""
+        stats = UpdateStats(MagicMock())
+        assert stats.latency_percentiles() == {"p50": None, "p95": None, "p99": None}
+
+        for ms in range(1, 101):
+            stats.record_update(ms / 1000)
+
+        assert stats.latency_percentiles() == {"p50": 51.0, "p95": 96.0, "p99": 100.0}
+        assert stats.updates == 100
+
+    def test_samples_are_bounded(self):
+        """Test that only the most recent timings are kept."""
+        stats = UpdateStats(MagicMock(), samples=10)
+        for _ in range(100):
+            stats.record_update(0.001)
+
+        assert len(stats.latencies) == 10
+        assert stats.updates == 100
+
+    def test_state_write_size(self):
+        """Test that the serialized attribute size of the last write is kept."""
+        stats = UpdateStats(MagicMock())
+        stats.record_state_write("hourly_prices", '{"a": [1, 2, 3]}')
+        stats.record_state_write("hourly_prices", '{"a": [1]}')
+
+        assert stats.state_writes == {"hourly_prices": 2}
+        assert stats.payload_bytes == {"hourly_prices": len('{"a": [1]}')}
+
+
+class TestCoordinatorInstrumentation:
+    """Test instrumentation of the coordinator updates."""
+
+    async def _refresh(self, refreshed_coordinator, coordinator, *hours):
+        """Refresh the coordinator at the given hours of 10 June 2024."""
+        for hour in hours:
+            await refreshed_coordinator(datetime(2024, 6, 10, hour, 0), coordinator=coordinator)
+
+    async def test_off_by_default(self, refreshed_coordinator):
+        """Test that nothing is measured while instrumentation is off."""
+        coordinator = VattenfallPriceCoordinator(MagicMock(), {})
+
+        with patch('custom_components.vattenfall_tijdprijs.coordinator.time') as mock_time:
+            await self._refresh(refreshed_coordinator, coordinator, 10, 11)
+
+        mock_time.perf_counter.assert_not_called()
+        assert coordinator.stats.updates == 0
+
+    async def test_counts_recomputes_and_cache_hits(self, refreshed_coordinator):
+        """Test the summary after a rebuild, a roll, a clock jump and a repeat."""
+        coordinator = VattenfallPriceCoordinator(MagicMock(), {})
+        coordinator.stats.subscribers = 1
+
+        await self._refresh(refreshed_coordinator, coordinator, 10, 11, 15, 15)
+        summary = coordinator.stats_summary()
+
+        assert summary["updates"] == 4
+        assert summary["forecast_rebuilds"] == 2
+        assert summary["forecast_rolls"] == 1
+        # Only the repeated update reuses the payload of its window
+        assert summary["forecast_payload_hit_rate"] == 0.25
+        assert 0 <= summary["tariff_cache_hit_rate"] <= 1
+        assert summary["latency_ms"]["p50"] > 0
+
+    async def test_debug_log_summary(self, caplog, refreshed_coordinator):
+        """Test that a summary is logged per update with debug logging on."""
+        coordinator = VattenfallPriceCoordinator(MagicMock(), {})
+
+        with caplog.at_level(logging.DEBUG, logger="custom_components.vattenfall_tijdprijs.coordinator"):
+            await self._refresh(refreshed_coordinator, coordinator, 10)
+
+        assert coordinator.stats.updates == 1
+        assert "Update statistics" in caplog.text
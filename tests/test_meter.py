@@ -0,0 +1,127 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Tests for the source meter shared by the cost and energy sensors."""
+
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+from custom_components.vattenfall_tijdprijs.const import CONF_FIXED_DELIVERY
+from custom_components.vattenfall_tijdprijs.meter import SourceMeter
+from custom_components.vattenfall_tijdprijs.pricing_data import LOCAL_TZ, get_fixed_daily_cost
+
+SOURCE = "sensor.power"
+START = datetime(2024, 6, 10, 13, 0, tzinfo=LOCAL_TZ)
+
+
+def _event(when, state, unit="W"):
+    """Return a state change event of the source."""
+    new_state = MagicMock()
+    new_state.state = state
+    new_state.last_updated = when
+    new_state.attributes = {"unit_of_measurement": unit}
+    return MagicMock(data={"new_state": new_state})
+
+
+async def _meter(refreshed_coordinator, saved=None):
+    """Return a started meter for an entry refreshed at START."""
+    coordinator = await refreshed_coordinator(START)
+    meter = SourceMeter(MagicMock(), coordinator, "test_entry_123", SOURCE)
+    meter._store.data = saved
+    with patch('custom_components.vattenfall_tijdprijs.meter.async_track_state_change_event') as track:
+        await meter.async_start()
+    assert track.call_args[0][1] == [SOURCE]
+    return meter
+
+
+class TestSourceEvents:
+    """Test the readings taken from the source."""
+
+    async def test_power_readings_add_up(self, refreshed_coordinator):
+        """Test that the source readings are priced into the totals."""
+        meter = await _meter(refreshed_coordinator)
+        meter._handle_source_event(_event(START, "1000"))
+        meter._handle_source_event(_event(START + timedelta(hours=1), "0"))
+
+        assert meter.integrator.today_kwh == pytest.approx(1.0)
+        assert meter.integrator.period_kwh["summer_offpeak_weekday"] == pytest.approx(1.0)
+
+    async def test_unavailable_source_is_not_counted(self, refreshed_coordinator):
+        """Test that an unavailable source stops the integration."""
+        meter = await _meter(refreshed_coordinator)
+        meter._handle_source_event(_event(START, "1000"))
+        meter._handle_source_event(_event(START + timedelta(minutes=30), "unavailable"))
+        meter._handle_source_event(_event(START + timedelta(hours=2), "1000"))
+
+        assert meter.integrator.today_kwh == pytest.approx(0.5)
+
+    async def test_coordinator_update_applies_new_rates(self, refreshed_coordinator):
+        """Test that changed rates reach the integrator on the next tick."""
+        meter = await _meter(refreshed_coordinator)
+        meter.coordinator.async_apply_config({"summer_offpeak_weekday_levering": 0.5})
+
+        assert meter.integrator.tariff is meter.coordinator.tariff
+
+    async def test_changed_fixed_costs_apply_next_day(self, refreshed_coordinator):
+        """Test that a change of only the fixed costs is charged from the next day."""
+        meter = await _meter(refreshed_coordinator)
+        meter._handle_source_event(_event(START, "0"))
+        config = {CONF_FIXED_DELIVERY: 10.0}
+        with patch('custom_components.vattenfall_tijdprijs.coordinator.datetime') as mock_datetime:
+            mock_datetime.now.return_value = START
+            meter.coordinator.async_apply_config(config)
+
+        assert meter.integrator.today_cost == pytest.approx(get_fixed_daily_cost({}))
+
+        meter._handle_source_event(_event(START + timedelta(days=1), "0"))
+
+        assert meter.integrator.today_cost == pytest.approx(get_fixed_daily_cost(config))
+
+
+class TestBatching:
+    """Test the rate-limited listeners and batched saves."""
+
+    async def test_listeners_are_told_once_per_interval(self, refreshed_coordinator):
+        """Test that a source reporting every second is written once per interval."""
+        meter = await _meter(refreshed_coordinator)
+        listener = MagicMock()
+        meter.async_add_listener(listener)
+        with patch('custom_components.vattenfall_tijdprijs.meter.async_call_later') as call_later:
+            for second in range(30):
+                meter._handle_source_event(_event(START + timedelta(seconds=second), "1500"))
+
+            assert listener.call_count == 1
+            call_later.assert_called_once()
+
+            # The held back update brings the listeners up to date
+            call_later.call_args[0][2](None)
+
+        assert listener.call_count == 2
+
+    async def test_changes_are_saved_in_batches(self, refreshed_coordinator):
+        """Test that many readings schedule one save until it is written."""
+        meter = await _meter(refreshed_coordinator)
+        with patch('custom_components.vattenfall_tijdprijs.meter.async_call_later'):
+            for second in range(30):
+                meter._handle_source_event(_event(START + timedelta(seconds=second), "1500"))
+
+            assert len(meter._store.delayed) == 1
+            await meter._store.async_write_delayed()
+            meter._handle_source_event(_event(START + timedelta(seconds=30), "1500"))
+
+        assert meter._store.saves == 1
+        assert meter._store.data["period_kwh"]["summer_offpeak_weekday"] == pytest.approx(1.5 * 29 / 3600)
+        assert len(meter._store.delayed) == 1
+
+    async def test_stop_saves_and_restart_restores(self, refreshed_coordinator):
+        """Test that the totals are saved on stop and restored on the next start."""
+        meter = await _meter(refreshed_coordinator)
+        meter._handle_source_event(_event(START, "1000"))
+        meter._handle_source_event(_event(START + timedelta(hours=1), "0"))
+        await meter.async_stop()
+
+        restarted = await _meter(refreshed_coordinator, meter._store.data)
+
+        assert restarted.integrator.period_kwh == meter.integrator.period_kwh
+        assert restarted.integrator.today_cost == meter.integrator.today_cost
+        assert meter._unsubscribe == []
@@ -3,14 +3,32 @@
 """Tests for pricing data calculations."""
 
 import pytest
-from datetime import datetime
+import time
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import custom_components.vattenfall_tijdprijs.pricing_data as pricing_data
 from custom_components.vattenfall_tijdprijs.pricing_data import (
     get_import_price,
     get_season,
     get_period,
     get_hourly_prices,
+    get_day_prices,
+    get_price_segments,
+    get_next_transition,
+    compile_tariff,
+    get_price_range,
+    calculate_consumption_cost,
+    get_fixed_daily_cost,
+    get_export_price,
+    TariffTable,
+    add_rate_change,
+    PERIOD_KEYS,
     BELASTING,
+    LEVERING_CONFIG_KEYS,
     DEFAULT_LEVERING_PRICES,
+    LOCAL_TZ,
+    to_local,
 )
 
 
@@ -64,6 +82,432 @@ class TestGetPeriod:
         assert "offpeak" in period or period == "offpeaknight"
 
 
+class TestTariffTable:
+    """Test the compiled hour-of-week lookup table."""
+    
+    def test_lookup_matches_import_price_for_every_hour_of_a_year(self):
+        """Test that table lookups agree with the season/period/price functions."""
+        levering_prices = {"summer_normal_levering": 0.2, "winter_offpeak_night_levering": "0.05"}
+        table = compile_tariff(levering_prices)
+        dt = datetime(2024, 1, 1, 0, 0)
+        
+        for _ in range(366 * 24):
+            season = get_season(dt)
+            period = get_period(dt, season)
+            assert table.lookup(dt) == (season, period, get_import_price(levering_prices, season, period))
+            dt += timedelta(hours=1)
+    
+    def test_config_values_are_converted_once(self):
+        """Test that string config values are compiled to floats."""
+        table = TariffTable({"winter_normal_levering": "0.1"})
+        assert table.period_prices["winter_normal"] == pytest.approx(0.1 + BELASTING)
+    
+    def test_identical_configs_share_a_table(self):
+        """Test that the compiled table is cached per levering configuration."""
+        first = compile_tariff({"summer_normal_levering": 0.3, "fixed_grid_costs": 1.0})
+        second = compile_tariff({"summer_normal_levering": 0.3, "fixed_grid_costs": 2.0})
+        assert first is second
+    
+    def test_export_price_is_compiled(self):
+        """Test that the table carries the net export price of its config."""
+        default = compile_tariff({})
+        custom = compile_tariff({"export_compensation": -0.2, "export_costs": 0.05})
+        
+        assert default.export_price == pytest.approx(get_export_price({}))
+        assert custom.export_price == pytest.approx(-0.15)
+        assert custom is not default
+        assert custom.key != default.key
+    
+    def test_different_configs_get_different_tables(self):
+        """Test that a changed levering price compiles a new table."""
+        first = compile_tariff({"summer_normal_levering": 0.3})
+        second = compile_tariff({"summer_normal_levering": 0.4})
+        assert first is not second
+    
+    def test_config_changed_in_place_compiles_a_new_table(self):
+        """Test that a reused config object that was changed is not served stale."""
+        config = {"summer_normal_levering": 0.3, "rate_history": [
+            {"summer_normal_levering": 0.2, "valid_until": "2024-01-01"},
+        ]}
+        first = compile_tariff(config)
+        assert compile_tariff(config) is first
+    
+        config["summer_normal_levering"] = 0.4
+        second = compile_tariff(config)
+        assert second is not first
+        assert second.period_prices["summer_normal"] == pytest.approx(0.4 + BELASTING)
+    
+        config["rate_history"][0]["summer_normal_levering"] = 0.1
+        assert compile_tariff(config) is not second
+    
+    def test_all_config_keys_are_used(self):
+        """Test that every levering config key ends up in the table."""
+        table = compile_tariff({key: 1.0 for key in LEVERING_CONFIG_KEYS})
+        for price in table.period_prices.values():
+            assert price == pytest.approx(1.0 + BELASTING)
+
+
+# Energy tax raised on 1 January 2025; the summer offpeak price changed on 1 July 2024
+VERSIONED = {
+    "belasting": 0.12,
+    "rate_history": [
+        {"belasting": 0.11, "valid_until": "2025-01-01"},
+        {"belasting": 0.11, "summer_offpeak_weekday_levering": 0.03, "valid_until": "2024-07-01"},
+    ],
+}
+
+
+class TestRateVersions:
+    """Test tariffs with earlier rates in the rate history."""
+    
+    def test_lookup_uses_rates_valid_at_the_time(self):
+        """Test that each version applies from local midnight of its date."""
+        table = compile_tariff(VERSIONED)
+        
+        assert table.price_at(datetime(2024, 6, 28, 13, 0)) == pytest.approx(0.03 + 0.11)
+        assert table.price_at(datetime(2024, 7, 1, 13, 0)) == pytest.approx(0.017908 + 0.11)
+        assert table.price_at(datetime(2024, 12, 31, 23, 0)) == pytest.approx(0.140723 + 0.11)
+        assert table.price_at(datetime(2025, 1, 1, 0, 0)) == pytest.approx(0.140723 + 0.12)
+        assert table.period_prices["winter_normal"] == pytest.approx(0.140723 + 0.12)
+    
+    def test_aware_lookup_switches_at_local_midnight(self):
+        """Test that the new rates start at midnight Dutch time, not UTC."""
+        table = compile_tariff(VERSIONED)
+        midnight = datetime(2025, 1, 1, tzinfo=LOCAL_TZ)
+        
+        assert table.price_at(midnight - timedelta(seconds=1)) == pytest.approx(0.140723 + 0.11)
+        assert table.price_at(midnight) == pytest.approx(0.140723 + 0.12)
+        assert table.lookup(midnight)[2] == pytest.approx(0.140723 + 0.12)
+    
+    def test_history_order_does_not_matter(self):
+        """Test that the history is sorted and compiles to one cached table."""
+        reordered = {**VERSIONED, "rate_history": VERSIONED["rate_history"][::-1]}
+        
+        assert compile_tariff(reordered) is compile_tariff(VERSIONED)
+        assert compile_tariff(VERSIONED).change_dates == (date(2024, 7, 1), date(2025, 1, 1))
+    
+    def test_price_range_uses_each_version(self, array_backend):
+        """Test that the bulk prices change with the rates, also across DST."""
+        start = datetime(2024, 6, 30, 0, 0, tzinfo=LOCAL_TZ)
+        end = datetime(2025, 1, 2, 0, 0, tzinfo=LOCAL_TZ)
+        series = get_price_range(VERSIONED, start, end)
+        table = compile_tariff(VERSIONED)
+        
+        assert len(series.prices) == (end - start).total_seconds() // 3600 + 1
+        for ts, price in zip(series.timestamps, series.prices):
+            dt = datetime.fromtimestamp(int(ts), LOCAL_TZ)
+            assert price == pytest.approx(table.price_at(dt))
+    
+    def test_segments_split_only_on_price_changes(self):
+        """Test that a rate change inside a period ends the segment."""
+        segments = get_price_segments(VERSIONED, datetime(2024, 12, 31, 16, 0), datetime(2025, 1, 1, 6, 0))
+        
+        assert [(s["start"], s["end"]) for s in segments] == [
+            ("2024-12-31T16:00:00", "2025-01-01T00:00:00"),
+            ("2025-01-01T00:00:00", "2025-01-01T01:00:00"),
+            ("2025-01-01T01:00:00", "2025-01-01T06:00:00"),
+        ]
+        assert segments[0]["period"] == segments[1]["period"] == "normal"
+        assert segments[1]["price"] > segments[0]["price"]
+    
+    def test_unchanged_price_does_not_split_segments(self):
+        """Test that a rate change that keeps the price is merged away."""
+        config = {"rate_history": [{"valid_until": "2025-01-01"}]}
+        segments = get_price_segments(config, datetime(2024, 12, 31, 16, 0), datetime(2025, 1, 1, 6, 0))
+        
+        assert segments == get_price_segments({}, datetime(2024, 12, 31, 16, 0), datetime(2025, 1, 1, 6, 0))
+    
+    def test_next_change_includes_rate_changes(self):
+        """Test that the next price change can be a new rate version."""
+        table = compile_tariff(VERSIONED)
+        
+        assert table.next_change(datetime(2024, 12, 31, 20, 0)) == datetime(2025, 1, 1, 0, 0)
+        aware = table.next_change(datetime(2024, 12, 31, 20, 0, tzinfo=LOCAL_TZ))
+        assert aware == datetime(2025, 1, 1, 0, 0, tzinfo=LOCAL_TZ)
+        assert table.next_change(datetime(2025, 1, 1, 0, 0)) == datetime(2025, 1, 1, 1, 0)
+    
+    def test_consumption_cost_uses_rates_per_day(self):
+        """Test that consumption is priced with the rates valid on its day."""
+        readings = [(datetime(2024, 12, 31, 20, 0), 1.0), (datetime(2025, 1, 1, 20, 0), 1.0)]
+        result = calculate_consumption_cost(VERSIONED, readings)
+        
+        assert result["by_day"]["2024-12-31"]["cost"] - result["by_day"]["2025-01-01"]["cost"] == pytest.approx(-0.01)
+    
+    def test_hourly_prices_use_rates_valid_at_each_hour(self):
+        """Test that the hourly forecast changes price at the rate change."""
+        prices = get_hourly_prices(VERSIONED, datetime(2024, 12, 31, 23, 0), 2)
+        
+        assert prices[1]["price"] == round(prices[0]["price"] + 0.01, 6)
+
+
+class TestAddRateChange:
+    """Test recording dated rate changes in the history."""
+    
+    def test_first_change_keeps_current_rates(self):
+        """Test that the replaced rates are kept until the change date."""
+        config = {"belasting": 0.11, "summer_normal_levering": 0.2, "fixed_grid_costs": 1.0}
+        
+        assert add_rate_change(config, "2025-01-01") == [
+            {"summer_normal_levering": 0.2, "belasting": 0.11, "valid_until": "2025-01-01"},
+        ]
+    
+    def test_change_before_existing_history_truncates_it(self):
+        """Test that rates from the change date on are replaced, earlier ones kept."""
+        history = add_rate_change(VERSIONED, "2024-10-01")
+        
+        assert history == [
+            {"belasting": 0.11, "summer_offpeak_weekday_levering": 0.03, "valid_until": "2024-07-01"},
+            {"belasting": 0.11, "valid_until": "2024-10-01"},
+        ]
+    
+    def test_change_on_existing_date_keeps_history(self):
+        """Test that new rates from an existing change date replace the later rates only."""
+        history = add_rate_change(VERSIONED, "2024-07-01")
+        
+        assert history == [VERSIONED["rate_history"][1]]
+
+
+@pytest.fixture(params=["numpy", "array"])
+def array_backend(request, monkeypatch):
+    """Run a test with NumPy and with the stdlib array fallback."""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(pricing_data, "np", None)
+    return request.param
+
+
+class TestGetPriceRange:
+    """Test the columnar bulk price API."""
+    
+    def test_matches_per_hour_lookup_across_dst(self, array_backend):
+        """Test that every sample agrees with a per-hour lookup in local time."""
+        tz = ZoneInfo("Europe/Amsterdam")
+        table = compile_tariff({})
+        series = table.price_range(datetime(2024, 3, 30, tzinfo=tz), datetime(2024, 4, 2, tzinfo=tz))
+        
+        assert len(series.timestamps) == 71  # DST start removes one hour
+        for ts, price, code in zip(series.timestamps, series.prices, series.periods):
+            season, period, expected = table.lookup(datetime.fromtimestamp(int(ts), tz))
+            assert price == expected
+            assert PERIOD_KEYS[code] == f"{season}_{period}"
+    
+    def test_naive_range_uses_wall_clock(self, array_backend):
+        """Test that naive datetimes give one sample per wall-clock hour."""
+        series = get_price_range({}, datetime(2024, 6, 10), datetime(2024, 6, 11))
+        
+        assert len(series.timestamps) == 24
+        assert series.timestamps[1] - series.timestamps[0] == 3600
+        assert PERIOD_KEYS[series.periods[12]] == "summer_offpeak_weekday"
+        assert PERIOD_KEYS[series.periods[20]] == "summer_normal"
+    
+    def test_quarter_hour_resolution(self, array_backend):
+        """Test a sub-hour resolution."""
+        series = get_price_range({}, datetime(2024, 1, 10), datetime(2024, 1, 10, 2), timedelta(minutes=15))
+        
+        assert len(series.timestamps) == 8
+        assert [PERIOD_KEYS[code] for code in series.periods[3:5]] == ["winter_normal", "winter_offpeak_night"]
+    
+    def test_empty_range(self, array_backend):
+        """Test that an end before the start returns empty arrays."""
+        series = get_price_range({}, datetime(2024, 1, 2), datetime(2024, 1, 1))
+        assert len(series.timestamps) == len(series.prices) == len(series.periods) == 0
+    
+    def test_invalid_resolution(self):
+        """Test that a zero resolution is rejected."""
+        with pytest.raises(ValueError):
+            get_price_range({}, datetime(2024, 1, 1), datetime(2024, 1, 2), timedelta(0))
+    
+    def test_full_year_is_fast(self, array_backend):
+        """Test that a year at hourly resolution is generated in milliseconds."""
+        tz = ZoneInfo("Europe/Amsterdam")
+        table = compile_tariff({})
+        
+        started = time.perf_counter()
+        series = table.price_range(datetime(2023, 1, 1, tzinfo=tz), datetime(2024, 1, 1, tzinfo=tz))
+        elapsed = time.perf_counter() - started
+        
+        assert len(series.prices) == 8760
+        assert elapsed < 0.5
+
+
+class TestCalculateConsumptionCost:
+    """Test the consumption-series cost engine."""
+    
+    CONFIG = {
+        "fixed_delivery_costs": 0.3,
+        "fixed_grid_costs": 1.2,
+        "fixed_tax_reduction": -1.0,
+        "export_compensation": -0.1,
+        "export_costs": 0.05,
+        "summer_normal_levering": 0.2,
+    }
+    
+    def test_matches_per_reading_pricing(self):
+        """Test that bucketed pricing equals pricing every reading separately."""
+        start = datetime(2024, 3, 30, 0, 0)
+        readings = [(start + timedelta(minutes=15 * i), 0.1 + (i % 7) * 0.05) for i in range(4 * 24 * 4)]
+        
+        result = calculate_consumption_cost(self.CONFIG, readings)
+        
+        expected = 0.0
+        for dt, kwh in readings:
+            season = get_season(dt)
+            expected += kwh * get_import_price(self.CONFIG, season, get_period(dt, season))
+        assert result["import_cost"] == pytest.approx(expected)
+        assert result["import_kwh"] == pytest.approx(sum(kwh for _, kwh in readings))
+        assert set(result["by_season"]) == {"summer", "winter"}
+        assert sum(result["by_season"].values()) == pytest.approx(expected, abs=1e-5)
+    
+    def test_fixed_costs_per_day(self):
+        """Test that fixed costs are charged once per day with readings."""
+        readings = [(datetime(2024, 1, day, hour), 0.0) for day in (1, 2, 3) for hour in range(24)]
+        
+        result = calculate_consumption_cost(self.CONFIG, readings)
+        
+        assert get_fixed_daily_cost(self.CONFIG) == pytest.approx(0.5)
+        assert result["fixed_cost"] == pytest.approx(3 * 0.5)
+        assert result["total_cost"] == pytest.approx(1.5)
+        assert list(result["by_day"]) == ["2024-01-01", "2024-01-02", "2024-01-03"]
+    
+    def test_fixed_costs_default_values(self):
+        """Test that missing fixed costs fall back to the defaults."""
+        result = calculate_consumption_cost({}, [(datetime(2024, 1, 1, 10), 1.0)])
+        assert result["fixed_cost"] == pytest.approx(get_fixed_daily_cost({}))
+        assert result["total_cost"] == pytest.approx(
+            result["import_cost"] + result["fixed_cost"], abs=1e-6
+        )
+    
+    def test_export_is_credited(self):
+        """Test that negative readings are priced with the export terms."""
+        readings = [(datetime(2024, 6, 10, 13), -2.0), (datetime(2024, 6, 10, 20), 1.0)]
+        
+        result = calculate_consumption_cost(self.CONFIG, readings)
+        
+        assert get_export_price(self.CONFIG) == pytest.approx(-0.05)
+        assert result["export_kwh"] == pytest.approx(2.0)
+        assert result["export_cost"] == pytest.approx(-0.1)
+        assert result["by_period"]["summer_offpeak_weekday"]["export_kwh"] == pytest.approx(2.0)
+        assert result["by_period"]["summer_normal"]["cost"] == pytest.approx(0.2 + BELASTING)
+    
+    def test_accepts_a_generator(self):
+        """Test that readings are streamed from any iterable."""
+        readings = ((datetime(2024, 1, 1) + timedelta(hours=i), 1.0) for i in range(48))
+        result = calculate_consumption_cost({}, readings)
+        assert result["import_kwh"] == pytest.approx(48.0)
+    
+    def test_year_of_quarter_hours_is_fast(self):
+        """Test that a year of 15-minute readings is processed well under a second."""
+        start = datetime(2023, 1, 1)
+        readings = ((start + timedelta(minutes=15 * i), 0.1) for i in range(365 * 96))
+        
+        started = time.perf_counter()
+        result = calculate_consumption_cost({}, readings)
+        elapsed = time.perf_counter() - started
+        
+        assert result["import_kwh"] == pytest.approx(365 * 96 * 0.1)
+        assert len(result["by_day"]) == 365
+        assert elapsed < 1.0
+
+
+class TestGetNextTransition:
+    """Test tariff boundary calculation."""
+    
+    def test_summer_weekday_offpeak_ends_at_16(self):
+        """Test that summer off-peak ends at 16:00."""
+        assert get_next_transition(datetime(2024, 6, 10, 14, 30)) == datetime(2024, 6, 10, 16, 0)
+    
+    def test_summer_normal_spans_midnight(self):
+        """Test that the summer evening normal period runs until noon the next day."""
+        assert get_next_transition(datetime(2024, 6, 10, 20, 0)) == datetime(2024, 6, 11, 12, 0)
+    
+    def test_winter_night_offpeak_starts_at_01(self):
+        """Test that winter normal ends when the night off-peak starts."""
+        assert get_next_transition(datetime(2024, 1, 10, 23, 59)) == datetime(2024, 1, 11, 1, 0)
+    
+    def test_season_change_is_a_transition(self):
+        """Test that a season change at midnight counts as a transition."""
+        assert get_next_transition(datetime(2024, 3, 31, 20, 0)) == datetime(2024, 4, 1, 0, 0)
+    
+    def test_exact_boundary_returns_following_boundary(self):
+        """Test that a datetime on a boundary returns the next one."""
+        assert get_next_transition(datetime(2024, 1, 10, 6, 0)) == datetime(2024, 1, 10, 12, 0)
+    
+    def test_preserves_timezone(self):
+        """Test that timezone-aware input gives timezone-aware output."""
+        from zoneinfo import ZoneInfo
+        tz = ZoneInfo("Europe/Amsterdam")
+        result = get_next_transition(datetime(2024, 3, 31, 0, 30, tzinfo=tz))  # DST night
+        assert result == datetime(2024, 3, 31, 1, 0, tzinfo=tz)
+        assert result.tzinfo is tz
+    
+    def test_autumn_dst_night(self):
+        """Test that the night off-peak runs through the repeated hour."""
+        start = datetime(2024, 10, 27, 1, 30, tzinfo=LOCAL_TZ)
+        result = get_next_transition(start)
+        
+        assert result == datetime(2024, 10, 27, 6, 0, tzinfo=LOCAL_TZ)
+        assert result.timestamp() - start.timestamp() == 5.5 * 3600
+
+
+class TestLocalTime:
+    """Test the Dutch local time handling."""
+    
+    def test_dst_days_have_23_and_25_hours(self):
+        """Test that local days are cut at local midnight, including DST days."""
+        assert len(get_day_prices({}, date(2024, 3, 31))) == 23
+        assert len(get_day_prices({}, date(2024, 10, 27))) == 25
+        assert len(get_day_prices({}, date(2024, 6, 10))) == 24
+    
+    def test_spring_forward_skips_two_oclock(self):
+        """Test that the hourly forecast has no missing or duplicated hour."""
+        prices = get_hourly_prices({}, datetime(2024, 3, 31, 0, 0, tzinfo=LOCAL_TZ), hours=4)
+        
+        assert [entry["time"] for entry in prices] == [
+            "2024-03-31T00:00:00+01:00",
+            "2024-03-31T01:00:00+01:00",
+            "2024-03-31T03:00:00+02:00",
+            "2024-03-31T04:00:00+02:00",
+        ]
+        assert [entry["period"] for entry in prices] == ["normal", "offpeak_night", "offpeak_night", "offpeak_night"]
+    
+    def test_fall_back_repeats_two_oclock(self):
+        """Test that the repeated hour appears once per UTC offset."""
+        prices = get_day_prices({}, date(2024, 10, 27))
+        
+        times = [entry["time"] for entry in prices]
+        assert times[2:4] == ["2024-10-27T02:00:00+02:00", "2024-10-27T02:00:00+01:00"]
+        assert len(set(times)) == 25
+    
+    def test_to_local_matches_zoneinfo(self):
+        """Test the cached offset table against the tz database for every hour."""
+        start = datetime(2023, 12, 31, 12, 0, tzinfo=ZoneInfo("UTC"))
+        for i in range(24 * 368):
+            dt = start + timedelta(hours=i)
+            assert to_local(dt) == dt
+            assert to_local(dt).utcoffset() == dt.astimezone(LOCAL_TZ).utcoffset()
+    
+    def test_offsets_are_computed_once_per_year(self):
+        """Test that the tz database is only probed when a year is first used."""
+        pricing_data._year_offsets.cache_clear()
+        get_hourly_prices({}, datetime(2024, 1, 1, tzinfo=LOCAL_TZ), hours=24 * 366)
+        first = pricing_data._year_offsets.cache_info()
+        get_hourly_prices({}, datetime(2024, 1, 1, tzinfo=LOCAL_TZ), hours=24 * 366)
+        second = pricing_data._year_offsets.cache_info()
+        
+        assert first.misses == 2  # 2024 and the last hours in 2023 UTC
+        assert second.misses == first.misses
+    
+    def test_aware_readings_are_bucketed_by_local_day(self):
+        """Test that UTC readings land on the local day and period."""
+        utc = ZoneInfo("UTC")
+        # 23:30 UTC on 9 June is 01:30 local on 10 June
+        result = calculate_consumption_cost({}, [(datetime(2024, 6, 9, 23, 30, tzinfo=utc), 1.0)])
+        
+        assert list(result["by_day"]) == ["2024-06-10"]
+        assert list(result["by_period"]) == ["summer_normal"]
+
+
 class TestGetHourlyPrices:
     """Test hourly price calculation."""
     
@@ -101,6 +545,46 @@ class TestGetHourlyPrices:
             assert hour_data["price"] > 0
 
 
+class TestGetPriceSegments:
+    """Test run-length price segments."""
+
+    def test_segments_cover_range_without_gaps(self):
+        """Test that segments are contiguous and end at tariff boundaries."""
+        segments = get_price_segments({}, datetime(2024, 6, 10, 14, 30), datetime(2024, 6, 12, 14, 30))
+
+        assert segments[0]["start"] == "2024-06-10T14:30:00"
+        assert segments[0]["end"] == "2024-06-10T16:00:00"
+        assert segments[-1]["end"] == "2024-06-12T14:30:00"
+        for previous, segment in zip(segments, segments[1:]):
+            assert previous["end"] == segment["start"]
+            assert previous["period"] != segment["period"] or previous["season"] != segment["season"]
+
+    def test_segments_match_hourly_prices(self):
+        """Test that every hour falls in a segment with the same price."""
+        start = datetime(2024, 3, 29, 0, 0)
+        segments = get_price_segments({}, start, start + timedelta(days=4))
+        hourly = get_hourly_prices({}, start, hours=96)
+
+        for entry in hourly:
+            segment = next(s for s in segments if s["start"] <= entry["time"] < s["end"])
+            assert segment["price"] == entry["price"]
+            assert segment["period"] == entry["period"]
+
+    def test_empty_range(self):
+        """Test that an empty range has no segments."""
+        now = datetime(2024, 6, 10, 14, 0)
+        assert get_price_segments({}, now, now) == []
+
+    def test_segments_carry_export_price_and_spread(self):
+        """Test that every segment has the net export price and the spread."""
+        config = {"export_compensation": -0.12, "export_costs": 0.02}
+        segments = get_price_segments(config, datetime(2024, 6, 10, 14, 0), datetime(2024, 6, 11, 14, 0))
+
+        for segment in segments:
+            assert segment["export_price"] == -0.1
+            assert segment["spread"] == round(segment["price"] - 0.1, 6)
+
+
 class TestGetImportPrice:
     """Test import price calculation with default values."""
 
@@ -2,6 +2,7 @@
 
 """Tests for sensor entities."""
 
+import json
 import pytest
 from datetime import datetime
 from unittest.mock import MagicMock, patch, AsyncMock
@@ -12,16 +13,26 @@ from custom_components.vattenfall_tijdprijs.sensor import (
     FixedCostSensor,
     CurrentPriceSensor,
     HourlyPriceSensor,
+    UpdateStatsSensor,
+    CostSensor,
+    PeriodEnergySensor,
 )
+from custom_components.vattenfall_tijdprijs.coordinator import VattenfallPriceCoordinator
 from custom_components.vattenfall_tijdprijs.const import (
+    CONF_COST_SOURCE,
     CONF_EXPORT_COMPENSATION,
     CONF_EXPORT_COSTS,
     CONF_FIXED_DELIVERY,
     CONF_FIXED_GRID,
     CONF_FIXED_TAX_REDUCTION,
+    CONF_FORECAST_LISTS,
+    CONF_FORECAST_SEGMENTS,
     DEFAULT_UNIT_PRICE,
     DEFAULT_UNIT_FIXED,
+    DOMAIN,
 )
+from custom_components.vattenfall_tijdprijs.cost import CostIntegrator
+from custom_components.vattenfall_tijdprijs.pricing_data import LOCAL_TZ, compile_tariff
 
 
 class TestCurrentPriceSensor:
@@ -29,51 +40,115 @@ class TestCurrentPriceSensor:
     
     def test_current_price_sensor_initialization(self):
         """Test CurrentPriceSensor initializes correctly."""
-        config_data = {}
+        coordinator = VattenfallPriceCoordinator(MagicMock(), {})
         entry_id = "test_entry_123"
-        sensor = CurrentPriceSensor(config_data, entry_id, "Test Current Price", "import_price")
+        sensor = CurrentPriceSensor(coordinator, entry_id, "Test Current Price", "import_price")
         
         assert sensor._attr_name == "Test Current Price"
         assert sensor._attr_native_unit_of_measurement == DEFAULT_UNIT_PRICE
         assert sensor._attr_icon == "mdi:currency-eur"
         assert sensor._attr_unique_id == "test_entry_123_import_price"
+        assert sensor.coordinator is coordinator
     
-    @patch('custom_components.vattenfall_tijdprijs.sensor.datetime')
-    def test_current_price_value(self, mock_datetime):
+    async def test_current_price_value(self, refreshed_coordinator):
         """Test that current price is calculated correctly."""
-        mock_datetime.now.return_value = datetime(2024, 6, 10, 14, 0)  # Summer weekday 14:00
-        
-        config_data = {}
-        entry_id = "test_entry_123"
-        sensor = CurrentPriceSensor(config_data, entry_id, "Test", "import_price")
-        
-        # Call async_update to populate value
-        import asyncio
-        asyncio.run(sensor.async_update())
+        coordinator = await refreshed_coordinator(datetime(2024, 6, 10, 14, 0))  # Summer weekday 14:00
+        sensor = CurrentPriceSensor(coordinator, "test_entry_123", "Test", "import_price")
         
         price = sensor.native_value
         assert isinstance(price, float)
         assert price > 0
     
-    @patch('custom_components.vattenfall_tijdprijs.sensor.datetime')
-    def test_current_price_attributes(self, mock_datetime):
+    async def test_current_price_attributes(self, refreshed_coordinator):
         """Test extra state attributes."""
-        mock_datetime.now.return_value = datetime(2024, 6, 10, 14, 0)
-        
-        config_data = {}
-        entry_id = "test_entry_123"
-        sensor = CurrentPriceSensor(config_data, entry_id, "Test", "import_price")
-        
-        # Call async_update to populate attributes
-        import asyncio
-        asyncio.run(sensor.async_update())
+        coordinator = await refreshed_coordinator(datetime(2024, 6, 10, 14, 0))
+        sensor = CurrentPriceSensor(coordinator, "test_entry_123", "Test", "import_price")
         
         attrs = sensor.extra_state_attributes
         assert "season" in attrs
         assert "period" in attrs
-        assert "hour" in attrs
+        assert "next_change" in attrs
         assert attrs["season"] == "summer"
-        assert attrs["hour"] == 14
+        assert attrs["next_change"] == "2024-06-10T16:00:00"
+        assert attrs["spread"] == round(sensor.native_value + attrs["export_price"], 6)
+    
+    async def test_state_written_when_export_terms_change(self, refreshed_coordinator):
+        """Test that a new spread is written within the same period."""
+        coordinator = await refreshed_coordinator(datetime(2024, 6, 10, 12, 0))
+        sensor = CurrentPriceSensor(coordinator, "test_entry_123", "Test", "import_price")
+        sensor.async_write_ha_state = MagicMock()
+        await sensor.async_added_to_hass()
+        coordinator.async_set_updated_data(coordinator._compute(datetime(2024, 6, 10, 12, 0)))
+        
+        with patch('custom_components.vattenfall_tijdprijs.coordinator.datetime') as mock_datetime:
+            mock_datetime.now.return_value = datetime(2024, 6, 10, 13, 0)
+            coordinator.async_apply_config({CONF_EXPORT_COMPENSATION: -0.2})
+        
+        assert sensor.async_write_ha_state.call_count == 2
+        assert sensor.extra_state_attributes["export_price"] == round(-0.2 + 0.055781, 6)
+    
+    async def test_state_written_only_when_period_changes(self, refreshed_coordinator):
+        """Test that hourly coordinator ticks within one period skip the state write."""
+        coordinator = await refreshed_coordinator(datetime(2024, 6, 10, 12, 0))
+        sensor = CurrentPriceSensor(coordinator, "test_entry_123", "Test", "import_price")
+        sensor.async_write_ha_state = MagicMock()
+        await sensor.async_added_to_hass()
+        
+        for now in (datetime(2024, 6, 10, 12, 0), datetime(2024, 6, 10, 13, 0), datetime(2024, 6, 10, 15, 0)):
+            coordinator.async_set_updated_data(coordinator._compute(now))
+        assert sensor.async_write_ha_state.call_count == 1
+        
+        coordinator.async_set_updated_data(coordinator._compute(datetime(2024, 6, 10, 16, 0)))
+        assert sensor.async_write_ha_state.call_count == 2
+        assert sensor.extra_state_attributes["period"] == "normal"
+
+
+class TestConfiguredValueSensors:
+    """Test that configured values follow option changes."""
+    
+    async def test_option_change_updates_existing_sensors(self, refreshed_coordinator):
+        """Test that the same entities show new values after the options change."""
+        coordinator = await refreshed_coordinator(datetime(2024, 6, 10, 14, 0), {
+            CONF_EXPORT_COMPENSATION: -0.10,
+            CONF_EXPORT_COSTS: 0.05,
+            CONF_FIXED_DELIVERY: 0.30,
+            CONF_FIXED_GRID: 1.20,
+            CONF_FIXED_TAX_REDUCTION: -1.50,
+        })
+        hass = MagicMock()
+        hass.data = {DOMAIN: {"test_entry_123": coordinator}}
+        entry = MagicMock()
+        entry.entry_id = "test_entry_123"
+        entry.data = dict(coordinator.config_data)
+        async_add_entities = MagicMock()
+        await async_setup_entry(hass, entry, async_add_entities)
+        sensors = {sensor._attr_name: sensor for sensor in async_add_entities.call_args[0][0]}
+        for sensor in sensors.values():
+            sensor.hass = hass
+            sensor.async_write_ha_state = MagicMock()
+        
+        with patch('custom_components.vattenfall_tijdprijs.coordinator.datetime') as mock_datetime:
+            mock_datetime.now.return_value = datetime(2024, 6, 10, 14, 30)
+            coordinator.async_apply_config({**coordinator.config_data, CONF_FIXED_GRID: 1.40})
+        
+        assert sensors["Vaste netbeheerkosten"]._attr_native_value == 1.40
+        sensors["Vaste netbeheerkosten"].async_write_ha_state.assert_called_once()
+        sensors["Vaste leveringskosten"].async_write_ha_state.assert_not_called()
+    
+    async def test_current_price_written_when_rate_changes(self, refreshed_coordinator):
+        """Test that a new rate is written even within the same tariff period."""
+        coordinator = await refreshed_coordinator(datetime(2024, 6, 10, 12, 0))
+        sensor = CurrentPriceSensor(coordinator, "test_entry_123", "Test", "import_price")
+        sensor.async_write_ha_state = MagicMock()
+        await sensor.async_added_to_hass()
+        coordinator.async_set_updated_data(coordinator._compute(datetime(2024, 6, 10, 12, 0)))
+        
+        with patch('custom_components.vattenfall_tijdprijs.coordinator.datetime') as mock_datetime:
+            mock_datetime.now.return_value = datetime(2024, 6, 10, 13, 0)
+            coordinator.async_apply_config({"summer_offpeak_weekday_levering": 0.5})
+        
+        assert sensor.async_write_ha_state.call_count == 2
+        assert sensor.native_value > 0.5
 
 
 class TestHourlyPriceSensor:
@@ -81,27 +156,19 @@ class TestHourlyPriceSensor:
     
     def test_hourly_price_sensor_initialization(self):
         """Test HourlyPriceSensor initializes correctly."""
-        config_data = {}
+        coordinator = VattenfallPriceCoordinator(MagicMock(), {})
         entry_id = "test_entry_123"
-        sensor = HourlyPriceSensor(config_data, entry_id, "Test Hourly Prices", "hourly_prices")
+        sensor = HourlyPriceSensor(coordinator, entry_id, "Test Hourly Prices", "hourly_prices")
         
         assert sensor._attr_name == "Test Hourly Prices"
         assert sensor._attr_native_unit_of_measurement == DEFAULT_UNIT_PRICE
         assert sensor._attr_icon == "mdi:chart-line"
         assert sensor._attr_unique_id == "test_entry_123_hourly_prices"
     
-    @patch('custom_components.vattenfall_tijdprijs.sensor.datetime')
-    def test_hourly_price_attributes(self, mock_datetime):
+    async def test_hourly_price_attributes(self, refreshed_coordinator):
         """Test that hourly prices are in attributes."""
-        mock_datetime.now.return_value = datetime(2024, 6, 10, 14, 0)
-        
-        config_data = {}
-        entry_id = "test_entry_123"
-        sensor = HourlyPriceSensor(config_data, entry_id, "Test", "hourly_prices")
-        
-        # Call async_update to populate attributes
-        import asyncio
-        asyncio.run(sensor.async_update())
+        coordinator = await refreshed_coordinator(datetime(2024, 6, 10, 14, 0))
+        sensor = HourlyPriceSensor(coordinator, "test_entry_123", "Test", "hourly_prices")
         
         attrs = sensor.extra_state_attributes
         assert "hourly_prices" in attrs
@@ -115,18 +182,10 @@ class TestHourlyPriceSensor:
         assert len(attrs["apexcharts_data_colored"]) == 48
         assert attrs["forecast_hours"] == 48
     
-    @patch('custom_components.vattenfall_tijdprijs.sensor.datetime')
-    def test_hourly_prices_structure(self, mock_datetime):
+    async def test_hourly_prices_structure(self, refreshed_coordinator):
         """Test structure of hourly price data."""
-        mock_datetime.now.return_value = datetime(2024, 6, 10, 14, 0)
-        
-        config_data = {}
-        entry_id = "test_entry_123"
-        sensor = HourlyPriceSensor(config_data, entry_id, "Test", "hourly_prices")
-        
-        # Call async_update to populate attributes
-        import asyncio
-        asyncio.run(sensor.async_update())
+        coordinator = await refreshed_coordinator(datetime(2024, 6, 10, 14, 0))
+        sensor = HourlyPriceSensor(coordinator, "test_entry_123", "Test", "hourly_prices")
         
         hourly_prices = sensor.extra_state_attributes["hourly_prices"]
         first_hour = hourly_prices[0]
@@ -164,6 +223,210 @@ class TestHourlyPriceSensor:
         median_price = sensor.extra_state_attributes["median_price"]
         assert isinstance(median_price, float)
         assert median_price > 0
+    
+    async def test_forecast_lists_are_not_recorded(self, refreshed_coordinator):
+        """Test that the bulky forecast attributes are excluded from the recorder."""
+        coordinator = await refreshed_coordinator(datetime(2024, 6, 10, 14, 0))
+        sensor = HourlyPriceSensor(coordinator, "test_entry_123", "Test", "hourly_prices")
+        attrs = sensor.extra_state_attributes
+        
+        assert sensor._unrecorded_attributes == {
+            "segments", "hourly_prices", "apexcharts_data", "apexcharts_data_colored"
+        }
+        for name in sensor._unrecorded_attributes:
+            assert name in attrs
+        
+        recorded = {k: v for k, v in attrs.items() if k not in sensor._unrecorded_attributes}
+        assert set(recorded) == {
+            "forecast_hours", "resolution", "last_update", "median_price", "min_price", "max_price"
+        }
+        assert len(json.dumps(recorded)) < len(json.dumps(attrs)) / 50
+    
+    async def test_forecast_lists_disabled(self, refreshed_coordinator):
+        """Test that only the segments are published when the lists are off."""
+        coordinator = await refreshed_coordinator(
+            datetime(2024, 6, 10, 14, 0), {CONF_FORECAST_LISTS: False}
+        )
+        sensor = HourlyPriceSensor(coordinator, "test_entry_123", "Test", "hourly_prices")
+        attrs = sensor.extra_state_attributes
+        
+        assert "hourly_prices" not in attrs
+        assert "apexcharts_data" not in attrs
+        assert "apexcharts_data_colored" not in attrs
+        assert attrs["segments"][0]["start"] == "2024-06-10T14:00:00"
+        assert attrs["segments"][0]["end"] == "2024-06-10T16:00:00"
+        assert len(attrs["segments"]) < 10
+    
+    async def test_summary_only(self, refreshed_coordinator):
+        """Test that new entries only carry the forecast summary."""
+        coordinator = await refreshed_coordinator(
+            datetime(2024, 6, 10, 14, 0),
+            {CONF_FORECAST_LISTS: False, CONF_FORECAST_SEGMENTS: False},
+        )
+        sensor = HourlyPriceSensor(coordinator, "test_entry_123", "Test", "hourly_prices")
+        attrs = sensor.extra_state_attributes
+        
+        assert "segments" not in attrs
+        assert attrs["min_price"] == min(s["price"] for s in coordinator.data["segments"])
+        assert attrs["max_price"] == max(s["price"] for s in coordinator.data["segments"])
+        assert attrs["min_price"] <= attrs["median_price"] <= attrs["max_price"]
+        assert len(json.dumps(attrs)) < 250
+    
+    async def test_sensors_share_one_computation(self, refreshed_coordinator):
+        """Test that both dynamic sensors read the same coordinator snapshot."""
+        coordinator = await refreshed_coordinator(datetime(2024, 1, 10, 3, 0))
+        current = CurrentPriceSensor(coordinator, "test_entry_123", "Current", "import_price")
+        hourly = HourlyPriceSensor(coordinator, "test_entry_123", "Hourly", "hourly_prices")
+        
+        assert current.native_value == hourly.native_value
+        assert hourly.extra_state_attributes["hourly_prices"][0]["price"] == current.native_value
+    
+    async def test_repeated_update_reuses_attributes(self, refreshed_coordinator):
+        """Test that a refresh within the same slot writes and serializes nothing new."""
+        coordinator = await refreshed_coordinator(datetime(2024, 6, 10, 14, 0))
+        sensor = HourlyPriceSensor(coordinator, "test_entry_123", "Test", "hourly_prices")
+        sensor.async_write_ha_state = MagicMock()
+        await sensor.async_added_to_hass()
+        coordinator.async_set_updated_data(coordinator._compute(datetime(2024, 6, 10, 14, 0)))
+        attrs = sensor.extra_state_attributes
+        payload = sensor.serialized_attributes
+        
+        coordinator.async_set_updated_data(coordinator._compute(datetime(2024, 6, 10, 14, 30)))
+        
+        sensor.async_write_ha_state.assert_called_once()
+        assert sensor.extra_state_attributes is attrs
+        assert sensor.serialized_attributes is payload
+        assert payload == json.dumps(attrs)
+    
+    async def test_window_shift_writes_new_attributes(self, refreshed_coordinator):
+        """Test that the next slot builds and writes new attributes."""
+        coordinator = await refreshed_coordinator(datetime(2024, 6, 10, 14, 0))
+        sensor = HourlyPriceSensor(coordinator, "test_entry_123", "Test", "hourly_prices")
+        sensor.async_write_ha_state = MagicMock()
+        await sensor.async_added_to_hass()
+        coordinator.async_set_updated_data(coordinator._compute(datetime(2024, 6, 10, 14, 0)))
+        before = sensor.extra_state_attributes
+        
+        coordinator.async_set_updated_data(coordinator._compute(datetime(2024, 6, 10, 15, 0)))
+        
+        assert sensor.async_write_ha_state.call_count == 2
+        assert sensor.extra_state_attributes is not before
+        assert before["hourly_prices"][0]["time"] == "2024-06-10T14:00:00"
+        assert sensor.extra_state_attributes["hourly_prices"][0]["time"] == "2024-06-10T15:00:00"
+
+
+class TestUpdateStatsSensor:
+    """Test the update instrumentation sensor."""
+    
+    def test_disabled_by_default(self):
+        """Test that the diagnostic sensor is not enabled for new entries."""
+        coordinator = VattenfallPriceCoordinator(MagicMock(), {})
+        sensor = UpdateStatsSensor(coordinator, "test_entry_123", "Update statistieken", "update_stats")
+        
+        assert sensor._attr_entity_registry_enabled_default is False
+        assert sensor._attr_unique_id == "test_entry_123_update_stats"
+        assert not coordinator.stats.enabled
+    
+    async def test_enabling_switches_instrumentation_on(self, refreshed_coordinator):
+        """Test that the sensor measures updates and state writes while added."""
+        coordinator = await refreshed_coordinator(datetime(2024, 6, 10, 12, 0))
+        stats_sensor = UpdateStatsSensor(coordinator, "test_entry_123", "Update statistieken", "update_stats")
+        hourly = HourlyPriceSensor(coordinator, "test_entry_123", "Test", "hourly_prices")
+        await stats_sensor.async_added_to_hass()
+        await hourly.async_added_to_hass()
+        
+        await refreshed_coordinator(datetime(2024, 6, 10, 13, 0), coordinator=coordinator)
+        
+        attrs = stats_sensor.extra_state_attributes
+        assert attrs["updates"] == 1
+        assert stats_sensor.native_value >= 0
+        assert attrs["forecast_rolls"] == 1
+        assert attrs["state_writes"] == {"hourly_prices": 1}
+        assert attrs["payload_bytes"]["hourly_prices"] == len(json.dumps(hourly.extra_state_attributes))
+        
+        await stats_sensor.async_will_remove_from_hass()
+        assert not coordinator.stats.enabled
+
+
+class TestMeterSensors:
+    """Test CostSensor and PeriodEnergySensor entities."""
+    
+    @staticmethod
+    def _meter():
+        """Return a meter with an hour of 1 kW in the summer weekday off-peak."""
+        meter = MagicMock()
+        meter.source = "sensor.power"
+        meter.integrator = CostIntegrator(compile_tariff({}), 0.5)
+        meter.integrator.add_reading(datetime(2024, 6, 10, 13, 0, tzinfo=LOCAL_TZ), 1, "kW")
+        meter.integrator.add_reading(datetime(2024, 6, 10, 14, 0, tzinfo=LOCAL_TZ), 0, "kW")
+        return meter
+    
+    def test_cost_sensor_shows_today(self):
+        """Test that the cost sensor shows today's cost and this month's in attributes."""
+        meter = self._meter()
+        sensor = CostSensor(meter, "test_entry_123", "Kosten vandaag", "cost_today")
+        
+        price = compile_tariff({}).price_at(datetime(2024, 6, 10, 13, 0, tzinfo=LOCAL_TZ))
+        assert sensor._attr_native_value == pytest.approx(0.5 + price)
+        assert sensor._attr_unique_id == "test_entry_123_cost_today"
+        assert sensor._attr_last_reset == datetime(2024, 6, 10, tzinfo=LOCAL_TZ)
+        assert sensor.extra_state_attributes["month_cost"] == pytest.approx(0.5 + price)
+        assert sensor.extra_state_attributes["today_energy"] == 1.0
+        assert sensor.extra_state_attributes["day"] == "2024-06-10"
+        assert sensor.extra_state_attributes["source"] == "sensor.power"
+    
+    def test_period_energy_sensor(self):
+        """Test that a period sensor shows the energy of its period."""
+        meter = self._meter()
+        offpeak = PeriodEnergySensor(meter, "test_entry_123", "summer_offpeak_weekday")
+        normal = PeriodEnergySensor(meter, "test_entry_123", "summer_normal")
+        
+        assert offpeak._attr_name == "Verbruik zomer dal week"
+        assert offpeak._attr_unique_id == "test_entry_123_energy_summer_offpeak_weekday"
+        assert offpeak._attr_native_unit_of_measurement == "kWh"
+        assert offpeak._attr_native_value == 1.0
+        assert normal._attr_native_value == 0.0
+    
+    async def test_meter_update_writes_state(self):
+        """Test that the sensors write the new totals when the meter tells them."""
+        meter = self._meter()
+        sensor = PeriodEnergySensor(meter, "test_entry_123", "summer_normal")
+        await sensor.async_added_to_hass()
+        update = meter.async_add_listener.call_args[0][0]
+        
+        meter.integrator.add_reading(datetime(2024, 6, 10, 17, 0, tzinfo=LOCAL_TZ), 2, "kW")
+        meter.integrator.add_reading(datetime(2024, 6, 10, 18, 0, tzinfo=LOCAL_TZ), 0, "kW")
+        with patch.object(sensor, 'async_write_ha_state') as write:
+            update()
+        
+        write.assert_called_once()
+        assert sensor._attr_native_value == 2.0
+    
+    async def test_setup_adds_meter_sensors_with_source(self, refreshed_coordinator):
+        """Test that the cost and period sensors are only set up with a source."""
+        hass = MagicMock()
+        entry = MagicMock()
+        entry.entry_id = "test_entry_123"
+        entry.data = {
+            CONF_EXPORT_COMPENSATION: 0.10,
+            CONF_EXPORT_COSTS: 0.05,
+            CONF_FIXED_DELIVERY: 0.30,
+            CONF_FIXED_GRID: 1.20,
+            CONF_FIXED_TAX_REDUCTION: -1.50,
+            CONF_COST_SOURCE: "sensor.power",
+        }
+        hass.data = {DOMAIN: {"test_entry_123": await refreshed_coordinator(datetime(2024, 6, 10, 13, 0))}}
+        async_add_entities = AsyncMock()
+        
+        with patch('custom_components.vattenfall_tijdprijs.meter.async_track_state_change_event'):
+            await async_setup_entry(hass, entry, async_add_entities)
+        
+        added_entities = async_add_entities.call_args[0][0]
+        assert len(added_entities) == 15
+        assert sum(isinstance(sensor, CostSensor) for sensor in added_entities) == 1
+        assert sum(isinstance(sensor, PeriodEnergySensor) for sensor in added_entities) == 6
+        # The meter saves its totals when the entry unloads
+        entry.async_on_unload.assert_called()
 
 
 class TestPriceSensor:
@@ -273,8 +536,8 @@ class TestAsyncSetupEntry:
         # Get the entities that were added
         added_entities = async_add_entities.call_args[0][0]
         
-        # Should have 7 sensors (2 dynamic + 2 export + 3 fixed cost)
-        assert len(added_entities) == 7
+        # Should have 8 sensors (2 dynamic + 1 diagnostic + 2 export + 3 fixed cost)
+        assert len(added_entities) == 8
 
     async def test_setup_entry_sensor_names(self):
         """Test that setup_entry creates sensors with correct names."""
@@ -0,0 +1,240 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Tests for integration services."""
+
+import pytest
+import voluptuous as vol
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+from custom_components.vattenfall_tijdprijs.const import (
+    ATTR_ALLOWED_PERIODS,
+    ATTR_CONFIG_ENTRY_ID,
+    ATTR_DURATION,
+    ATTR_HOURS,
+    ATTR_LATEST_END,
+    ATTR_RESOLUTION,
+    ATTR_START,
+    DOMAIN,
+    SERVICE_FIND_CHEAPEST_WINDOW,
+    SERVICE_GET_FORECAST,
+)
+from custom_components.vattenfall_tijdprijs.coordinator import VattenfallPriceCoordinator
+from custom_components.vattenfall_tijdprijs.pricing_data import (
+    LOCAL_TZ,
+    find_cheapest_window,
+    get_hourly_prices,
+    get_price_segments,
+)
+from custom_components.vattenfall_tijdprijs.services import (
+    GET_FORECAST_SCHEMA,
+    _quarter_hours,
+    async_setup_services,
+)
+from homeassistant.exceptions import HomeAssistantError
+
+
+def _registered_handler(hass, service):
+    """Return the handler registered for a service."""
+    for call in hass.services.async_register.call_args_list:
+        if call[0][1] == service:
+            return call[0][2]
+    raise AssertionError(f"{service} not registered")
+
+
+class TestFindCheapestWindow:
+    """Test the sliding-window search."""
+
+    def test_finds_summer_weekday_offpeak(self):
+        """Test that a 2-hour block lands in the 12:00-16:00 off-peak period."""
+        forecast = get_hourly_prices({}, datetime(2024, 6, 10, 0, 0), hours=24)
+
+        window = find_cheapest_window(forecast, timedelta(hours=2))
+
+        assert window["start"] == datetime(2024, 6, 10, 12, 0)
+        assert window["end"] == datetime(2024, 6, 10, 14, 0)
+        assert window["average_price"] == forecast[12]["price"]
+
+    def test_matches_brute_force(self):
+        """Test that the linear search equals checking every start."""
+        forecast = get_hourly_prices({}, datetime(2024, 1, 12, 9, 0), hours=48)
+        duration = timedelta(hours=3, minutes=45)
+        size = 15
+
+        slots = [entry["price"] for entry in forecast for _ in range(4)]
+        sums = [sum(slots[i:i + size]) for i in range(len(slots) - size + 1)]
+        best = min(range(len(sums)), key=lambda i: (round(sums[i], 9), i))
+
+        window = find_cheapest_window(forecast, duration)
+
+        assert window["start"] == datetime(2024, 1, 12, 9, 0) + best * timedelta(minutes=15)
+        assert window["average_price"] == round(sums[best] / size, 6)
+
+    def test_earliest_start_skips_past_quarters(self):
+        """Test that blocks never start before the earliest start."""
+        forecast = get_hourly_prices({}, datetime(2024, 6, 10, 12, 0), hours=24)
+
+        window = find_cheapest_window(forecast, timedelta(hours=1), earliest_start=datetime(2024, 6, 10, 12, 7))
+
+        assert window["start"] == datetime(2024, 6, 10, 12, 15)
+
+    def test_latest_end(self):
+        """Test that blocks must end before the latest end."""
+        forecast = get_hourly_prices({}, datetime(2024, 6, 10, 0, 0), hours=24)
+
+        window = find_cheapest_window(forecast, timedelta(hours=2), latest_end=datetime(2024, 6, 10, 8, 0))
+
+        assert window["end"] <= datetime(2024, 6, 10, 8, 0)
+
+    def test_allowed_periods(self):
+        """Test that every slot of the block must be in an allowed period."""
+        forecast = get_hourly_prices({}, datetime(2024, 1, 10, 0, 0), hours=48)
+
+        window = find_cheapest_window(forecast, timedelta(hours=3), allowed_periods=["winter_offpeak_day"])
+
+        assert window["start"].hour >= 12
+        assert window["end"].hour <= 16
+
+    def test_no_fitting_block(self):
+        """Test that None is returned when no block satisfies the constraints."""
+        forecast = get_hourly_prices({}, datetime(2024, 1, 10, 0, 0), hours=48)
+
+        assert find_cheapest_window(forecast, timedelta(hours=5), allowed_periods=["winter_offpeak_day"]) is None
+
+    def test_segments_match_hourly_entries(self):
+        """Test that searching the segments gives the same block as the hours."""
+        start = datetime(2024, 1, 12, 9, 0)
+        hourly = get_hourly_prices({}, start, hours=48)
+        segments = get_price_segments({}, start, start + timedelta(hours=48))
+
+        for duration in (timedelta(minutes=45), timedelta(hours=3), timedelta(hours=7, minutes=15)):
+            assert find_cheapest_window(segments, duration) == find_cheapest_window(hourly, duration)
+
+    def test_invalid_duration(self):
+        """Test that durations that are not whole slots are rejected."""
+        with pytest.raises(ValueError):
+            find_cheapest_window([], timedelta(minutes=20))
+
+
+class TestServices:
+    """Test the registered services."""
+
+    def test_quarter_hour_validation(self):
+        """Test the duration validator."""
+        assert _quarter_hours(timedelta(minutes=45)) == timedelta(minutes=45)
+        with pytest.raises(vol.Invalid):
+            _quarter_hours(timedelta(minutes=10))
+        with pytest.raises(vol.Invalid):
+            _quarter_hours(timedelta(0))
+
+    @patch('custom_components.vattenfall_tijdprijs.services.datetime')
+    async def test_find_cheapest_window_service(self, mock_datetime, hass):
+        """Test that the service answers from the coordinator forecast."""
+        now = datetime(2024, 6, 10, 9, 30, tzinfo=LOCAL_TZ)
+        mock_datetime.now.return_value = now
+        coordinator = VattenfallPriceCoordinator(hass, {"forecast_lists": False})
+        coordinator.data = coordinator._compute(now)
+        hass.data[DOMAIN] = {"entry_1": coordinator}
+        async_setup_services(hass)
+        handler = _registered_handler(hass, SERVICE_FIND_CHEAPEST_WINDOW)
+
+        call = MagicMock()
+        call.data = {
+            ATTR_DURATION: timedelta(hours=2),
+            ATTR_LATEST_END: datetime(2024, 6, 10, 18, 0),
+            ATTR_ALLOWED_PERIODS: ["summer_offpeak_weekday"],
+        }
+        response = await handler(call)
+
+        assert response == {
+            "start": "2024-06-10T12:00:00+02:00",
+            "end": "2024-06-10T14:00:00+02:00",
+            "average_price": coordinator.data["segments"][1]["price"],
+        }
+
+    @patch('custom_components.vattenfall_tijdprijs.services.datetime')
+    async def test_service_without_result(self, mock_datetime, hass):
+        """Test the response when no block fits."""
+        now = datetime(2024, 6, 10, 9, 30, tzinfo=LOCAL_TZ)
+        mock_datetime.now.return_value = now
+        coordinator = VattenfallPriceCoordinator(hass, {})
+        coordinator.data = coordinator._compute(now)
+        hass.data[DOMAIN] = {"entry_1": coordinator}
+        async_setup_services(hass)
+        handler = _registered_handler(hass, SERVICE_FIND_CHEAPEST_WINDOW)
+
+        call = MagicMock()
+        call.data = {ATTR_DURATION: timedelta(hours=2), ATTR_LATEST_END: datetime(2024, 6, 10, 10, 0)}
+
+        assert await handler(call) == {"start": None, "end": None, "average_price": None}
+
+    async def test_unknown_entry(self, hass):
+        """Test that an unknown config entry id raises an error."""
+        hass.data[DOMAIN] = {}
+        async_setup_services(hass)
+        handler = _registered_handler(hass, SERVICE_FIND_CHEAPEST_WINDOW)
+
+        call = MagicMock()
+        call.data = {ATTR_CONFIG_ENTRY_ID: "missing", ATTR_DURATION: timedelta(hours=1)}
+
+        with pytest.raises(HomeAssistantError):
+            await handler(call)
+
+
+class TestGetForecastService:
+    """Test the on-demand forecast service."""
+
+    def test_schema(self):
+        """Test the defaults and limits of the service fields."""
+        assert GET_FORECAST_SCHEMA({}) == {ATTR_HOURS: 48}
+        assert GET_FORECAST_SCHEMA({ATTR_HOURS: "168", ATTR_RESOLUTION: "15"}) == {
+            ATTR_HOURS: 168, ATTR_RESOLUTION: 15
+        }
+        with pytest.raises(vol.Invalid):
+            GET_FORECAST_SCHEMA({ATTR_HOURS: 0})
+        with pytest.raises(vol.Invalid):
+            GET_FORECAST_SCHEMA({ATTR_RESOLUTION: 30})
+
+    @patch('custom_components.vattenfall_tijdprijs.services.datetime')
+    async def test_defaults_to_now_and_entry_resolution(self, mock_datetime, hass):
+        """Test that the forecast starts at the current slot of the entry."""
+        mock_datetime.now.return_value = datetime(2024, 6, 10, 9, 40, tzinfo=LOCAL_TZ)
+        hass.data[DOMAIN] = {"entry_1": VattenfallPriceCoordinator(hass, {"resolution": 15})}
+        async_setup_services(hass)
+        handler = _registered_handler(hass, SERVICE_GET_FORECAST)
+
+        call = MagicMock()
+        call.data = {ATTR_HOURS: 24}
+        response = await handler(call)
+
+        assert response["start"] == "2024-06-10T09:30:00+02:00"
+        assert response["end"] == "2024-06-11T09:30:00+02:00"
+        assert response["resolution"] == 15
+
+    async def test_repeated_calls_are_memoized(self, hass):
+        """Test that calls for the same window return the computed result."""
+        hass.data[DOMAIN] = {"entry_1": VattenfallPriceCoordinator(hass, {})}
+        async_setup_services(hass)
+        handler = _registered_handler(hass, SERVICE_GET_FORECAST)
+
+        first, again = MagicMock(), MagicMock()
+        first.data = {ATTR_START: datetime(2024, 12, 1, 0, 10), ATTR_HOURS: 24 * 7}
+        again.data = {ATTR_START: datetime(2024, 12, 1, 0, 50), ATTR_HOURS: 24 * 7, ATTR_RESOLUTION: 60}
+        response = await handler(first)
+
+        assert await handler(again) is response
+        assert response["start"] == "2024-12-01T00:00:00+01:00"
+        assert response["segments"][0]["season"] == "winter"
+        assert response["segments"][-1]["end"] == "2024-12-08T00:00:00+01:00"
+
+    async def test_unknown_entry(self, hass):
+        """Test that an unknown config entry id raises an error."""
+        hass.data[DOMAIN] = {}
+        async_setup_services(hass)
+        handler = _registered_handler(hass, SERVICE_GET_FORECAST)
+
+        call = MagicMock()
+        call.data = {ATTR_CONFIG_ENTRY_ID: "missing", ATTR_HOURS: 48}
+
+        with pytest.raises(HomeAssistantError):
+            await handler(call)
@@ -0,0 +1,119 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Tests for the long-term statistics import."""
+
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from custom_components.vattenfall_tijdprijs.const import DOMAIN, STATISTICS_BACKFILL_DAYS
+from custom_components.vattenfall_tijdprijs.coordinator import VattenfallPriceCoordinator
+from custom_components.vattenfall_tijdprijs.pricing_data import LOCAL_TZ, compile_tariff
+from custom_components.vattenfall_tijdprijs.statistics import (
+    async_import_statistics,
+    build_statistics,
+    import_range,
+    statistic_id,
+    statistics_metadata,
+)
+
+
+class TestBuildStatistics:
+    """Test the bulk computation of statistics rows."""
+
+    def test_rows_match_hourly_prices(self):
+        """Test that every row holds the tariff of its hour."""
+        tariff = compile_tariff({})
+        start = datetime(2024, 6, 10, tzinfo=LOCAL_TZ)
+        rows = build_statistics(tariff, start, start + timedelta(days=1))
+
+        assert len(rows) == 24
+        assert rows[0]["start"] == datetime(2024, 6, 9, 22, 0, tzinfo=timezone.utc)
+        for row, entry in zip(rows, tariff.hourly_prices(start, 24)):
+            assert row["mean"] == row["min"] == row["max"] == entry["price"]
+
+    def test_dst_days(self):
+        """Test that DST days have 23 and 25 hourly rows."""
+        tariff = compile_tariff({})
+
+        spring = build_statistics(tariff, datetime(2024, 3, 31, tzinfo=LOCAL_TZ), datetime(2024, 4, 1, tzinfo=LOCAL_TZ))
+        autumn = build_statistics(tariff, datetime(2024, 10, 27, tzinfo=LOCAL_TZ), datetime(2024, 10, 28, tzinfo=LOCAL_TZ))
+
+        assert len(spring) == 23
+        assert len(autumn) == 25
+        assert len({row["start"] for row in autumn}) == 25
+
+
+class TestImportRange:
+    """Test which hours are imported."""
+
+    def test_first_import_backfills(self):
+        """Test that the first import covers the backfill period through tomorrow."""
+        start, end = import_range(None, date(2024, 6, 10))
+
+        assert start == datetime(2024, 6, 10, tzinfo=LOCAL_TZ) - timedelta(days=STATISTICS_BACKFILL_DAYS)
+        assert end == datetime(2024, 6, 12, tzinfo=LOCAL_TZ)
+
+    def test_continues_after_last_import(self):
+        """Test that a later import starts at the hour after the last row."""
+        last = datetime(2024, 6, 10, 21, 0, tzinfo=timezone.utc)
+        start, end = import_range(last, date(2024, 6, 11))
+
+        assert start == datetime(2024, 6, 10, 22, 0, tzinfo=timezone.utc)
+        assert end == datetime(2024, 6, 13, tzinfo=LOCAL_TZ)
+        assert (end - start) // timedelta(hours=1) == 48
+
+
+class TestAsyncImportStatistics:
+    """Test the batched import into the recorder."""
+
+    STATISTICS = 'custom_components.vattenfall_tijdprijs.statistics'
+
+    async def _import(self, hass, last_statistics, now, since=None):
+        """Run one import and return the rows passed to the recorder."""
+        coordinator = VattenfallPriceCoordinator(hass, {})
+        recorder = MagicMock()
+        recorder.async_add_executor_job = AsyncMock(return_value=last_statistics)
+        with patch(f'{self.STATISTICS}.get_instance', return_value=recorder), \
+                patch(f'{self.STATISTICS}.async_add_external_statistics') as add, \
+                patch(f'{self.STATISTICS}.datetime') as mock_datetime:
+            mock_datetime.now.return_value = now
+            mock_datetime.fromtimestamp = datetime.fromtimestamp
+            count = await async_import_statistics(hass, coordinator, "01ABC", "Vattenfall", since=since)
+        return count, add
+
+    async def test_single_batch(self, hass):
+        """Test that all missing hours are written in one call."""
+        count, add = await self._import(hass, {}, datetime(2024, 6, 10, 0, 5, tzinfo=LOCAL_TZ))
+
+        add.assert_called_once()
+        _, metadata, rows = add.call_args[0]
+        assert metadata == statistics_metadata("01ABC", "Vattenfall")
+        assert metadata["statistic_id"] == f"{DOMAIN}:import_price_01abc"
+        assert count == len(rows)
+        assert len(rows) > STATISTICS_BACKFILL_DAYS * 24
+
+    async def test_incremental_import(self, hass):
+        """Test that only the new day is imported when tomorrow is already present."""
+        # The last row is the final hour of 11 June, local time
+        last_start = datetime(2024, 6, 11, 21, 0, tzinfo=timezone.utc).timestamp()
+        last = {statistic_id("01ABC"): [{"start": last_start}]}
+
+        count, add = await self._import(hass, last, datetime(2024, 6, 10, 0, 5, tzinfo=LOCAL_TZ))
+        assert count == 0
+        add.assert_not_called()
+
+        count, add = await self._import(hass, last, datetime(2024, 6, 11, 0, 5, tzinfo=LOCAL_TZ))
+        assert count == 24
+        rows = add.call_args[0][2]
+        assert rows[0]["start"] == datetime(2024, 6, 11, 22, 0, tzinfo=timezone.utc)
+
+    async def test_reimport_since(self, hass):
+        """Test that a rate change rewrites the hours from the current one on."""
+        now = datetime(2024, 6, 10, 14, 25, tzinfo=LOCAL_TZ)
+        count, add = await self._import(hass, {}, now, since=now)
+
+        rows = add.call_args[0][2]
+        assert rows[0]["start"] == datetime(2024, 6, 10, 12, 0, tzinfo=timezone.utc)
+        assert rows[-1]["start"] == datetime(2024, 6, 11, 21, 0, tzinfo=timezone.utc)
+        assert count == 34
@@ -0,0 +1,137 @@
+# SPDX-License-Identifier: AGPL-3.0-only
+
+"""Tests for the forecast websocket command."""
+
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+from custom_components.vattenfall_tijdprijs.const import DOMAIN
+from custom_components.vattenfall_tijdprijs.pricing_data import LOCAL_TZ
+from custom_components.vattenfall_tijdprijs.websocket_api import (
+    async_setup_websocket_api,
+    ws_subscribe_forecast,
+)
+
+NOW = datetime(2024, 6, 10, 9, 0, tzinfo=LOCAL_TZ)
+
+
+async def _loaded(refreshed_coordinator, hass):
+    """Load the entry with a coordinator refreshed at NOW."""
+    coordinator = await refreshed_coordinator(NOW, hass=hass)
+    hass.data = {DOMAIN: {"test_entry_123": coordinator}}
+    return coordinator
+
+
+async def _subscribed(refreshed_coordinator):
+    """Return a refreshed coordinator and a subscribed connection."""
+    hass = MagicMock()
+    coordinator = await _loaded(refreshed_coordinator, hass)
+    connection = MagicMock()
+    connection.subscriptions = {}
+    ws_subscribe_forecast(hass, connection, {"id": 7, "type": f"{DOMAIN}/forecast/subscribe"})
+    return coordinator, connection
+
+
+def _events(connection):
+    """Return the events sent on a connection."""
+    return [call[0][0]["event"] for call in connection.send_message.call_args_list]
+
+
+class TestSubscribeForecast:
+    """Test the forecast subscription."""
+
+    def test_command_is_registered(self):
+        """Test that setup registers the command."""
+        hass = MagicMock()
+        with patch('custom_components.vattenfall_tijdprijs.websocket_api.websocket_api') as websocket_api:
+            async_setup_websocket_api(hass)
+
+        websocket_api.async_register_command.assert_called_once_with(hass, ws_subscribe_forecast)
+
+    async def test_first_event_is_snapshot(self, refreshed_coordinator):
+        """Test that a subscriber first gets all segments."""
+        coordinator, connection = await _subscribed(refreshed_coordinator)
+
+        connection.send_result.assert_called_once_with(7)
+        [event] = _events(connection)
+        assert event["type"] == "snapshot"
+        assert event["segments"] == coordinator.data["segments"]
+        assert event["version"] == coordinator.data["forecast_version"]
+        assert event["median_price"] == coordinator.data["median_price"]
+
+    async def test_roll_sends_delta(self, refreshed_coordinator):
+        """Test that the next hour sends only the changed segments."""
+        coordinator, connection = await _subscribed(refreshed_coordinator)
+        old = coordinator.data["segments"]
+        await refreshed_coordinator(NOW + timedelta(hours=1), coordinator=coordinator)
+
+        event = _events(connection)[-1]
+        assert event["type"] == "delta"
+        kept = old[event["drop_head"]:len(old) - event["drop_tail"]]
+        assert event["head"] + kept + event["tail"] == coordinator.data["segments"]
+        assert len(event["head"]) + len(event["tail"]) < len(old)
+
+    async def test_same_window_sends_nothing(self, refreshed_coordinator):
+        """Test that a refresh within the slot sends no event."""
+        coordinator, connection = await _subscribed(refreshed_coordinator)
+        await refreshed_coordinator(NOW + timedelta(minutes=20), coordinator=coordinator)
+
+        assert len(_events(connection)) == 1
+
+    async def test_repricing_sends_snapshot(self, refreshed_coordinator):
+        """Test that new rates for the whole window send all segments again."""
+        coordinator, connection = await _subscribed(refreshed_coordinator)
+        with patch('custom_components.vattenfall_tijdprijs.coordinator.datetime') as mock_datetime:
+            mock_datetime.now.return_value = NOW
+            coordinator.async_apply_config({"belasting": 0.2})
+
+        event = _events(connection)[-1]
+        assert event["type"] == "snapshot"
+        assert event["segments"] == coordinator.data["segments"]
+
+    async def test_unsubscribe_removes_listener(self, refreshed_coordinator):
+        """Test that closing the subscription stops the events."""
+        coordinator, connection = await _subscribed(refreshed_coordinator)
+        connection.subscriptions[7]()
+        await refreshed_coordinator(NOW + timedelta(hours=1), coordinator=coordinator)
+
+        assert len(_events(connection)) == 1
+
+    async def test_reload_ends_subscription(self, refreshed_coordinator):
+        """Test that reloading the entry ends the subscription, which can be renewed."""
+        coordinator, connection = await _subscribed(refreshed_coordinator)
+        hass = coordinator.hass
+        await coordinator.async_shutdown()
+
+        connection.send_error.assert_called_once()
+        assert connection.send_error.call_args[0][:2] == (7, "not_found")
+        assert 7 not in connection.subscriptions
+        assert not coordinator._listeners
+        assert not coordinator._shutdown_listeners
+
+        reloaded = await _loaded(refreshed_coordinator, hass)
+        ws_subscribe_forecast(hass, connection, {"id": 8, "type": f"{DOMAIN}/forecast/subscribe"})
+        await refreshed_coordinator(NOW + timedelta(hours=1), coordinator=reloaded)
+
+        assert connection.send_message.call_args_list[-2][0][0]["id"] == 8
+        assert _events(connection)[-2]["type"] == "snapshot"
+        assert _events(connection)[-1]["type"] == "delta"
+
+    async def test_unsubscribe_stops_shutdown_error(self, refreshed_coordinator):
+        """Test that a closed subscription is not ended again on shutdown."""
+        coordinator, connection = await _subscribed(refreshed_coordinator)
+        connection.subscriptions.pop(7)()
+        await coordinator.async_shutdown()
+
+        connection.send_error.assert_not_called()
+
+    def test_unknown_entry_is_an_error(self):
+        """Test that a subscription to an entry that is not loaded fails."""
+        hass = MagicMock()
+        hass.data = {}
+        connection = MagicMock()
+        ws_subscribe_forecast(hass, connection, {"id": 7, "type": f"{DOMAIN}/forecast/subscribe", "config_entry_id": "x"})
+
+        connection.send_error.assert_called_once()
+        assert connection.send_error.call_args[0][1] == "not_found"
+        connection.send_result.assert_not_called()